@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+import argparse
+import concurrent.futures
+import logging
+import numpy as np
+import os
+import random
+import re
+from scipy import stats
+import subprocess
+import time
+
+
+def parse_commandline():
+    """Parse commandline arguments"""
+    epilog = """
+This script checks how well resource limits track the running time of cvc5 on
+the current machine, e.g., for resource weights learned with
+learn_resource_weights.py. It runs a sample of benchmarks with each set of
+candidate resource weights ("--weights", which can be given multiple times and
+has the format printed by learn_resource_weights.py) and the default weights,
+each with "--rlimit" and "--stats", and reports for every set of weights:
+
+- the rank correlation between the resource units and the running time,
+- the spread of the running time per resource unit, i.e., the factor between
+  the fastest and the slowest benchmark to spend the same number of resources,
+- the running times of the benchmarks that exceeded the resource limit, i.e.,
+  how precisely the resource limit acts as a time limit, and
+- the maximal running time implied by the resource limit, i.e., the resource
+  limit multiplied with the largest observed time per resource unit.
+    """
+    parser = argparse.ArgumentParser(description='calibrate resource limits against running times',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                     epilog=epilog)
+    parser.add_argument('binary', help='path of the cvc5 binary')
+    parser.add_argument('benchmarks', nargs='+',
+                        help='benchmarks, directories of benchmarks or files listing benchmarks')
+    parser.add_argument('-v', '--verbose',
+                        action='store_true', help='be more verbose')
+    parser.add_argument('--weights', metavar='OPTIONS', action='append', default=[],
+                        help='candidate resource weights ("[<name>:] --rweight=<resource>=N ...", use --weights=... if the value starts with "--")')
+    parser.add_argument('--rlimit', type=int, required=True,
+                        help='resource limit for every run')
+    parser.add_argument('--timeout', metavar='SEC', type=float, default=600,
+                        help='wall-clock timeout for every run')
+    parser.add_argument('--sample', type=int, default=100,
+                        help='number of randomly selected benchmarks (0 for all)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed for selecting the benchmarks')
+    parser.add_argument('--threshold', metavar='SEC', type=float, default=0.1,
+                        help='ignore runs below this runtime for the time per resource unit')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of parallel runs (more than one may distort the running times)')
+
+    return parser.parse_args()
+
+
+units_re = re.compile('resource::resourceUnitsUsed = ([0-9]+)')
+benchmark_suffixes = ('.smt2', '.sy', '.p')
+
+
+def get_benchmarks(paths):
+    """Collect the benchmarks from files, directories and lists of benchmarks"""
+    benchmarks = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                benchmarks.extend(
+                    os.path.join(root, f) for f in sorted(files)
+                    if f.endswith(benchmark_suffixes))
+        elif path.endswith(benchmark_suffixes):
+            benchmarks.append(path)
+        else:
+            with open(path) as fin:
+                benchmarks.extend(line.strip() for line in fin if line.strip())
+    return sorted(set(benchmarks))
+
+
+def get_candidates(weights):
+    """Parse the candidate weights into (name, options)"""
+    candidates = [('default', [])]
+    for i, w in enumerate(weights):
+        name, sep, options = w.rpartition(':')
+        if not sep or name.startswith('-'):
+            name, options = 'candidate {}'.format(i + 1), w
+        candidates.append((name.strip(), options.split()))
+    return candidates
+
+
+def run(cmd, timeout):
+    """Run cvc5 and return (wall time, resource units, result), where result
+    is 'timeout', 'error' or the first word printed by cvc5. The resource units
+    are None if cvc5 did not terminate normally."""
+    start = time.monotonic()
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return time.monotonic() - start, None, 'timeout'
+    walltime = time.monotonic() - start
+    m = units_re.search(proc.stderr.decode(errors='replace'))
+    if proc.returncode != 0 or m is None:
+        return walltime, None, 'error'
+    result = proc.stdout.decode(errors='replace').split()
+    result = result[0] if result else 'none'
+    return walltime, int(m.group(1)), result
+
+
+def report(name, runs, args):
+    """Report how well the resource units track the running times"""
+    times = np.array([r[0] for r in runs if r[1] is not None])
+    units = np.array([r[1] for r in runs if r[1] is not None],
+                     dtype=np.float64)
+    out = np.array([r[1] is not None and r[1] >= args.rlimit
+                    and r[2] == 'unknown' for r in runs if r[1] is not None])
+    results = [r[2] for r in runs]
+    logging.info('Weights {}: {} runs, {} resource-outs, {} timeouts, {} errors'.format(
+        name, len(runs), np.count_nonzero(out), results.count('timeout'),
+        results.count('error')))
+    if len(times) < 2:
+        logging.info('  not enough runs to compare resources and times')
+        return
+
+    rho = stats.spearmanr(units, times)[0]
+    logging.info('  rank correlation of resources and time: {:.3f}'.format(rho))
+
+    selected = (times >= args.threshold) & (units > 0)
+    if np.count_nonzero(selected) >= 2:
+        rate = times[selected] / units[selected]
+        lo, med, hi = np.percentile(rate, [5, 50, 95])
+        logging.info(
+            '  time per million resource units: median {:.3f}s, 5%-95% {:.3f}s .. {:.3f}s, '
+            'spread {:.2f} (worst case {:.2f})'.format(
+                med * 1e6, lo * 1e6, hi * 1e6, hi / lo, rate.max() / rate.min()))
+        logging.info(
+            '  rlimit {} corresponds to {:.2f}s (median rate), {:.2f}s (worst observed rate)'.format(
+                args.rlimit, args.rlimit * med, args.rlimit * rate.max()))
+
+    if np.count_nonzero(out) > 0:
+        stopped = times[out]
+        logging.info(
+            '  resource-outs stopped after {:.2f}s (median), {:.2f}s .. {:.2f}s, spread {:.2f}'.format(
+                np.median(stopped), stopped.min(), stopped.max(),
+                stopped.max() / max(stopped.min(), 1e-3)))
+
+
+def calibrate(args):
+    benchmarks = get_benchmarks(args.benchmarks)
+    if args.sample > 0 and len(benchmarks) > args.sample:
+        benchmarks = sorted(random.Random(args.seed).sample(benchmarks, args.sample))
+    candidates = get_candidates(args.weights)
+    logging.info('Running {} benchmarks with {} sets of weights'.format(
+        len(benchmarks), len(candidates)))
+
+    with concurrent.futures.ThreadPoolExecutor(args.jobs) as pool:
+        for name, options in candidates:
+            cmds = [[args.binary, '--stats', '--rlimit={}'.format(args.rlimit)]
+                    + options + [b] for b in benchmarks]
+            runs = list(pool.map(lambda cmd: run(cmd, args.timeout), cmds))
+            for b, r in zip(benchmarks, runs):
+                logging.debug('{}: {:.2f}s, {} units, {}'.format(b, *r))
+            report(name, runs, args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='[%(levelname)s] %(message)s')
+    args = parse_commandline()
+    if args.verbose:
+        logging.getLogger().setLevel(level=logging.DEBUG)
+    else:
+        logging.getLogger().setLevel(level=logging.INFO)
+    calibrate(args)
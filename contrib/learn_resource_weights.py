@@ -1,13 +1,12 @@
 #!/usr/bin/env python3
 
 import argparse
-import glob
-import gzip
-import json
+import concurrent.futures
 import logging
+import numpy as np
+import os
 import re
-from sklearn import linear_model
-import statistics
+from scipy import optimize
 
 
 def parse_commandline():
@@ -20,15 +19,20 @@ by the spent resources, multiplied with their weights.
 In the first stage ("parse") this script reads the output files of a benchmark
 run as generated on our cluster. The output files are expected to be named
 "*.smt2/output.log" and should contain the statistics (by use of "--stats").
-The result is a gziped json file that contains all the relevant information
-in a compact form.
-
-In the second stage ("analyze") this script loads the gziped json file and uses
-a linear regression model to learn resource weights. The resulting weights can
-be used as constants for the resource options ("--*-step=n"). Additionally,
-this script performs some analysis on the results to identify outliers where
-the linear model performs particularly bad, i.e., the runtime estimation is way
-off.
+The files are parsed in parallel and the result is stored in a compressed
+NumPy file (.npz) with one column per field and one row per output file. If
+this file already exists, only the output files that are new or have changed
+(by modification time and size) since it was written are parsed again.
+
+In the second stage ("analyze") this script loads the NumPy file and uses
+a linear regression model with non-negative coefficients and a non-negative
+intercept (the fixed overhead of every benchmark) to learn resource weights.
+The intercept is not part of the weights. The quality of the model is
+estimated by k-fold cross-validation. The resulting weights are scaled to
+integers and printed as resource weight options ("--rweight=<resource>=n"),
+optionally with separate weights for every logic. Additionally, this script
+performs some analysis on the results to identify outliers where the linear
+model performs particularly bad, i.e., the runtime estimation is way off.
     """
     usage = """
     first stage to parse the solver output:
@@ -47,132 +51,335 @@ off.
                         help='path of benchmark results')
     parser.add_argument('-v', '--verbose',
                         action='store_true', help='be more verbose')
-    parser.add_argument('--json', default='data.json.gz',
-                        help='path of json file')
+    parser.add_argument('--data', default='data.npz',
+                        help='path of the parsed data')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='number of processes used for parsing')
     parser.add_argument('--threshold', metavar='SEC', type=int, default=1,
                         help='ignore benchmarks with a runtime below this threshold')
     parser.add_argument('--mult', type=int, default=1000,
                         help='multiply running times with this factor for regression')
+    parser.add_argument('--folds', type=int, default=5,
+                        help='number of folds for cross-validation')
+    parser.add_argument('--per-logic', action='store_true',
+                        help='learn separate resource weights for every logic')
+    parser.add_argument('--min-benchmarks', type=int, default=50,
+                        help='minimum number of benchmarks to learn weights for a logic')
 
     return parser.parse_args()
 
 
-def load_zipped_json(filename):
-    """Load data from a gziped json file"""
-    with gzip.GzipFile(args.json, 'r') as fin:
-        return json.loads(fin.read().decode('utf-8'))
+# Statistics as printed by older versions ("resource::SatConflictStep, 12")
+legacy_resource_re = re.compile('resource::([^,]+), ([0-9]+)')
+legacy_result_re = re.compile('driver::sat/unsat, ([a-z]+)')
+legacy_totaltime_re = re.compile('driver::totalTime, ([0-9\\.]+)')
+# Statistics as printed by current versions
+# ("resource::steps::resource = { SatConflictStep: 12, ... }")
+histogram_re = re.compile('resource::steps::[a-z-]+ = \\{(.*)\\}')
+histogram_entry_re = re.compile('([\\w-]+): ([0-9]+)')
+totaltime_re = re.compile('global::totalTime = ([0-9\\.]+)(m?s)')
+result_re = re.compile('(sat|unsat|unknown)')
+# Benchmarks are assumed to be stored in directories named after their logic
+logic_re = re.compile('(QF_)?[A-Z]{2,}')
+# Statistics that are totals rather than resource steps
+resource_totals = {'resourceUnitsUsed', 'spendResourceCalls'}
+
+
+def parse_file(file):
+    """Parse the resources, the result and the running time from a single
+    output file. The file is read line by line, such that large outputs are
+    never held in memory."""
+    resources = {}
+    result = None
+    time = None
+    with open(file, errors='replace') as fin:
+        for line in fin:
+            line = line.strip()
+            if line.startswith('resource::'):
+                m = histogram_re.fullmatch(line)
+                if m:
+                    for name, count in histogram_entry_re.findall(m.group(1)):
+                        resources[name] = resources.get(name, 0) + int(count)
+                    continue
+                m = legacy_resource_re.fullmatch(line)
+                if m and m.group(1) not in resource_totals:
+                    resources[m.group(1)] = int(m.group(2))
+            elif line.startswith('global::totalTime'):
+                m = totaltime_re.fullmatch(line)
+                if m:
+                    time = float(m.group(1))
+                    if m.group(2) == 'ms':
+                        time /= 1000
+            elif line.startswith('driver::'):
+                m = legacy_result_re.fullmatch(line)
+                if m:
+                    result = m.group(1)
+                m = legacy_totaltime_re.fullmatch(line)
+                if m:
+                    time = float(m.group(1))
+            elif result is None and result_re.fullmatch(line):
+                result = line
+    if result is None or time is None:
+        raise Exception('no result or running time found')
+    return resources, result, time
+
+
+def parse_entry(entry):
+    """Parse a single output file given as (path, mtime, size). Returns None for
+    the data if the file could not be parsed."""
+    try:
+        return entry, parse_file(entry[0])
+    except Exception:
+        return entry, None
+
+
+def get_logic(filename, basedir):
+    """Guess the logic of a benchmark from the directories it is stored in"""
+    for part in os.path.relpath(filename, basedir).split(os.sep):
+        if logic_re.fullmatch(part):
+            return part
+    return 'unknown'
+
+
+def find_output_files(basedir):
+    """Yield (path, mtime, size) for all output files in basedir"""
+    for entry in os.scandir(basedir):
+        if entry.is_dir(follow_symlinks=False):
+            yield from find_output_files(entry.path)
+        elif entry.name == 'output.log':
+            st = entry.stat()
+            yield entry.path, st.st_mtime_ns, st.st_size
 
 
-def save_zipped_json(filename, data):
-    """Store data to a gziped json file"""
-    with gzip.GzipFile(args.json, 'w') as fout:
-        fout.write(json.dumps(data).encode('utf-8'))
+def load_data(filename):
+    """Load the parsed data from a NumPy file"""
+    with np.load(filename) as data:
+        return {key: data[key] for key in data.files}
 
 
-def get_sorted_values(data):
-    """Transform [['name', value], ...] to [value, ...] sorted by names"""
-    return [d[1] for d in sorted(data)]
+def save_data(filename, data):
+    """Store the parsed data to a NumPy file"""
+    with open(filename, 'wb') as fout:
+        np.savez_compressed(fout, **data)
 
 
 def parse(args):
     if args.basedir is None:
         raise Exception('Specify basedir for parsing!')
-    filename_re = re.compile('(.*\\.smt2)/output\\.log')
-    resource_re = re.compile('resource::([^,]+), ([0-9]+)')
-    result_re = re.compile('driver::sat/unsat, ([a-z]+)')
-    totaltime_re = re.compile('driver::totalTime, ([0-9\\.]+)')
 
-    logging.info('Parsing files from {}'.format(args.basedir))
-    data = {}
-    failed = 0
-    for file in glob.iglob('{}/**/output.log'.format(args.basedir), recursive=True):
-        content = open(file).read()
-        try:
-            filename = filename_re.match(file).group(1)
-            r = resource_re.findall(content)
-            r = list(map(lambda x: (x[0], int(x[1])), r))
-            data[filename] = {
-                'resources': r,
-                'result': result_re.search(content).group(1),
-                'time': float(totaltime_re.search(content).group(1)),
-            }
-        except Exception as e:
-            logging.debug('Failed to parse {}: {}'.format(file, e))
-            failed += 1
+    logging.info('Looking for files in {}'.format(args.basedir))
+    files = list(find_output_files(args.basedir))
+
+    # Reuse the rows of files that did not change since the last run
+    old = None
+    if os.path.exists(args.data):
+        logging.info('Loading previous data from {}'.format(args.data))
+        old = load_data(args.data)
+        rows = {
+            (f, m, s): i
+            for i, (f, m, s) in enumerate(
+                zip(old['output'], old['mtime'], old['size']))
+        }
+        keep = [rows[e] for e in files if e in rows]
+        todo = [e for e in files if e not in rows]
+    else:
+        keep = []
+        todo = files
+    logging.info('Parsing {} new or changed files (reusing {})'.format(
+        len(todo), len(keep)))
 
+    parsed = []
+    failed = 0
+    with concurrent.futures.ProcessPoolExecutor(args.jobs) as pool:
+        for entry, res in pool.map(parse_entry, todo, chunksize=256):
+            if res is None:
+                logging.debug('Failed to parse {}'.format(entry[0]))
+                failed += 1
+                # Remember the file to not parse it again, but with a NaN
+                # running time such that it is ignored by the analysis
+                res = ({}, '', float('nan'))
+            parsed.append((entry, res))
     if failed > 0:
         logging.info('Failed to parse {} out of {} files'.format(
-            failed, failed + len(data)))
-    logging.info('Dumping data to {}'.format(args.json))
-    save_zipped_json(args.json, data)
+            failed, len(todo)))
+
+    resources = set(name for _, (r, _, _) in parsed for name in r)
+    if old is not None:
+        resources.update(old['resources'])
+    resources = np.array(sorted(resources), dtype=str)
+    columns = {name: i for i, name in enumerate(resources)}
+
+    keep = np.array(keep, dtype=np.int64)
+    counts = np.zeros((len(keep) + len(parsed), len(resources)),
+                      dtype=np.int64)
+    if old is not None:
+        old_columns = [columns[name] for name in old['resources']]
+        counts[:len(keep), old_columns] = old['counts'][keep]
+    for row, (_, (r, _, _)) in enumerate(parsed, len(keep)):
+        for name, count in r.items():
+            counts[row, columns[name]] = count
+
+    def column(key, new, dtype):
+        new = np.array(new, dtype=dtype)
+        if old is None:
+            return new
+        return np.concatenate([old[key][keep].astype(dtype), new])
+
+    output = column('output', [e[0] for e, _ in parsed], str)
+    data = {
+        'output': output,
+        'mtime': column('mtime', [e[1] for e, _ in parsed], np.int64),
+        'size': column('size', [e[2] for e, _ in parsed], np.int64),
+        'filename': np.array([os.path.dirname(f) for f in output], dtype=str),
+        'logic': np.array([get_logic(f, args.basedir) for f in output],
+                          dtype=str),
+        'result': column('result', [r[1] for _, r in parsed], str),
+        'time': column('time', [r[2] for _, r in parsed], np.float64),
+        'resources': resources,
+        'counts': counts,
+    }
+    logging.info('Dumping data of {} files to {}'.format(
+        len(output), args.data))
+    save_data(args.data, data)
+
+
+def fit(x, y):
+    """Fit a linear model with non-negative coefficients and a non-negative
+    intercept. The intercept absorbs the fixed overhead of every benchmark,
+    which would otherwise be attributed to resources that are used about
+    equally often by all benchmarks. The columns are scaled to unit norm so
+    that the solver does not prefer a resource over the intercept merely
+    because its counts are larger. Returns the coefficients and the
+    intercept."""
+    x = np.column_stack([np.ones(len(y)), x])
+    norms = np.linalg.norm(x, axis=0)
+    norms[norms == 0] = 1
+    res = optimize.nnls(x / norms, y)[0]
+    # drop coefficients that are only rounding noise of the scaling
+    res[res < 1e-9 * res.max(initial=0)] = 0
+    res /= norms
+    return res[1:], res[0]
+
+
+def get_errors(predict, actual):
+    """Return the relative errors of the predicted running times as the
+    absolute value of the logarithm of their ratio to the actual ones"""
+    with np.errstate(divide='ignore'):
+        return np.abs(np.log(predict / actual))
+
+
+def cross_validate(x, y, folds):
+    """Estimate the error of the linear model by k-fold cross-validation.
+    Returns the relative errors of the held-out predictions per fold."""
+    order = np.random.default_rng(0).permutation(len(y))
+    errors = []
+    for test in np.array_split(order, folds):
+        train = np.setdiff1d(order, test, assume_unique=True)
+        coeffs, intercept = fit(x[train], y[train])
+        errors.append(get_errors(x[test] @ coeffs + intercept, y[test]))
+    return errors
+
+
+def get_weights(coeffs):
+    """Scale the coefficients to integer resource weights such that the
+    smallest positive coefficient has weight 1. Resources with a coefficient
+    of zero get weight 1 as well, as they still need to be accounted for."""
+    positive = coeffs[coeffs > 0]
+    if len(positive) == 0:
+        return np.ones(len(coeffs), dtype=np.int64)
+    return np.maximum(1, np.rint(coeffs / positive.min())).astype(np.int64)
+
+
+def get_options(resources, weights):
+    """Format resource weights as options for cvc5"""
+    return ' '.join('--rweight={}={}'.format(r, w)
+                    for r, w in zip(resources, weights))
+
+
+def learn_weights(name, x, y, resources, args):
+    """Learn, validate and print the resource weights for the given data.
+    Returns the coefficients and the intercept of the model. The intercept is
+    not part of the printed options."""
+    logging.info('Training regression model{} on {} benchmarks'.format(
+        name, len(y)))
+    coeffs, intercept = fit(x, y)
+    logging.info('Fixed overhead{}: {:.3f}s per benchmark'.format(
+        name, intercept / args.mult))
+    if len(y) >= 2 * args.folds:
+        errors = cross_validate(x, y, args.folds)
+        factors = np.exp([np.median(e) for e in errors])
+        logging.info(
+            'Cross-validation{}: median error factor {:.2f} (+- {:.2f}), '
+            'worst {:.2f}'.format(name, np.mean(factors), np.std(factors),
+                                  np.exp(max(np.max(e) for e in errors))))
+    print('{}{}'.format(name.strip(' ()') + ': ' if name else '',
+                        get_options(resources, get_weights(coeffs))))
+    return coeffs, intercept
 
 
 def analyze(args):
-    logging.info('Loading data from {}'.format(args.json))
-    data = load_zipped_json(args.json)
-
-    logging.info('Extracting resources')
-    resources = set()
-    for f in data:
-        for r in data[f]['resources']:
-            resources.add(r[0])
-    resources = list(sorted(resources))
-
-    vals = {r: [] for r in resources}
-
-    logging.info('Collecting data from {} benchmarks'.format(len(data)))
-    x = []
-    y = []
-    for filename in data:
-        d = data[filename]
-        if d['time'] < args.threshold:
-            continue
-        x.append(get_sorted_values(d['resources']))
-        y.append(d['time'] * args.mult)
-
-        for r in d['resources']:
-            vals[r[0]].append(r[1])
-
-    logging.info('Training regression model')
-    clf = linear_model.LinearRegression()
-    r = clf.fit(x, y)
-    coeffs = zip(resources, r.coef_)
-    for c in sorted(coeffs, key=lambda c: c[1]):
-        minval = min(vals[c[0]])
-        maxval = max(vals[c[0]])
-        avgval = statistics.mean(vals[c[0]])
-        medval = statistics.median(vals[c[0]])
-        impact = c[1] * avgval
+    logging.info('Loading data from {}'.format(args.data))
+    data = load_data(args.data)
+
+    # NaN running times (of files that could not be parsed) are filtered too
+    selected = data['time'] >= args.threshold
+    x = data['counts'][selected].astype(np.float64)
+    y = data['time'][selected] * args.mult
+    logics = data['logic'][selected]
+    filenames = data['filename'][selected]
+    # Ignore resources that are not used by any of the benchmarks
+    used = x.any(axis=0)
+    x = x[:, used]
+    resources = data['resources'][used]
+    logging.info('Collecting data from {} of {} benchmarks'.format(
+        len(y), len(selected)))
+    if len(y) == 0:
+        raise Exception('No benchmarks with a runtime above the threshold!')
+
+    coeffs, intercept = learn_weights('', x, y, resources, args)
+    vals = np.where(x > 0, x, np.nan)
+    minval = np.nanmin(vals, axis=0)
+    maxval = np.nanmax(vals, axis=0)
+    avgval = np.nanmean(vals, axis=0)
+    medval = np.nanmedian(vals, axis=0)
+    impact = coeffs * avgval
+    for i in np.argsort(coeffs, kind='stable'):
         logging.info('{:23}-> {:15.10f}\t({} .. {:10}, avg {:9.2f}, med {:8}, impact {:7.3f})'.format(
-            *c, minval, maxval, avgval, medval, impact))
+            resources[i], coeffs[i], int(minval[i]), int(maxval[i]),
+            avgval[i], medval[i], impact[i]))
+
+    if args.per_logic:
+        for logic in np.unique(logics):
+            selected = logics == logic
+            if np.count_nonzero(selected) < args.min_benchmarks:
+                logging.info('Skipping {} with {} benchmarks'.format(
+                    logic, np.count_nonzero(selected)))
+                continue
+            learn_weights(' ({})'.format(logic), x[selected], y[selected],
+                          resources, args)
 
     logging.info('Comparing regression model with reality')
-    outliers = {
-        'over-estimated': [],
-        'under-estimated': []
-    }
-    for filename in data:
-        d = data[filename]
-        actual = d['time']
-        if actual < args.threshold:
-            continue
-        vals = get_sorted_values(d['resources'])
-        predict = float(r.predict([vals])) / args.mult
-        outliers['over-estimated'].append([predict / actual, predict, actual, filename])
-        outliers['under-estimated'].append([actual / predict, predict, actual, filename])
+    actual = y / args.mult
+    predict = (x @ coeffs + intercept) / args.mult
+    with np.errstate(divide='ignore'):
+        outliers = {
+            'over-estimated': predict / actual,
+            'under-estimated': actual / predict,
+        }
 
     for out in outliers:
         logging.info('Showing outliers for {}'.format(out))
-        filtered = outliers[out]
-        for vals in sorted(filtered)[-5:]:
+        ratios = outliers[out]
+        for i in np.argsort(ratios, kind='stable')[-5:]:
             logging.info(
-                '  -> {:6.2f} ({:6.2f}, actual {:6.2f}): {}'.format(*vals))
+                '  -> {:6.2f} ({:6.2f}, actual {:6.2f}): {}'.format(
+                    ratios[i], predict[i], actual[i], filenames[i]))
 
-    cur = 0
-    gnuplot = open('plot.data', 'w')
-    for out in sorted(outliers['under-estimated']):
-        gnuplot.write('{}\t{}\n'.format(cur, out[0]))
-        cur += 1
+    ratios = np.sort(outliers['under-estimated'])
+    np.savetxt('plot.data',
+               np.column_stack([np.arange(len(ratios)), ratios]),
+               fmt=['%d', '%s'],
+               delimiter='\t')
 
 
 if __name__ == "__main__":
@@ -198,7 +198,7 @@ cdef extern from "<cvc5/cvc5.h>" namespace "cvc5":
     cdef cppclass Result:
         Result() except+
         bint isNull() except +
-        bint isSat() except +
+        bint isSat() except + nogil
         bint isUnsat() except +
         bint isUnknown() except +
         bint operator==(const Result& r) except +
@@ -413,8 +413,8 @@ cdef extern from "<cvc5/cvc5.h>" namespace "cvc5":
         # default value for symbol defined in cpp/cvc5.h
         Term mkVar(Sort sort) except +
         Term simplify(const Term& t) except +
-        void assertFormula(Term term) except +
-        Result checkSat() except +
+        void assertFormula(Term term) except + nogil
+        Result checkSat() except + nogil
         Result checkSatAssuming(const vector[Term]& assumptions) except +
         Sort declareDatatype(const string& symbol, const vector[DatatypeConstructorDecl]& ctors)
         Term declareFun(const string& symbol, const vector[Sort]& sorts, Sort sort, bint fresh) except +
@@ -442,7 +442,7 @@ cdef extern from "<cvc5/cvc5.h>" namespace "cvc5":
         pair[Result, vector[Term]] getTimeoutCore() except +
         pair[Result, vector[Term]] getTimeoutCoreAssuming(const vector[Term]& assumptions) except +
         Term getValue(Term term) except +
-        vector[Term] getValue(const vector[Term]& terms) except +
+        vector[Term] getValue(const vector[Term]& terms) except + nogil
         Term getQuantifierElimination(const Term& q) except +
         Term getQuantifierEliminationDisjunct(const Term& q) except +
         vector[Term] getModelDomainElements(Sort sort) except +
@@ -469,8 +469,8 @@ cdef extern from "<cvc5/cvc5.h>" namespace "cvc5":
         Term getAbduct(const Term& conj, Grammar& grammar) except +
         Term getAbductNext() except +
         void blockModel() except +
-        void blockModel(BlockModelsMode mode) except +
-        void blockModelValues(const vector[Term]& terms) except +
+        void blockModel(BlockModelsMode mode) except + nogil
+        void blockModelValues(const vector[Term]& terms) except + nogil
         string getInstantiations() except +
         Statistics getStatistics() except +
         string getVersion() except +
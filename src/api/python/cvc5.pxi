@@ -1,6 +1,8 @@
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from fractions import Fraction
 from functools import wraps
+import hashlib
+import json
 import sys
 
 from cython.operator cimport dereference, preincrement
@@ -1115,6 +1117,22 @@ cdef class TermManager:
         A cvc5 term manager.
 
         Wrapper class for :cpp:class:`cvc5::TermManager`.
+
+        Term managers are bound to the thread that created them: all term
+        managers created in the same thread share their internal state,
+        which is not synchronized. To construct terms concurrently, create a
+        separate term manager in each thread and make sure that all its
+        sorts, terms and solvers are only used and released within this
+        thread. To transfer terms and sorts between threads, export them with
+        :py:meth:`exportTerms()` in the source thread and import the result
+        with a :py:class:`TermImporter` in the destination thread. This
+        rebuilds the terms node by node in the destination term manager,
+        without printing or parsing them.
+
+        .. note:: The module is not declared compatible with free-threaded
+                  builds of CPython: since the objects of the Python API can
+                  be released by the garbage collector in any thread, the
+                  above cannot be guaranteed without the GIL.
     """
     cdef c_TermManager* ctm
 
@@ -2056,6 +2074,535 @@ cdef class TermManager:
         raise ValueError("Can't create DatatypeDecl with {}".format(
                     [type(a) for a in [name, sorts_or_bool, isCoDatatype]]))
 
+    def exportTerms(self, items):
+        """
+            Export terms and sorts of this term manager, such that they can
+            be imported into a term manager of another thread with a
+            :py:class:`TermImporter`.
+
+            The result only consists of plain Python objects and does not
+            refer to this term manager or the thread that created it. It
+            describes the structure of the terms, where shared subterms are
+            exported once. Unlike printing the terms and parsing them in the
+            destination thread, neither the printer nor the parser is
+            involved. This function must be called in the thread of this
+            term manager.
+
+            Skolems, values of uninterpreted sorts, real algebraic numbers and
+            terms or sorts that involve parametric datatypes, uninterpreted
+            sort constructors or abstract sorts are not supported.
+
+            :param items: A list of terms and sorts.
+            :return: The exported terms and sorts as a :py:class:`TermExport`.
+        """
+        exporter = _TermExporter()
+        roots = []
+        for item in items:
+            if isinstance(item, Term):
+                roots.append((True, exporter.exportTerm(item)))
+            else:
+                roots.append((False, exporter.exportSort(<Sort?> item)))
+        return TermExport(exporter.sorts, exporter.terms, roots)
+
+
+# ----------------------------------------------------------------------------
+# TermExport
+# ----------------------------------------------------------------------------
+
+class TermExport:
+    """
+        Terms and sorts exported with :py:meth:`TermManager.exportTerms()`.
+
+        Sorts and terms are stored as tuples of plain Python objects, in an
+        order where every term only refers to terms that precede it. The
+        object can be passed to other threads (and pickled).
+    """
+
+    def __init__(self, sorts, terms, roots):
+        self.sorts = sorts
+        self.terms = terms
+        self.roots = roots
+
+    def __len__(self):
+        return len(self.roots)
+
+
+# The kinds of nullary terms that are exported as applications
+_NULLARY_KINDS = {
+    Kind.PI,
+    Kind.REGEXP_ALL,
+    Kind.REGEXP_ALLCHAR,
+    Kind.REGEXP_NONE,
+    Kind.SEP_EMP,
+}
+
+# The kinds of terms that are exported as values of their sort
+_VALUE_SORT_KINDS = {
+    Kind.SET_EMPTY,
+    Kind.SET_UNIVERSE,
+    Kind.BAG_EMPTY,
+    Kind.SEP_NIL,
+}
+
+# The kinds of applications of datatype constructors, selectors, testers and
+# updaters
+_DATATYPE_APPLY_KINDS = {
+    Kind.APPLY_CONSTRUCTOR,
+    Kind.APPLY_SELECTOR,
+    Kind.APPLY_TESTER,
+    Kind.APPLY_UPDATER,
+}
+
+# The kinds of sorts that do not have parameters
+_SIMPLE_SORT_KINDS = {
+    SortKind.BOOLEAN_SORT,
+    SortKind.INTEGER_SORT,
+    SortKind.REAL_SORT,
+    SortKind.REGLAN_SORT,
+    SortKind.ROUNDINGMODE_SORT,
+    SortKind.STRING_SORT,
+}
+
+
+class _TermExporter:
+    """
+        Exports terms and sorts for :py:meth:`TermManager.exportTerms()`.
+
+        Sorts are exported as ``(kind, ...)`` tuples and terms as
+        ``(kind, ...)`` tuples, where other sorts and terms are referred to
+        by their index in :py:attr:`sorts` and :py:attr:`terms`.
+    """
+
+    def __init__(self):
+        self.sorts = []
+        self.terms = []
+        self.sortIds = {}
+        self.termIds = {}
+
+    def exportSort(self, Sort sort):
+        """
+            :return: The index of the exported ``sort``.
+        """
+        res = self.sortIds.get(sort)
+        if res is not None:
+            return res
+        kind = sort.getKind()
+        if kind in _SIMPLE_SORT_KINDS:
+            record = (kind.value,)
+        elif kind == SortKind.BITVECTOR_SORT:
+            record = (kind.value, sort.getBitVectorSize())
+        elif kind == SortKind.FLOATINGPOINT_SORT:
+            record = (kind.value, sort.getFloatingPointExponentSize(),
+                      sort.getFloatingPointSignificandSize())
+        elif kind == SortKind.FINITE_FIELD_SORT:
+            record = (kind.value, str(sort.getFiniteFieldSize()))
+        elif kind == SortKind.ARRAY_SORT:
+            record = (kind.value, self.exportSort(sort.getArrayIndexSort()),
+                      self.exportSort(sort.getArrayElementSort()))
+        elif kind == SortKind.SET_SORT:
+            record = (kind.value, self.exportSort(sort.getSetElementSort()))
+        elif kind == SortKind.BAG_SORT:
+            record = (kind.value, self.exportSort(sort.getBagElementSort()))
+        elif kind == SortKind.SEQUENCE_SORT:
+            record = (kind.value,
+                      self.exportSort(sort.getSequenceElementSort()))
+        elif kind == SortKind.NULLABLE_SORT:
+            record = (kind.value,
+                      self.exportSort(sort.getNullableElementSort()))
+        elif kind == SortKind.TUPLE_SORT:
+            record = (kind.value,
+                      tuple(self.exportSort(s) for s in sort.getTupleSorts()))
+        elif kind == SortKind.FUNCTION_SORT:
+            record = (kind.value,
+                      tuple(self.exportSort(s)
+                            for s in sort.getFunctionDomainSorts()),
+                      self.exportSort(sort.getFunctionCodomainSort()))
+        elif kind == SortKind.UNINTERPRETED_SORT and not sort.isInstantiated():
+            record = (kind.value,
+                      sort.getSymbol() if sort.hasSymbol() else None)
+        elif kind == SortKind.DATATYPE_SORT and sort.isRecord():
+            record = (kind.value, True,
+                      tuple((sel.getName(),
+                             self.exportSort(sel.getCodomainSort()))
+                            for sel in sort.getDatatype()[0]))
+        elif kind == SortKind.DATATYPE_SORT and not sort.isInstantiated() \
+                and not sort.getDatatype().isParametric():
+            # The datatype may refer to itself, so its index is reserved
+            # before its selectors are exported
+            res = len(self.sorts)
+            self.sortIds[sort] = res
+            self.sorts.append(None)
+            dt = sort.getDatatype()
+            self.sorts[res] = (
+                kind.value, False, dt.getName(), dt.isCodatatype(),
+                tuple((cons.getName(),
+                       tuple((sel.getName(),
+                              self.exportSort(sel.getCodomainSort()))
+                             for sel in cons))
+                      for cons in dt))
+            return res
+        else:
+            raise ValueError("Cannot export sort {}".format(sort))
+        res = len(self.sorts)
+        self.sortIds[sort] = res
+        self.sorts.append(record)
+        return res
+
+    def exportTerm(self, Term term):
+        """
+            :return: The index of the exported ``term``.
+        """
+        visit = [term]
+        while visit:
+            cur = visit[-1]
+            if cur in self.termIds:
+                visit.pop()
+                continue
+            pending = [c for c in self._children(cur)
+                       if c not in self.termIds]
+            if pending:
+                visit.extend(reversed(pending))
+                continue
+            visit.pop()
+            record = self._record(cur)
+            self.termIds[cur] = len(self.terms)
+            self.terms.append(record)
+        return self.termIds[term]
+
+    def _children(self, Term term):
+        """
+            :return: The terms that have to be exported before ``term``.
+        """
+        kind = term.getKind()
+        if kind == Kind.CONST_ARRAY:
+            return [term.getConstArrayBase()]
+        if kind == Kind.CONST_SEQUENCE:
+            return term.getSequenceValue()
+        children = list(term)
+        if kind in _DATATYPE_APPLY_KINDS:
+            # The constructor, selector, tester or updater is exported as
+            # part of the application
+            return children[1:]
+        return children
+
+    def _datatypeOp(self, Term term):
+        """
+            :return: The index of the datatype sort, the constructor and the
+                     selector (or -1) of the constructor, selector, tester or
+                     updater that is applied in ``term``.
+        """
+        kind = term.getKind()
+        op = term[0]
+        sort = term.getSort() if kind == Kind.APPLY_CONSTRUCTOR \
+            else term[1].getSort()
+        dt = sort.getDatatype()
+        for i in range(dt.getNumConstructors()):
+            cons = dt[i]
+            if (kind == Kind.APPLY_CONSTRUCTOR and cons.getTerm() == op) or (
+                    kind == Kind.APPLY_TESTER and cons.getTesterTerm() == op):
+                return (self.exportSort(sort), i, -1)
+            for j in range(cons.getNumSelectors()):
+                sel = cons[j]
+                if (kind == Kind.APPLY_SELECTOR and sel.getTerm() == op) or (
+                        kind == Kind.APPLY_UPDATER
+                        and sel.getUpdaterTerm() == op):
+                    return (self.exportSort(sort), i, j)
+        raise ValueError("Cannot export term {}".format(term))
+
+    def _record(self, Term term):
+        """
+            :return: The exported ``term``, whose children are exported
+                     already.
+        """
+        kind = term.getKind()
+        k = kind.value
+        if kind == Kind.CONSTANT or kind == Kind.VARIABLE:
+            return (k, self.exportSort(term.getSort()),
+                    term.getSymbol() if term.hasSymbol() else None)
+        if kind == Kind.CONST_BOOLEAN:
+            return (k, term.getBooleanValue())
+        if kind == Kind.CONST_INTEGER:
+            return (k, str(term.getIntegerValue()))
+        if kind == Kind.CONST_RATIONAL:
+            return (k, str(term.getRealValue()))
+        if kind == Kind.CONST_BITVECTOR:
+            return (k, term.getSort().getBitVectorSize(),
+                    term.getBitVectorValue(2))
+        if kind == Kind.CONST_FINITE_FIELD:
+            return (k, self.exportSort(term.getSort()),
+                    str(term.getFiniteFieldValue()))
+        if kind == Kind.CONST_FLOATINGPOINT:
+            exp, sig, bv = term.getFloatingPointValue()
+            return (k, exp, sig, bv.getBitVectorValue(2))
+        if kind == Kind.CONST_ROUNDINGMODE:
+            return (k, term.getRoundingModeValue().value)
+        if kind == Kind.CONST_STRING:
+            return (k, term.getStringValue())
+        if kind == Kind.CONST_ARRAY:
+            return (k, self.exportSort(term.getSort()),
+                    self.termIds[term.getConstArrayBase()])
+        if kind == Kind.CONST_SEQUENCE:
+            return (k, self.exportSort(term.getSort()),
+                    tuple(self.termIds[e] for e in term.getSequenceValue()))
+        if kind in _VALUE_SORT_KINDS:
+            return (k, self.exportSort(term.getSort()))
+        if kind == Kind.CARDINALITY_CONSTRAINT:
+            sort, bound = term.getCardinalityConstraint()
+            return (k, self.exportSort(sort), bound)
+        if term.getNumChildren() == 0 and kind not in _NULLARY_KINDS:
+            raise ValueError("Cannot export term {}".format(term))
+        indices = None
+        if term.hasOp() and term.getOp().isIndexed():
+            op = term.getOp()
+            indices = tuple(op[i].getIntegerValue()
+                            for i in range(op.getNumIndices()))
+        dtop = None
+        if kind in _DATATYPE_APPLY_KINDS:
+            dtop = self._datatypeOp(term)
+        return (k, indices,
+                tuple(self.termIds[c] for c in self._children(term)), dtop)
+
+
+class TermImporter:
+    """
+        Imports terms and sorts that were exported from term managers of
+        other threads with :py:meth:`TermManager.exportTerms()` into the
+        term manager ``tm``. This is the supported way of transferring terms
+        between threads, see :py:class:`TermManager`.
+
+        Free constants and uninterpreted sorts are identified by their
+        symbol and datatypes by their name: importing a constant with the
+        same symbol and sort (or a sort with the same symbol or name) again,
+        even from a different export or thread, yields the same constant (or
+        sort). Constants and uninterpreted sorts without a symbol are
+        distinct for every call to :py:meth:`importTerms()`. Bound
+        variables are always distinct for every call.
+
+        The importer must only be used in the thread of ``tm``.
+
+        :param tm: The term manager to import the terms into.
+    """
+
+    def __init__(self, TermManager tm):
+        self.tm = tm
+        # The imported constants by symbol and sort
+        self.constants = {}
+        # The imported uninterpreted and datatype sorts by sort kind and
+        # symbol or name
+        self.sorts = {}
+
+    def importTerms(self, exported):
+        """
+            Import the terms and sorts of ``exported``.
+
+            :param exported: The :py:class:`TermExport` to import.
+            :return: The imported terms and sorts, in the same order as they
+                     were passed to :py:meth:`TermManager.exportTerms()`.
+        """
+        sorts = [None] * len(exported.sorts)
+        for i in range(len(sorts)):
+            self._importSort(exported.sorts, sorts, i)
+        terms = []
+        for record in exported.terms:
+            terms.append(self._importTerm(record, sorts, terms))
+        return [terms[i] if isTerm else sorts[i]
+                for isTerm, i in exported.roots]
+
+    def _importSort(self, records, sorts, i, placeholders=None):
+        """
+            Import the sort at index ``i`` of ``records`` into ``sorts``.
+            Within the declaration of a group of mutually recursive
+            datatypes, ``placeholders`` maps the indices of these datatypes to
+            unresolved sorts and the result is not stored.
+        """
+        if placeholders is not None and i in placeholders:
+            return placeholders[i]
+        if sorts[i] is not None:
+            return sorts[i]
+        tm = self.tm
+        record = records[i]
+        kind = SortKind(record[0])
+        sub = lambda j: self._importSort(records, sorts, j, placeholders)
+        if kind == SortKind.DATATYPE_SORT and not record[1]:
+            self._importDatatypes(records, sorts, i)
+            return sorts[i]
+        if kind == SortKind.BOOLEAN_SORT:
+            res = tm.getBooleanSort()
+        elif kind == SortKind.INTEGER_SORT:
+            res = tm.getIntegerSort()
+        elif kind == SortKind.REAL_SORT:
+            res = tm.getRealSort()
+        elif kind == SortKind.REGLAN_SORT:
+            res = tm.getRegExpSort()
+        elif kind == SortKind.ROUNDINGMODE_SORT:
+            res = tm.getRoundingModeSort()
+        elif kind == SortKind.STRING_SORT:
+            res = tm.getStringSort()
+        elif kind == SortKind.BITVECTOR_SORT:
+            res = tm.mkBitVectorSort(record[1])
+        elif kind == SortKind.FLOATINGPOINT_SORT:
+            res = tm.mkFloatingPointSort(record[1], record[2])
+        elif kind == SortKind.FINITE_FIELD_SORT:
+            res = tm.mkFiniteFieldSort(record[1])
+        elif kind == SortKind.ARRAY_SORT:
+            res = tm.mkArraySort(sub(record[1]), sub(record[2]))
+        elif kind == SortKind.SET_SORT:
+            res = tm.mkSetSort(sub(record[1]))
+        elif kind == SortKind.BAG_SORT:
+            res = tm.mkBagSort(sub(record[1]))
+        elif kind == SortKind.SEQUENCE_SORT:
+            res = tm.mkSequenceSort(sub(record[1]))
+        elif kind == SortKind.NULLABLE_SORT:
+            res = tm.mkNullableSort(sub(record[1]))
+        elif kind == SortKind.TUPLE_SORT:
+            res = tm.mkTupleSort(*[sub(j) for j in record[1]])
+        elif kind == SortKind.FUNCTION_SORT:
+            res = tm.mkFunctionSort([sub(j) for j in record[1]],
+                                    sub(record[2]))
+        elif kind == SortKind.DATATYPE_SORT:
+            res = tm.mkRecordSort(*[(name, sub(j)) for name, j in record[2]])
+        else:
+            symbol = record[1]
+            if symbol is None:
+                res = tm.mkUninterpretedSort()
+            else:
+                res = self.sorts.get((kind, symbol))
+                if res is None:
+                    res = tm.mkUninterpretedSort(symbol)
+                    self.sorts[(kind, symbol)] = res
+        if placeholders is None:
+            sorts[i] = res
+        return res
+
+    def _importDatatypes(self, records, sorts, i):
+        """
+            Import the datatype at index ``i`` of ``records`` together with
+            the datatypes that it refers to and that are not imported yet.
+        """
+        tm = self.tm
+        # Collect the datatypes that are declared together
+        group = []
+        visited = set()
+        visit = [i]
+        while visit:
+            j = visit.pop()
+            if j in visited or sorts[j] is not None:
+                continue
+            visited.add(j)
+            record = records[j]
+            kind = SortKind(record[0])
+            if kind == SortKind.DATATYPE_SORT and not record[1]:
+                sort = self.sorts.get((kind, record[2]))
+                if sort is not None:
+                    sorts[j] = sort
+                    continue
+                group.append(j)
+                visit.extend(k for _, sels in record[4] for _, k in sels)
+            elif kind in (SortKind.ARRAY_SORT, SortKind.SET_SORT,
+                          SortKind.BAG_SORT, SortKind.SEQUENCE_SORT,
+                          SortKind.NULLABLE_SORT):
+                visit.extend(record[1:])
+            elif kind == SortKind.TUPLE_SORT:
+                visit.extend(record[1])
+            elif kind == SortKind.FUNCTION_SORT:
+                visit.extend(record[1])
+                visit.append(record[2])
+            elif kind == SortKind.DATATYPE_SORT:
+                visit.extend(k for _, k in record[2])
+        if not group:
+            return
+        placeholders = {
+            j: tm.mkUnresolvedDatatypeSort(records[j][2]) for j in group
+        }
+        decls = []
+        for j in group:
+            _, _, name, isCodatatype, constructors = records[j]
+            decl = tm.mkDatatypeDecl(name, isCodatatype)
+            for consName, sels in constructors:
+                cons = tm.mkDatatypeConstructorDecl(consName)
+                for selName, k in sels:
+                    cons.addSelector(
+                        selName,
+                        self._importSort(records, sorts, k, placeholders))
+                decl.addConstructor(cons)
+            decls.append(decl)
+        for j, sort in zip(group, tm.mkDatatypeSorts(decls)):
+            sorts[j] = sort
+            self.sorts[(SortKind.DATATYPE_SORT, records[j][2])] = sort
+
+    def _importTerm(self, record, sorts, terms):
+        """
+            :return: The term of ``record``, whose children are imported
+                     already.
+        """
+        tm = self.tm
+        kind = Kind(record[0])
+        if kind == Kind.CONSTANT:
+            sort, symbol = sorts[record[1]], record[2]
+            if symbol is None:
+                return tm.mkConst(sort)
+            res = self.constants.get((symbol, sort))
+            if res is None:
+                res = tm.mkConst(sort, symbol)
+                self.constants[(symbol, sort)] = res
+            return res
+        if kind == Kind.VARIABLE:
+            return tm.mkVar(sorts[record[1]], record[2])
+        if kind == Kind.CONST_BOOLEAN:
+            return tm.mkBoolean(record[1])
+        if kind == Kind.CONST_INTEGER:
+            return tm.mkInteger(record[1])
+        if kind == Kind.CONST_RATIONAL:
+            return tm.mkReal(record[1])
+        if kind == Kind.CONST_BITVECTOR:
+            return tm.mkBitVector(record[1], record[2], 2)
+        if kind == Kind.CONST_FINITE_FIELD:
+            return tm.mkFiniteFieldElem(record[2], sorts[record[1]])
+        if kind == Kind.CONST_FLOATINGPOINT:
+            return tm.mkFloatingPoint(
+                record[1], record[2],
+                tm.mkBitVector(record[1] + record[2], record[3], 2))
+        if kind == Kind.CONST_ROUNDINGMODE:
+            return tm.mkRoundingMode(RoundingMode(record[1]))
+        if kind == Kind.CONST_STRING:
+            return tm.mkString(record[1])
+        if kind == Kind.CONST_ARRAY:
+            return tm.mkConstArray(sorts[record[1]], terms[record[2]])
+        if kind == Kind.CONST_SEQUENCE:
+            sort = sorts[record[1]]
+            if not record[2]:
+                return tm.mkEmptySequence(sort.getSequenceElementSort())
+            units = [tm.mkTerm(Kind.SEQ_UNIT, terms[j]) for j in record[2]]
+            if len(units) == 1:
+                return units[0]
+            return tm.mkTerm(Kind.SEQ_CONCAT, *units)
+        if kind == Kind.SET_EMPTY:
+            return tm.mkEmptySet(sorts[record[1]])
+        if kind == Kind.SET_UNIVERSE:
+            return tm.mkUniverseSet(sorts[record[1]])
+        if kind == Kind.BAG_EMPTY:
+            return tm.mkEmptyBag(sorts[record[1]])
+        if kind == Kind.SEP_NIL:
+            return tm.mkSepNil(sorts[record[1]])
+        if kind == Kind.CARDINALITY_CONSTRAINT:
+            return tm.mkCardinalityConstraint(sorts[record[1]], record[2])
+        _, indices, children, dtop = record
+        args = [terms[j] for j in children]
+        if dtop is not None:
+            cons = sorts[dtop[0]].getDatatype()[dtop[1]]
+            if kind == Kind.APPLY_CONSTRUCTOR:
+                op = cons.getTerm()
+            elif kind == Kind.APPLY_TESTER:
+                op = cons.getTesterTerm()
+            elif kind == Kind.APPLY_SELECTOR:
+                op = cons[dtop[2]].getTerm()
+            else:
+                op = cons[dtop[2]].getUpdaterTerm()
+            args.insert(0, op)
+        if indices:
+            return tm.mkTerm(tm.mkOp(kind, *indices), *args)
+        return tm.mkTerm(kind, *args)
+
 
 # ----------------------------------------------------------------------------
 # Solver
@@ -2957,6 +3504,32 @@ cdef class Solver:
         """
         self.csolver.assertFormula(term.cterm)
 
+    def assertFormulas(self, terms):
+        """
+            Assert a list of formulas.
+
+            Equivalent to calling :py:meth:`assertFormula()` for each formula
+            in order, but the formulas are asserted in a single call with the
+            GIL released.
+
+            SMT-LIB:
+
+            .. code-block:: smtlib
+
+                ( assert <term> )*
+
+            :param terms: The formulas to assert.
+        """
+        cdef vector[c_Term] v
+        cdef size_t i
+        if isinstance(terms, (list, tuple)):
+            v.reserve(len(terms))
+        for t in terms:
+            v.push_back((<Term?> t).cterm)
+        with nogil:
+            for i in range(v.size()):
+                self.csolver.assertFormula(v[i])
+
     def checkSat(self):
         """
             Check satisfiability.
@@ -3237,12 +3810,16 @@ cdef class Solver:
 
                 ( check-sat-assuming ( <prop_literal> ) )
 
-            :param assumptions: The formulas to assume.
+            :param assumptions: The formulas to assume, either as separate
+                                arguments or as a single list or tuple.
             :return: The result of the satisfiability check.
         """
         cdef Result r = Result()
         # used if assumptions is a list of terms
         cdef vector[c_Term] v
+        if len(assumptions) == 1 and isinstance(assumptions[0], (list, tuple)):
+            assumptions = assumptions[0]
+        v.reserve(len(assumptions))
         for a in assumptions:
             v.push_back((<Term?> a).cterm)
         r.cr = self.csolver.checkSatAssuming(<const vector[c_Term]&> v)
@@ -3560,6 +4137,10 @@ cdef class Solver:
             Get some information about the given option.
             Returns the information provided by the C++
             :cpp:class:`OptionInfo <cvc5::OptionInfo>` as a dictionary.
+            Every call queries the C++ API. Only the conversion of the
+            parts that do not change (everything except the current value
+            and whether it was set by the user) to Python objects is
+            cached across calls.
 
             :return: Information about the given option.
         """
@@ -3572,66 +4153,91 @@ cdef class Solver:
         cdef c_OptionInfo.ModeInfo mi
 
         oi = self.csolver.getOptionInfo(option.encode())
-        # generic information
-        res = {
-            'name': oi.name.decode(),
-            'aliases': [s.decode() for s in oi.aliases],
-            'setByUser': oi.setByUser,
-        }
-
-        # now check which type is actually in the variant
-        if c_holds[c_OptionInfo.VoidInfo](oi.valueInfo):
-            # it's a void
-            res['type'] = None
-        elif c_holds[c_OptionInfo.ValueInfo[c_bool]](oi.valueInfo):
-            # it's a bool
-            res['type'] = bool
+        info = _option_info_cache.get(option)
+        if info is None:
+            # generic information
+            info = {
+                'name': oi.name.decode(),
+                'aliases': [s.decode() for s in oi.aliases],
+            }
+
+            # now check which type is actually in the variant
+            if c_holds[c_OptionInfo.VoidInfo](oi.valueInfo):
+                # it's a void
+                info['type'] = None
+            elif c_holds[c_OptionInfo.ValueInfo[c_bool]](oi.valueInfo):
+                # it's a bool
+                info['type'] = bool
+                vib = c_getVariant[c_OptionInfo.ValueInfo[c_bool]](
+                    oi.valueInfo)
+                info['default'] = vib.defaultValue
+            elif c_holds[c_OptionInfo.ValueInfo[string]](oi.valueInfo):
+                # it's a string
+                info['type'] = str
+                vis = c_getVariant[c_OptionInfo.ValueInfo[string]](
+                    oi.valueInfo)
+                info['default'] = vis.defaultValue.decode()
+            elif c_holds[c_OptionInfo.NumberInfo[int64_t]](oi.valueInfo):
+                # it's an int64_t
+                info['type'] = int
+                nii = c_getVariant[c_OptionInfo.NumberInfo[int64_t]](
+                    oi.valueInfo)
+                info['default'] = nii.defaultValue
+                info['minimum'] = nii.minimum.value() \
+                    if nii.minimum.has_value() else None
+                info['maximum'] = nii.maximum.value() \
+                    if nii.maximum.has_value() else None
+            elif c_holds[c_OptionInfo.NumberInfo[uint64_t]](oi.valueInfo):
+                # it's a uint64_t
+                info['type'] = int
+                niu = c_getVariant[c_OptionInfo.NumberInfo[uint64_t]](
+                    oi.valueInfo)
+                info['default'] = niu.defaultValue
+                info['minimum'] = niu.minimum.value() \
+                    if niu.minimum.has_value() else None
+                info['maximum'] = niu.maximum.value() \
+                    if niu.maximum.has_value() else None
+            elif c_holds[c_OptionInfo.NumberInfo[double]](oi.valueInfo):
+                # it's a double
+                info['type'] = float
+                nid = c_getVariant[c_OptionInfo.NumberInfo[double]](
+                    oi.valueInfo)
+                info['default'] = nid.defaultValue
+                info['minimum'] = nid.minimum.value() \
+                    if nid.minimum.has_value() else None
+                info['maximum'] = nid.maximum.value() \
+                    if nid.maximum.has_value() else None
+            elif c_holds[c_OptionInfo.ModeInfo](oi.valueInfo):
+                # it's a mode
+                info['type'] = 'mode'
+                mi = c_getVariant[c_OptionInfo.ModeInfo](oi.valueInfo)
+                info['default'] = mi.defaultValue.decode()
+                info['modes'] = [s.decode() for s in mi.modes]
+            _option_info_cache[option] = info
+
+        # copy the lists such that the cached information is never modified
+        res = {k: list(v) if isinstance(v, list) else v
+               for k, v in info.items()}
+        res['setByUser'] = oi.setByUser
+        if c_holds[c_OptionInfo.ValueInfo[c_bool]](oi.valueInfo):
             vib = c_getVariant[c_OptionInfo.ValueInfo[c_bool]](oi.valueInfo)
             res['current'] = vib.currentValue
-            res['default'] = vib.defaultValue
         elif c_holds[c_OptionInfo.ValueInfo[string]](oi.valueInfo):
-            # it's a string
-            res['type'] = str
             vis = c_getVariant[c_OptionInfo.ValueInfo[string]](oi.valueInfo)
             res['current'] = vis.currentValue.decode()
-            res['default'] = vis.defaultValue.decode()
         elif c_holds[c_OptionInfo.NumberInfo[int64_t]](oi.valueInfo):
-            # it's an int64_t
-            res['type'] = int
             nii = c_getVariant[c_OptionInfo.NumberInfo[int64_t]](oi.valueInfo)
             res['current'] = nii.currentValue
-            res['default'] = nii.defaultValue
-            res['minimum'] = nii.minimum.value() \
-                if nii.minimum.has_value() else None
-            res['maximum'] = nii.maximum.value() \
-                if nii.maximum.has_value() else None
         elif c_holds[c_OptionInfo.NumberInfo[uint64_t]](oi.valueInfo):
-            # it's a uint64_t
-            res['type'] = int
-            niu = c_getVariant[c_OptionInfo.NumberInfo[uint64_t]](oi.valueInfo)
+            niu = c_getVariant[c_OptionInfo.NumberInfo[uint64_t]](
+                oi.valueInfo)
             res['current'] = niu.currentValue
-            res['default'] = niu.defaultValue
-            res['minimum'] = niu.minimum.value() \
-                if niu.minimum.has_value() else None
-            res['maximum'] = niu.maximum.value() \
-                if niu.maximum.has_value() else None
         elif c_holds[c_OptionInfo.NumberInfo[double]](oi.valueInfo):
-            # it's a double
-            res['type'] = float
             nid = c_getVariant[c_OptionInfo.NumberInfo[double]](oi.valueInfo)
             res['current'] = nid.currentValue
-            res['default'] = nid.defaultValue
-            res['minimum'] = nid.minimum.value() \
-                if nid.minimum.has_value() else None
-            res['maximum'] = nid.maximum.value() \
-                if nid.maximum.has_value() else None
         elif c_holds[c_OptionInfo.ModeInfo](oi.valueInfo):
-            # it's a mode
-            res['type'] = 'mode'
             mi = c_getVariant[c_OptionInfo.ModeInfo](oi.valueInfo)
             res['current'] = mi.currentValue.decode()
-            res['default'] = mi.defaultValue.decode()
-            res['modes'] = [s.decode() for s in mi.modes]
         return res
 
     def getUnsatAssumptions(self):
@@ -4141,6 +4747,40 @@ cdef class Solver:
         """
         self.csolver.setOption(option.encode(), value.encode())
 
+    def setOptions(self, dict options):
+        """
+            Set multiple options at once.
+
+            The values may be given as Python values of the type of the
+            option (``bool``, ``int``, ``float``, or ``str`` for string and
+            mode options) or as strings as for
+            :py:meth:`Solver.setOption()`. All values are checked against
+            the type, the range and the modes of their option before any
+            option is set. The options are then set in the order of the
+            dictionary.
+
+            :param options: A dictionary from option names to values.
+        """
+        cdef vector[pair[string, string]] values
+        cdef pair[string, string] value
+        for name, v in options.items():
+            values.push_back(pair[string, string](
+                name.encode(), _option_to_string(name, v).encode()))
+        for value in values:
+            self.csolver.setOption(value.first, value.second)
+
+    @property
+    def options(self):
+        """
+            Typed access to the options of this solver, e.g.,
+            ``solver.options.tlimit_per = 500``. The attributes are the
+            option names with ``-`` replaced by ``_``. Values are checked
+            and converted as for :py:meth:`Solver.setOptions()`.
+
+            :return: A :py:class:`SolverOptions` object for this solver.
+        """
+        return SolverOptions(self)
+
 
     def getInterpolant(self, Term conj, Grammar grammar=None):
         """
@@ -4300,6 +4940,69 @@ cdef class Solver:
             nts.push_back((<Term?> t).cterm)
         self.csolver.blockModelValues(nts)
 
+    def iterModels(self, terms, limit=None, block_mode=None,
+                   as_python_obj=False):
+        """
+           Enumerate the models of the current assertions projected onto
+           the given terms.
+
+           This is a generator that repeatedly checks satisfiability, yields
+           the values of the given terms in the current model and blocks
+           these values (see :py:meth:`blockModelValues()`) before the next
+           check. The enumeration stops when the assertions become
+           unsatisfiable, the result is unknown, or ``limit`` models have
+           been yielded. The GIL is released while the solver is running.
+
+           Requires enabling option
+           :ref:`produce-models <lbl-option-produce-models>` and, for more
+           than one model, :ref:`incremental <lbl-option-incremental>`.
+
+           .. warning:: This function is experimental and may change in future
+                        versions.
+
+           :param terms: The terms to project the models onto.
+           :param limit: The maximum number of models to enumerate, or
+                         ``None`` for all models.
+           :param block_mode: If ``None``, the values of ``terms`` are blocked
+                              after each model. Otherwise, the whole model is
+                              blocked using :py:meth:`blockModel()` with the
+                              given :py:obj:`BlockModelsMode`.
+           :param as_python_obj: If ``True``, yield the values converted
+                                 via :py:meth:`Term.toPythonObj()` instead
+                                 of terms.
+           :return: A generator of tuples with the values of ``terms``.
+        """
+        cdef vector[c_Term] nts
+        cdef vector[c_Term] values
+        cdef c_Result r
+        cdef c_bool sat
+        cdef c_bool useMode = block_mode is not None
+        cdef c_BlockModelsMode mode
+        cdef int64_t count = 0
+        cdef int64_t maxCount = -1 if limit is None else limit
+        for t in terms:
+            nts.push_back((<Term?> t).cterm)
+        if useMode:
+            mode = <c_BlockModelsMode> block_mode.value
+        while maxCount < 0 or count < maxCount:
+            with nogil:
+                if count > 0:
+                    if useMode:
+                        self.csolver.blockModel(mode)
+                    else:
+                        self.csolver.blockModelValues(nts)
+                r = self.csolver.checkSat()
+                sat = r.isSat()
+                if sat:
+                    values = self.csolver.getValue(nts)
+            if not sat:
+                return
+            if as_python_obj:
+                yield tuple(_term(self.tm, v).toPythonObj() for v in values)
+            else:
+                yield tuple(_term(self.tm, v) for v in values)
+            count += 1
+
     def getInstantiations(self):
         """
             Return a string that contains information about all instantiations
@@ -4327,6 +5030,537 @@ cdef class Solver:
         return self.csolver.getVersion()
 
 
+# ----------------------------------------------------------------------------
+# SolverOptions
+# ----------------------------------------------------------------------------
+
+# The static parts of the results of Solver.getOptionInfo() converted to
+# Python objects, by option name
+_option_info_cache = {}
+
+
+def _option_to_string(name, value):
+    """
+        Convert the value of an option to the string expected by
+        :py:meth:`Solver.setOption()`, using the option metadata from
+        ``cvc5options.pxi``. Strings are passed unchanged.
+    """
+    metadata = _option_metadata.get(name)
+    if metadata is None:
+        raise ValueError("Unrecognized option: {}".format(name))
+    if isinstance(value, str):
+        if metadata[1] == 'mode' and value not in metadata[4] \
+                and value != 'help':
+            raise ValueError(
+                "Invalid value '{}' for option {}, expected one of {}".format(
+                    value, name, ', '.join(metadata[4])))
+        return value
+    _, kind, minimum, maximum, _, ctype = metadata
+    if kind == 'bool' and isinstance(value, bool):
+        return 'true' if value else 'false'
+    if kind == 'int' and isinstance(value, int) \
+            and not isinstance(value, bool):
+        if value < minimum or value > maximum:
+            raise ValueError(
+                "Value {} for option {} is not in [{}, {}]".format(
+                    value, name, minimum, maximum))
+        return str(value)
+    if kind == 'float' and isinstance(value, (int, float)) \
+            and not isinstance(value, bool):
+        if (minimum is not None and value < minimum) \
+                or (maximum is not None and value > maximum):
+            raise ValueError(
+                "Value {} for option {} is not in [{}, {}]".format(
+                    value, name, minimum, maximum))
+        return repr(float(value))
+    if kind in ('bool', 'int', 'str'):
+        expected = kind
+    elif kind == 'float':
+        expected = 'float or int'
+    elif kind == 'mode':
+        expected = 'str (one of {})'.format(', '.join(metadata[4]))
+    else:
+        # options of all other types can only be set from strings
+        expected = 'str (parsed as {})'.format(ctype)
+    raise ValueError(
+        "Invalid value {!r} of type {} for option {}, expected {}".format(
+            value, type(value).__name__, name, expected))
+
+
+def _option_from_string(name, value):
+    """
+        Convert the string returned by :py:meth:`Solver.getOption()` to a
+        Python value of the type of the option.
+    """
+    kind = _option_metadata[name][1]
+    if kind == 'bool':
+        return value == 'true'
+    if kind == 'int':
+        return int(value)
+    if kind == 'float':
+        return float(value)
+    return value
+
+
+class SolverOptions:
+    """
+        Typed access to the options of a :py:class:`Solver`, see
+        :py:attr:`Solver.options`. Reading an attribute returns the current
+        value of the option as a Python value, writing an attribute sets the
+        option. The options and their types are generated from the option
+        definitions of cvc5.
+    """
+
+    def __init__(self, Solver solver):
+        object.__setattr__(self, '_solver', solver)
+
+    def __getattr__(self, attr):
+        name = attr.replace('_', '-')
+        if name not in _option_metadata:
+            raise AttributeError("Unrecognized option: {}".format(attr))
+        return _option_from_string(name, self._solver.getOption(name))
+
+    def __setattr__(self, attr, value):
+        name = attr.replace('_', '-')
+        if name not in _option_metadata:
+            raise AttributeError("Unrecognized option: {}".format(attr))
+        self._solver.setOption(name, _option_to_string(name, value))
+
+    def __dir__(self):
+        return sorted(name.replace('-', '_') for name in _option_metadata)
+
+
+# ----------------------------------------------------------------------------
+# AssumptionCache
+# ----------------------------------------------------------------------------
+
+cdef class AssumptionCache:
+    """
+        An opt-in cache for the results of
+        :py:meth:`Solver.checkSatAssuming()`.
+
+        Results are keyed by the set of assumption term ids and the level of
+        the assertion stack. Besides exact hits, a query is answered without
+        calling the solver if its assumptions are a superset of a cached
+        unsat core (obtained via :py:meth:`Solver.getUnsatAssumptions()` if
+        option :ref:`produce-unsat-assumptions
+        <lbl-option-produce-unsat-assumptions>` is enabled), or a subset of
+        the assumptions of a cached satisfiable query at the current level.
+        Unknown results are not cached. The number of cached entries is
+        bounded and the least recently used entries are evicted first.
+
+        The cache can only track the assertion stack if all calls to
+        ``push``, ``pop``, ``assertFormula``, ``assertFormulas`` and
+        ``resetAssertions`` go through the cache. If the solver is modified
+        directly, :py:meth:`clear()` must be called.
+
+        .. note:: If a query is answered from the cache, the solver is not
+                  invoked. Functions that refer to the last check (e.g.,
+                  :py:meth:`Solver.getValue()`) then still refer to the
+                  last query that was sent to the solver.
+
+        .. warning:: This class is experimental and may change in future
+                     versions.
+    """
+    cdef Solver solver
+    cdef object entries
+    cdef size_t maxSize
+    cdef uint32_t level
+    cdef size_t hits
+    cdef size_t misses
+
+    def __cinit__(self, Solver solver, size_t maxSize=1024):
+        """
+            :param solver: The solver whose queries are cached.
+            :param maxSize: The maximum number of cached results.
+        """
+        self.solver = solver
+        # maps (level, frozenset of ids) to (result, frozenset of ids), where
+        # the second set is the unsat core for unsat results and the set of
+        # assumptions for sat results
+        self.entries = OrderedDict()
+        self.maxSize = maxSize
+        self.level = 0
+        self.hits = 0
+        self.misses = 0
+
+    def getSolver(self):
+        """
+            :return: The solver whose queries are cached.
+        """
+        return self.solver
+
+    def getNumHits(self):
+        """
+            :return: The number of queries answered from the cache.
+        """
+        return self.hits
+
+    def getNumMisses(self):
+        """
+            :return: The number of queries sent to the solver.
+        """
+        return self.misses
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        """
+            Remove all cached results.
+        """
+        self.entries.clear()
+
+    def checkSatAssuming(self, *assumptions):
+        """
+            Check satisfiability assuming the given formulas, answering from
+            the cache if possible. See :py:meth:`Solver.checkSatAssuming()`.
+
+            :param assumptions: The formulas to assume, either as separate
+                                arguments or as a single list or tuple.
+            :return: The result of the satisfiability check.
+        """
+        if len(assumptions) == 1 and isinstance(assumptions[0], (list, tuple)):
+            assumptions = assumptions[0]
+        ids = frozenset((<Term?> a).getId() for a in assumptions)
+        key = (self.level, ids)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        for k, (res, lits) in reversed(self.entries.items()):
+            if res.isUnsat() and k[0] <= self.level and lits <= ids:
+                self.entries.move_to_end(k)
+                self.hits += 1
+                return res
+            if res.isSat() and k[0] == self.level and ids <= lits:
+                self.entries.move_to_end(k)
+                self.hits += 1
+                return res
+        self.misses += 1
+        res = self.solver.checkSatAssuming(assumptions)
+        if res.isUnsat():
+            if self.solver.getOption("produce-unsat-assumptions") == "true":
+                lits = frozenset(
+                    a.getId() for a in self.solver.getUnsatAssumptions())
+            else:
+                lits = ids
+            self._insert(key, res, lits)
+        elif res.isSat():
+            self._insert(key, res, ids)
+        return res
+
+    cdef _insert(self, key, res, lits):
+        self.entries[key] = (res, lits)
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    cdef _dropIf(self, pred):
+        for k in [k for k, (res, _) in self.entries.items() if pred(k, res)]:
+            del self.entries[k]
+
+    def assertFormula(self, Term term):
+        """
+            Assert a formula and invalidate the cached satisfiable results of
+            the current level. See :py:meth:`Solver.assertFormula()`.
+
+            :param term: The formula to assert.
+        """
+        self.solver.assertFormula(term)
+        self._dropIf(lambda k, res: k[0] == self.level and res.isSat())
+
+    def assertFormulas(self, terms):
+        """
+            Assert a list of formulas and invalidate the cached satisfiable
+            results of the current level. See
+            :py:meth:`Solver.assertFormulas()`.
+
+            :param terms: The formulas to assert.
+        """
+        self.solver.assertFormulas(terms)
+        self._dropIf(lambda k, res: k[0] == self.level and res.isSat())
+
+    def push(self, nscopes=1):
+        """
+            Push ``nscopes`` level(s) to the assertion stack. See
+            :py:meth:`Solver.push()`.
+
+            :param nscopes: The number of levels to push.
+        """
+        self.solver.push(nscopes)
+        self.level += nscopes
+
+    def pop(self, nscopes=1):
+        """
+            Pop ``nscopes`` level(s) from the assertion stack and drop the
+            cached results of these levels. See :py:meth:`Solver.pop()`.
+
+            :param nscopes: The number of levels to pop.
+        """
+        self.solver.pop(nscopes)
+        self.level -= nscopes
+        self._dropIf(lambda k, res: k[0] > self.level)
+
+    def resetAssertions(self):
+        """
+            Remove all assertions and clear the cache. See
+            :py:meth:`Solver.resetAssertions()`.
+        """
+        self.solver.resetAssertions()
+        self.level = 0
+        self.entries.clear()
+
+
+# ----------------------------------------------------------------------------
+# QueryCache
+# ----------------------------------------------------------------------------
+
+cdef vector[c_Term] _freeConstants(const vector[c_Term]& terms,
+                                   vector[c_Sort]& sorts):
+    """
+        Collect the free constants in ``terms`` in the order of their first
+        occurrence in a left-to-right, depth-first traversal. The sorts of
+        all subterms are added to ``sorts`` in the same order.
+    """
+    cdef vector[c_Term] res
+    cdef vector[c_Term] visit
+    cdef c_set[uint64_t] visited
+    cdef c_set[c_Sort] visitedSorts
+    cdef c_Term cur
+    cdef size_t i
+    for i in range(terms.size()):
+        visit.push_back(terms[terms.size() - 1 - i])
+    while not visit.empty():
+        cur = visit.back()
+        visit.pop_back()
+        if not visited.insert(cur.getId()).second:
+            continue
+        if visitedSorts.insert(cur.getSort()).second:
+            sorts.push_back(cur.getSort())
+        if cur.getKind() == c_Kind.CONSTANT:
+            res.push_back(cur)
+        for i in range(cur.getNumChildren()):
+            visit.push_back(cur[cur.getNumChildren() - 1 - i])
+    return res
+
+
+def _datatypeDeclarations(sorts):
+    """
+        Get the declarations of all datatypes that occur in ``sorts``,
+        including the datatypes in the sorts of their selectors, in the order
+        of their first occurrence.
+    """
+    res = []
+    visited = set()
+    visit = list(reversed(sorts))
+    while visit:
+        sort = visit.pop()
+        if sort in visited:
+            continue
+        visited.add(sort)
+        if sort.isDatatype():
+            dt = sort.getDatatype()
+            res.append(str(dt))
+            children = [sel.getCodomainSort() for cons in dt for sel in cons]
+        elif sort.isArray():
+            children = [sort.getArrayIndexSort(), sort.getArrayElementSort()]
+        elif sort.isFunction():
+            children = sort.getFunctionDomainSorts() + [
+                sort.getFunctionCodomainSort()]
+        elif sort.isSet():
+            children = [sort.getSetElementSort()]
+        elif sort.isBag():
+            children = [sort.getBagElementSort()]
+        elif sort.isSequence():
+            children = [sort.getSequenceElementSort()]
+        else:
+            children = []
+        visit.extend(reversed(children))
+    return res
+
+
+cdef class QueryCache:
+    """
+        A persistent cache for the results of :py:meth:`Solver.checkSat()`.
+
+        Results are stored in an SQLite database at a given path and can be
+        shared across runs and processes. A query is identified by the hash
+        of a canonical form of the current assertions (see
+        :py:meth:`Solver.getAssertions()`) together with the logic and the
+        values of all options. In the canonical form, free constants are
+        renamed in the order of their first occurrence, i.e., queries that
+        only differ in the names of their declared symbols share the same
+        entry. Names of uninterpreted sorts and bound variables are not
+        renamed. The declarations of all datatypes in the query (their
+        constructors and selectors with their sorts) are part of the
+        canonical form. Unknown results are not cached.
+
+        If option :ref:`produce-models <lbl-option-produce-models>` is
+        enabled, the values of the free constants are stored with
+        satisfiable results. If option :ref:`produce-unsat-cores
+        <lbl-option-produce-unsat-cores>` is enabled, the unsat core is
+        stored with unsatisfiable results.
+
+        Cache entries are returned as dictionaries with the keys ``result``
+        (the string representation of the :py:class:`Result`), ``model`` (a
+        dictionary that maps free constants to the string representation of
+        their values, or ``None``), ``unsatCore`` (a list of assertions, or
+        ``None``) and ``cached`` (whether the entry was read from the cache).
+        The values in ``model`` are strings and not :py:class:`Term` objects,
+        also if the entry was just computed, since the database cannot store
+        terms.
+
+        .. warning:: This class is experimental and may change in future
+                     versions.
+    """
+    cdef object db
+    # maps (sort, i) to the constant _i of this sort that replaces the i-th
+    # free constant in the canonical form
+    cdef dict renamed
+
+    def __cinit__(self, str path):
+        """
+            :param path: The path of the database file.
+        """
+        import sqlite3
+        self.renamed = {}
+        self.db = sqlite3.connect(path, timeout=60)
+        with self.db:
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, result TEXT NOT NULL, '
+                'model TEXT, core TEXT)')
+
+    def close(self):
+        """
+            Close the database.
+        """
+        self.db.close()
+
+    cdef _canonicalize(self, Solver solver):
+        cdef vector[c_Term] assertions = solver.csolver.getAssertions()
+        cdef vector[c_Sort] sorts
+        cdef vector[c_Term] consts = _freeConstants(assertions, sorts)
+        cdef vector[c_Term] renamed
+        cdef size_t i
+        h = hashlib.sha256()
+        if solver.isLogicSet():
+            h.update('(set-logic {})\n'.format(solver.getLogic()).encode())
+        for name in solver.getOptionNames():
+            h.update('(set-option :{} {})\n'.format(
+                name, solver.getOption(name)).encode())
+        for decl in _datatypeDeclarations(
+                [_sort(solver.tm, sorts[i]) for i in range(sorts.size())]):
+            h.update('{}\n'.format(decl).encode())
+        for i in range(consts.size()):
+            # The renamed constants are reused by later queries, such that
+            # the term manager does not grow with every query
+            key = (_sort(solver.tm, consts[i].getSort()), i)
+            const = self.renamed.get(key)
+            if const is None:
+                const = _term(solver.tm, solver.tm.ctm.mkConst(
+                    consts[i].getSort(), '_{}'.format(i).encode()))
+                self.renamed[key] = const
+            renamed.push_back((<Term> const).cterm)
+            h.update('(declare-const _{} {})\n'.format(
+                i, consts[i].getSort().toString().decode()).encode())
+        for i in range(assertions.size()):
+            h.update('(assert {})\n'.format(
+                assertions[i].substitute(consts, renamed).toString().decode()
+            ).encode())
+        return (h.hexdigest(),
+                [_term(solver.tm, consts[i]) for i in range(consts.size())],
+                [_term(solver.tm, assertions[i])
+                 for i in range(assertions.size())])
+
+    def getKey(self, Solver solver):
+        """
+            Get the key of the current query of the given solver.
+
+            :param solver: The solver.
+            :return: The hash of the canonical form of the query.
+        """
+        return self._canonicalize(solver)[0]
+
+    def lookup(self, Solver solver):
+        """
+            Look up the result of the current query of the given solver.
+
+            :param solver: The solver.
+            :return: The cache entry, or ``None`` if the query is not cached.
+        """
+        key, consts, assertions = self._canonicalize(solver)
+        row = self.db.execute(
+            'SELECT result, model, core FROM results WHERE key = ?',
+            (key,)).fetchone()
+        if row is None:
+            return None
+        result, model, core = row
+        return {
+            'result': result,
+            'model': None if model is None
+                     else dict(zip(consts, json.loads(model))),
+            'unsatCore': None if core is None
+                         else [assertions[i] for i in json.loads(core)],
+            'cached': True,
+        }
+
+    def store(self, Solver solver, Result result):
+        """
+            Store the result of the last check of the given solver. Must be
+            called immediately after :py:meth:`Solver.checkSat()`. Unknown
+            results (e.g., timeouts) are not stored, but still returned as an
+            entry. An unsat core that contains terms other than the
+            assertions of the query is not stored.
+
+            :param solver: The solver.
+            :param result: The result of the last check.
+            :return: The cache entry.
+        """
+        key, consts, assertions = self._canonicalize(solver)
+        model = None
+        core = None
+        if result.isSat() and solver.getOption('produce-models') == 'true':
+            model = [str(v) for v in solver.getValue(consts)]
+        elif (result.isUnsat()
+              and solver.getOption('produce-unsat-cores') == 'true'):
+            index = {a.getId(): i for i, a in enumerate(assertions)}
+            core = [index.get(c.getId()) for c in solver.getUnsatCore()]
+            if None in core:
+                # the core refers to a term that is not one of the
+                # assertions, it cannot be expressed in the canonical form
+                core = None
+        if not result.isUnknown():
+            with self.db:
+                self.db.execute(
+                    'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                    (key, str(result),
+                     None if model is None else json.dumps(model),
+                     None if core is None else json.dumps(core)))
+        return {
+            'result': str(result),
+            'model': None if model is None else dict(zip(consts, model)),
+            'unsatCore': None if core is None
+                         else [assertions[i] for i in core],
+            'cached': False,
+        }
+
+    def checkSat(self, Solver solver):
+        """
+            Check satisfiability of the current query of the given solver,
+            answering from the cache if possible. Otherwise, the result of
+            :py:meth:`Solver.checkSat()` is stored in the cache.
+
+            :param solver: The solver.
+            :return: The cache entry.
+        """
+        entry = self.lookup(solver)
+        if entry is None:
+            entry = self.store(solver, solver.checkSat())
+        return entry
+
+
 # ----------------------------------------------------------------------------
 # Sort
 # ----------------------------------------------------------------------------
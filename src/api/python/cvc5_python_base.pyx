@@ -4,4 +4,5 @@ include "cvc5kinds.pxi"
 include "cvc5types.pxi"
 include "cvc5proofrules.pxi"
 include "cvc5skolemids.pxi"
+include "cvc5options.pxi"
 include "cvc5.pxi"
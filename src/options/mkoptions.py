@@ -17,6 +17,13 @@
     has changed (in order to avoid global re-compilation if only single option
     files changed).
 
+    To make repeated runs cheap, the parsed toml files and the perfect hash for
+    the option names are cached in <dst>/options/mkoptions.cache. Only the
+    files of modules whose toml file changed are generated again, and the
+    global files only if any module changed. The cache is invalidated if this
+    script or any template changes. The files are generated in parallel if
+    more than one CPU is available.
+
     mkoptions.py <src> <build> <dst> <toml>+
 
       <src>     base source directory of all toml files
@@ -44,10 +51,15 @@
       - <dst>/options/options_public.cpp
       - <dst>/options/options.cpp
       - <dst>/options/options.h
+      - <build>/src/api/python/cvc5options.pxi (if the directory exists)
 """
 
+import concurrent.futures
+import hashlib
 import os
+import pickle
 import re
+import string
 import sys
 import textwrap
 try:
@@ -225,9 +237,8 @@ def generate_holder_fwd_decls(modules):
 
 
 def generate_holder_mem_decls(modules):
-    """Render declarations of holder members of the Option class"""
-    return concat_format(
-        '    std::unique_ptr<options::Holder{id_cap}> d_{id};', modules)
+    """Render declarations of the flags that track written holders"""
+    return concat_format('  bool d_{id}Written = false;', modules)
 
 
 def generate_holder_ref_decls(modules):
@@ -246,29 +257,41 @@ def generate_module_headers(modules):
 
 
 def generate_holder_mem_inits(modules):
-    """Render initializations of holder members of the Option class"""
-    return concat_format(
-        '        d_{id}(std::make_unique<options::Holder{id_cap}>()),',
-        modules)
+    """Render the members of the struct that holds all holders"""
+    return concat_format('    Holder{id_cap} {id};', modules)
 
 
 def generate_holder_ref_inits(modules):
     """Render initializations of holder references of the Option class"""
-    return concat_format('        {id}(*d_{id}),', modules)
+    return concat_format('        {id}(d_holders->{id}),', modules)
 
 
 def generate_write_functions(modules):
     """Render write functions for holders within the Option class"""
     return concat_format('''  options::Holder{id_cap}& Options::write{id_capitalized}()
   {{
-    return *d_{id};
+    d_{id}Written = true;
+    return d_holders->{id};
   }}
 ''', modules)
 
 
 def generate_holder_mem_copy(modules):
-    """Render copy operation of holder members of the Option class"""
-    return concat_format('      *d_{id} = *options.d_{id};', modules)
+    """
+    Render copy operation of holder members of the Option class. Holders that
+    were never written in either object still have their default values and
+    are not copied.
+    """
+    return concat_format('''      if (options.d_{id}Written)
+      {{
+        d_holders->{id} = options.d_holders->{id};
+        d_{id}Written = true;
+      }}
+      else if (d_{id}Written)
+      {{
+        d_holders->{id} = options::Holder{id_cap}();
+        d_{id}Written = false;
+      }}''', modules)
 
 
 ################################################################################
@@ -278,39 +301,200 @@ def generate_holder_mem_copy(modules):
 def generate_public_includes(modules):
     """Generates the list of includes for options_public.cpp."""
     headers = set()
-    headers.add(format_include("<unordered_map>"))
+    headers.add(format_include("<cstdint>"))
+    headers.add(format_include("<string_view>"))
     for _, option in all_options(modules):
         headers.update([format_include(x) for x in option.includes])
-    return '\n'.join(headers)
+    return '\n'.join(sorted(headers))
+
+
+def _option_name_char(name, pos):
+    """Character at the given position (from the end if negative) or 0."""
+    if pos < 0:
+        pos += len(name)
+    return ord(name[pos]) if 0 <= pos < len(name) else 0
+
+
+def _option_name_key(name, positions):
+    """
+    Combine the length of a name and its characters at the given positions
+    into a single integer. This is injective on the names if the positions are
+    selected by select_option_name_positions(). It must match
+    getOptionNameKey() in options_public.cpp.
+    """
+    key = len(name)
+    for pos in positions:
+        key = key * 257 + _option_name_char(name, pos)
+    assert key < 2**64
+    return key
+
+
+def _mix_option_name_key(key, seed):
+    """
+    Hash a key with a seed (using the finalizer of MurmurHash3). It must match
+    mixOptionNameKey() in options_public.cpp.
+    """
+    mask = 2**64 - 1
+    key ^= (seed * 0x9e3779b97f4a7c15) & mask
+    key ^= key >> 33
+    key = (key * 0xff51afd7ed558ccd) & mask
+    key ^= key >> 33
+    key = (key * 0xc4ceb9fe1a85ec53) & mask
+    key ^= key >> 33
+    return key
 
 
-def generate_option_enum_and_table(modules):
+def select_option_name_positions(names):
+    """
+    Greedily select character positions (negative positions count from the
+    end) until the length and the characters at these positions distinguish
+    all names. Like gperf, this allows to hash only a few characters.
+    """
+    maxlen = max(map(len, names))
+    candidates = list(range(maxlen)) + [-p for p in range(1, maxlen + 1)]
+    positions = []
+    while len({_option_name_key(n, positions) for n in names}) < len(names):
+        if len(positions) == 7:
+            die('could not find distinguishing positions for option names')
+        positions.append(
+            max(candidates,
+                key=lambda p: (len(
+                    {_option_name_key(n, positions + [p])
+                     for n in names}), -abs(p))))
+    return positions
+
+
+def perfect_hash(names):
+    """
+    Compute a minimal perfect hash for the given names using hash and
+    displace: every name is assigned to a bucket by the hash of its key with
+    seed 0. Starting with the largest bucket, we search a seed for each bucket
+    such that the hashes of the keys of its names with this seed map to
+    distinct free slots. Buckets with a single name instead store -slot-1 to
+    directly refer to a free slot.
+    Returns the selected positions, the list of seeds (per bucket) and the list
+    of names (per slot).
+    """
+    positions = select_option_name_positions(names)
+    keys = {n: _option_name_key(n, positions) for n in names}
+    size = len(names)
+    buckets = [[] for _ in range(size)]
+    for name in names:
+        buckets[_mix_option_name_key(keys[name], 0) % size].append(name)
+    seeds = [0] * size
+    slots = [None] * size
+    order = sorted(range(size), key=lambda b: -len(buckets[b]))
+    for b in order:
+        if len(buckets[b]) <= 1:
+            break
+        seed = 1
+        while True:
+            indices = {
+                _mix_option_name_key(keys[n], seed) % size
+                for n in buckets[b]
+            }
+            if len(indices) == len(buckets[b]) and all(
+                    slots[i] is None for i in indices):
+                break
+            seed += 1
+        seeds[b] = seed
+        for name in buckets[b]:
+            slots[_mix_option_name_key(keys[name], seed) % size] = name
+    free = (i for i in range(size) if slots[i] is None)
+    for b in order:
+        if len(buckets[b]) == 1:
+            i = next(free)
+            seeds[b] = -i - 1
+            slots[i] = buckets[b][0]
+    return positions, seeds, slots
+
+
+def option_hash_names(modules):
+    """Return the sorted list of names that findOption() looks up."""
+    names = set()
+    for _, option in all_options(modules):
+        if option.long:
+            names.update(option.names)
+    return sorted(names)
+
+
+def generate_option_enum_and_table(modules, option_hash=None):
     """
     Generate an enum class OptionEnum with one variant for each option.
-    Also, generate a map NAME_TO_ENUM from string names to enum variants.
+    Also, generate a perfect hash table OPTION_NAMES from string names to enum
+    variants and the function findOption() to look up a name in it.
 
     This enum is used to branch (in C++) on an option string name.
-    First, you lookup the enum in the map.
+    First, you lookup the enum in the table.
     Then, you switch-case on the enum, which generates a jump table.
 
     When we measured, this was about 5x faster than a huge if-else chain.
-    It would probably be even faster with a better hash function.
+    The perfect hash table only hashes the length and a few characters of a
+    name and compares it with a single candidate, which is faster than hashing
+    the whole name and searching the bucket of an std::unordered_map.
+    If given, `option_hash` is the result of perfect_hash() for the names from
+    option_hash_names(), which is otherwise computed here.
     """
+    names = {}
     res = []
     res.append('enum class OptionEnum {')
     for module, option in all_options(modules, True):
         if not option.long:
             continue
         res.append('  {n},'.format(n=option.enum_name()))
-    res.append('};')
-    res.append('const std::unordered_map<std::string, OptionEnum> NAME_TO_ENUM = {')
-    for module, option in all_options(modules, True):
-        if not option.long:
-            continue
         for name in option.names:
-            res.append('  {{ \"{}\", OptionEnum::{} }},'
-                       .format(name, option.enum_name()))
+            names[name] = option.enum_name()
     res.append('};')
+    if option_hash is None:
+        option_hash = perfect_hash(sorted(names))
+    positions, seeds, slots = option_hash
+    res.append('constexpr unsigned char getOptionNameChar(std::string_view name, size_t pos)')
+    res.append('{')
+    res.append('  return pos < name.size() ? name[pos] : 0;')
+    res.append('}')
+    res.append('constexpr uint64_t getOptionNameKey(std::string_view name)')
+    res.append('{')
+    res.append('  uint64_t key = name.size();')
+    for pos in positions:
+        if pos < 0:
+            pos = 'name.size() - {}'.format(-pos)
+        res.append('  key = key * 257 + getOptionNameChar(name, {});'.format(pos))
+    res.append('  return key;')
+    res.append('}')
+    res.append('constexpr uint64_t mixOptionNameKey(uint64_t key, uint64_t seed)')
+    res.append('{')
+    res.append('  key ^= seed * 0x9e3779b97f4a7c15u;')
+    res.append('  key ^= key >> 33;')
+    res.append('  key *= 0xff51afd7ed558ccdu;')
+    res.append('  key ^= key >> 33;')
+    res.append('  key *= 0xc4ceb9fe1a85ec53u;')
+    res.append('  key ^= key >> 33;')
+    res.append('  return key;')
+    res.append('}')
+    res.append('struct OptionName')
+    res.append('{')
+    res.append('  std::string_view name;')
+    res.append('  OptionEnum option;')
+    res.append('};')
+    res.append('constexpr size_t NUM_OPTION_NAMES = {};'.format(len(slots)))
+    res.append('constexpr int32_t OPTION_SEEDS[NUM_OPTION_NAMES] = {')
+    res.append('  ' + wrap_line(', '.join(map(str, seeds)), 6))
+    res.append('};')
+    res.append('constexpr OptionName OPTION_NAMES[NUM_OPTION_NAMES] = {')
+    for name in slots:
+        res.append('  {{ \"{}\", OptionEnum::{} }},'.format(name, names[name]))
+    res.append('};')
+    res.append('const OptionEnum* findOption(std::string_view name)')
+    res.append('{')
+    res.append('  uint64_t key = getOptionNameKey(name);')
+    res.append('  int32_t seed = OPTION_SEEDS[mixOptionNameKey(key, 0) % NUM_OPTION_NAMES];')
+    res.append('  size_t slot = seed < 0 ? -seed - 1 : mixOptionNameKey(key, seed) % NUM_OPTION_NAMES;')
+    res.append('  if (OPTION_NAMES[slot].name != name)')
+    res.append('  {')
+    res.append('    return nullptr;')
+    res.append('  }')
+    res.append('  return &OPTION_NAMES[slot].option;')
+    res.append('}')
     return '\n    '.join(res)
 
 
@@ -326,11 +510,11 @@ def generate_getnames_impl(modules):
 def generate_get_impl(modules):
     """Generates the implementation for options::get()."""
     res = []
-    res.append('auto it = NAME_TO_ENUM.find(name);')
-    res.append('if (it == NAME_TO_ENUM.end()) {')
+    res.append('const OptionEnum* it = findOption(name);')
+    res.append('if (it == nullptr) {')
     res.append('  throw OptionException(\"Unrecognized option key or setting: \" + name);')
     res.append('}')
-    res.append('switch (it->second) {')
+    res.append('switch (*it) {')
     for module, option in all_options(modules, True):
         if not option.name or not option.long:
             continue
@@ -387,11 +571,11 @@ def _set_predicates(module, option):
 def generate_set_impl(modules):
     """Generates the implementation for options::set()."""
     res = []
-    res.append('auto it = NAME_TO_ENUM.find(name);')
-    res.append('if (it == NAME_TO_ENUM.end()) {')
+    res.append('const OptionEnum* it = findOption(name);')
+    res.append('if (it == nullptr) {')
     res.append('  throw OptionException(\"Unrecognized option key or setting: \" + name);')
     res.append('}')
-    res.append('switch (it->second) {')
+    res.append('switch (*it) {')
     for module, option in all_options(modules, True):
         if not option.long:
             continue
@@ -417,11 +601,11 @@ def cpp_category(category):
 def generate_getinfo_impl(modules):
     """Generates the implementation for options::getInfo()."""
     res = []
-    res.append('auto it = NAME_TO_ENUM.find(name);')
-    res.append('if (it == NAME_TO_ENUM.end()) {')
+    res.append('const OptionEnum* it = findOption(name);')
+    res.append('if (it == nullptr) {')
     res.append('  throw OptionException(\"Unrecognized option key or setting: \" + name);')
     res.append('}')
-    res.append('switch (it->second) {')
+    res.append('switch (*it) {')
     for module, option in all_options(modules, True):
         if not option.long:
             continue
@@ -460,6 +644,64 @@ def generate_getinfo_impl(modules):
     return '\n  '.join(res)
 
 
+################################################################################
+# for api/python/cvc5options.pxi
+
+
+def _python_option_metadata(option):
+    """
+    Render the metadata of an option for the Python API as a tuple
+    (name, type, minimum, maximum, modes, ctype) where the type is one of
+    'bool', 'int', 'float', 'str', 'mode' or None (for all other types, which
+    can only be set from strings) and ctype is the C++ type of the option.
+    """
+    kind, minimum, maximum, modes = None, None, None, None
+    if option.mode:
+        kind = 'mode'
+        modes = sorted(option.mode_name.values())
+    elif option.type == 'bool':
+        kind = 'bool'
+    elif option.type == 'std::string':
+        kind = 'str'
+    elif option.type == 'double':
+        kind = 'float'
+        minimum = float(option.minimum) if option.minimum else None
+        maximum = float(option.maximum) if option.maximum else None
+    elif option.type in ['int64_t', 'uint64_t']:
+        kind = 'int'
+        if option.type == 'int64_t':
+            minimum, maximum = -2**63, 2**63 - 1
+        else:
+            minimum, maximum = 0, 2**64 - 1
+        if option.minimum:
+            minimum = max(minimum, int(option.minimum))
+        if option.maximum:
+            maximum = min(maximum, int(option.maximum))
+    return (option.long_name, kind, minimum, maximum, modes, option.type)
+
+
+def generate_python_options(modules):
+    """
+    Generate the metadata of all options for the typed option access of the
+    Python API, as a dictionary from option names (including aliases) to the
+    tuple rendered by _python_option_metadata().
+    """
+    res = []
+    for _, option in all_options(modules, True):
+        if not option.long:
+            continue
+        metadata = repr(_python_option_metadata(option))
+        for name in sorted(option.names):
+            res.append('    {!r}: {},'.format(name, metadata))
+    return '''# This file is generated by mkoptions.py from the *_options.toml files.
+
+# Maps option names to (name, type, minimum, maximum, modes, ctype).
+_option_metadata = {{
+{}
+}}
+'''.format('\n'.join(res))
+
+
 ################################################################################
 # for options/<module>.h
 
@@ -964,53 +1206,158 @@ def codegen_module(module, dst_dir, tpls):
 ################################################################################
 # main code generation
 
+# The placeholders of the global templates and the functions to render them.
+# Functions that render multiple placeholders return a tuple.
+GLOBAL_GENERATORS = {
+    # options/io_utils.h
+    ('ioscope_members', ): generate_ioscope_members,
+    ('iodecls', ): generate_iodecls,
+    # options/io_utils.cpp
+    ('ioimpls', ): generate_ioimpls,
+    ('ioscope_memberinit', ): generate_ioscope_memberinit,
+    ('ioscope_restore', ): generate_ioscope_restore,
+    # options/options.h
+    ('holder_fwd_decls', ): generate_holder_fwd_decls,
+    ('holder_mem_decls', ): generate_holder_mem_decls,
+    ('holder_ref_decls', ): generate_holder_ref_decls,
+    # options/options.cpp
+    ('headers_module', ): generate_module_headers,
+    ('holder_mem_inits', ): generate_holder_mem_inits,
+    ('holder_ref_inits', ): generate_holder_ref_inits,
+    ('write_functions', ): generate_write_functions,
+    ('holder_mem_copy', ): generate_holder_mem_copy,
+    # options/options_public.cpp
+    ('options_includes', ): generate_public_includes,
+    ('getnames_impl', ): generate_getnames_impl,
+    ('get_impl', ): generate_get_impl,
+    ('set_impl', ): generate_set_impl,
+    ('getinfo_impl', ): generate_getinfo_impl,
+    # main/options.cpp
+    ('help_common', 'help_others', 'help_regular'): generate_cli_help,
+    ('cmdoptions_short', 'cmdoptions_long', 'parseinternal_impl'):
+    generate_parsing,
+}
+
+
+def codegen_global(tpl, modules, dst_dir, option_hash):
+    """Generate code for one global template, rendering only the placeholders
+    it uses."""
+    used = {f for _, f, _, _ in string.Formatter().parse(tpl['content']) if f}
+    data = {}
+    for keys, generator in GLOBAL_GENERATORS.items():
+        if used.isdisjoint(keys):
+            continue
+        res = generator(modules)
+        data.update(zip(keys, res if len(keys) > 1 else [res]))
+    if 'option_enum_and_table' in used:
+        data['option_enum_and_table'] = generate_option_enum_and_table(
+            modules, option_hash)
+    write_file(dst_dir, tpl['output'], tpl['content'].format(**data))
+
+
+def codegen_file(directory, name, generator, *args):
+    """Generate a single file from `generator(*args)`."""
+    write_file(directory, name, generator(*args))
+
+
+def codegen_all_modules(modules, src_dir, build_dir, dst_dir, tpls,
+                        option_hash):
+    """Return the tasks that generate code for all option modules."""
+    tasks = [(codegen_global, (tpl, modules, dst_dir, option_hash))
+             for tpl in tpls]
+
+    docs_dir = '{}/docs/'.format(build_dir)
+    if os.path.isdir(docs_dir):
+        tasks.append((codegen_file, (docs_dir, 'options_generated.rst',
+                                     generate_sphinx_help, modules)))
+        tasks.append((codegen_file,
+                      (docs_dir, 'output_tags_generated.rst',
+                       generate_sphinx_output_tags, modules, src_dir,
+                       build_dir)))
+
+    python_dir = '{}/src/api/python/'.format(build_dir)
+    if os.path.isdir(python_dir):
+        tasks.append((codegen_file, (python_dir, 'cvc5options.pxi',
+                                     generate_python_options, modules)))
+    return tasks
+
+
+def global_outputs(build_dir, dst_dir, tpls):
+    """Return the paths of all files generated by codegen_all_modules()."""
+    res = [os.path.join(dst_dir, tpl['output']) for tpl in tpls]
+    if os.path.isdir('{}/docs/'.format(build_dir)):
+        res.append('{}/docs/options_generated.rst'.format(build_dir))
+        res.append('{}/docs/output_tags_generated.rst'.format(build_dir))
+    if os.path.isdir('{}/src/api/python/'.format(build_dir)):
+        res.append('{}/src/api/python/cvc5options.pxi'.format(build_dir))
+    return res
 
-def codegen_all_modules(modules, src_dir, build_dir, dst_dir, tpls):
-    """Generate code for all option modules."""
-    short, cmdline_opts, parseinternal = generate_parsing(modules)
-    help_common, help_others, help_regular = generate_cli_help(modules)
 
-    if os.path.isdir('{}/docs/'.format(build_dir)):
-        write_file('{}/docs/'.format(build_dir), 'options_generated.rst',
-                   generate_sphinx_help(modules))
-        write_file('{}/docs/'.format(build_dir), 'output_tags_generated.rst',
-                   generate_sphinx_output_tags(modules, src_dir, build_dir))
+def module_outputs(module, dst_dir, tpls):
+    """Return the paths of all files generated by codegen_module()."""
+    return [
+        os.path.join(dst_dir, tpl['output'].replace('module', module.filename))
+        for tpl in tpls
+    ]
 
-    data = {
-        # options/io_utils.h
-        'ioscope_members': generate_ioscope_members(modules),
-        'iodecls': generate_iodecls(modules),
-        # options/io_utils.cpp
-        'ioimpls': generate_ioimpls(modules),
-        'ioscope_memberinit': generate_ioscope_memberinit(modules),
-        'ioscope_restore': generate_ioscope_restore(modules),
-        # options/options.h
-        'holder_fwd_decls': generate_holder_fwd_decls(modules),
-        'holder_mem_decls': generate_holder_mem_decls(modules),
-        'holder_ref_decls': generate_holder_ref_decls(modules),
-        # options/options.cpp
-        'headers_module': generate_module_headers(modules),
-        'holder_mem_inits': generate_holder_mem_inits(modules),
-        'holder_ref_inits': generate_holder_ref_inits(modules),
-        'write_functions': generate_write_functions(modules),
-        'holder_mem_copy': generate_holder_mem_copy(modules),
-        # options/options_public.cpp
-        'options_includes': generate_public_includes(modules),
-        'getnames_impl': generate_getnames_impl(modules),
-        'option_enum_and_table': generate_option_enum_and_table(modules),
-        'get_impl': generate_get_impl(modules),
-        'set_impl': generate_set_impl(modules),
-        'getinfo_impl': generate_getinfo_impl(modules),
-        # main/options.cpp
-        'help_common': help_common,
-        'help_others': help_others,
-        'help_regular': help_regular,
-        'cmdoptions_long': cmdline_opts,
-        'cmdoptions_short': short,
-        'parseinternal_impl': parseinternal,
-    }
+
+def run_tasks(tasks):
+    """Run the given tasks, pairs of a function and its arguments, and return
+    their results. The tasks are run in parallel if more than one CPU is
+    available."""
+    if hasattr(os, 'sched_getaffinity'):
+        jobs = len(os.sched_getaffinity(0))
+    else:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(tasks))
+    if jobs <= 1:
+        return [func(*args) for func, args in tasks]
+    with concurrent.futures.ProcessPoolExecutor(jobs) as pool:
+        futures = [pool.submit(func, *args) for func, args in tasks]
+        return [f.result() for f in futures]
+
+
+################################################################################
+# cache of parsed toml files and the perfect hash
+
+
+CACHE_FILE = 'options/mkoptions.cache'
+
+
+def cache_fingerprint(src_dir, build_dir, tpls):
+    """Hash everything besides the toml files that the generated code depends
+    on: this script, the templates and the directories."""
+    h = hashlib.sha256()
+    with open(os.path.abspath(__file__), 'rb') as f:
+        h.update(f.read())
     for tpl in tpls:
-        write_file(dst_dir, tpl['output'], tpl['content'].format(**data))
+        h.update(tpl['content'].encode())
+    h.update(os.path.abspath(src_dir).encode())
+    h.update(os.path.abspath(build_dir).encode())
+    return h.hexdigest()
+
+
+def load_cache(dst_dir):
+    """Load the cache from a previous run, or return an empty cache."""
+    try:
+        with open(os.path.join(dst_dir, CACHE_FILE), 'rb') as file:
+            cache = pickle.load(file)
+        if isinstance(cache, dict):
+            return cache
+    except Exception:
+        # A missing or broken cache is simply rebuilt
+        pass
+    return {}
+
+
+def save_cache(dst_dir, cache):
+    """Store the cache for the next run."""
+    fname = os.path.join(dst_dir, CACHE_FILE)
+    try:
+        with open(fname, 'wb') as file:
+            pickle.dump(cache, file)
+    except IOError:
+        die("Could not write to '{}'".format(fname))
 
 
 ################################################################################
@@ -1169,22 +1516,60 @@ def mkoptions_main():
         tpl['output'] = tpl['input'].replace('_template', '')
         tpl['content'] = read_tpl(src_dir, tpl['input'])
 
-    # Parse and check toml files
+    # Parse and check toml files, reusing the parsed contents of unchanged
+    # files from the cache
+    cache = load_cache(dst_dir)
+    fingerprint = cache_fingerprint(src_dir, build_dir,
+                                    module_tpls + global_tpls)
+    valid = cache.get('fingerprint') == fingerprint
+    cached_tomls = cache.get('tomls', {})
+    tomls = {}
     checker = Checker()
     modules = []
+    changed = []
     for filename in filenames:
         with open(filename, "rb") as f:
-            data = tomllib.load(f)
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        cached_digest, data = cached_tomls.get(filename, (None, None))
+        if cached_digest != digest:
+            try:
+                data = tomllib.loads(content.decode())
+            except (UnicodeDecodeError, tomllib.TOMLDecodeError) as e:
+                die("could not parse '{}': {}".format(filename, e))
+        tomls[filename] = (digest, data)
         module = checker.check_module(data, filename)
         if 'option' in data:
             module.options = sorted(
                 [checker.check_option(a) for a in data['option']])
         modules.append(module)
-
-    # Generate code
-    for module in modules:
-        codegen_module(module, dst_dir, module_tpls)
-    codegen_all_modules(modules, src_dir, build_dir, dst_dir, global_tpls)
+        outputs = module_outputs(module, dst_dir, module_tpls)
+        if not valid or cached_digest != digest or not all(
+                map(os.path.isfile, outputs)):
+            changed.append(module)
+
+    # Generate code for the changed modules, and for all modules if any
+    # module changed
+    tasks = [(codegen_module, (module, dst_dir, module_tpls))
+             for module in changed]
+    option_hash = None
+    if changed or filenames != cache.get('filenames') or not all(
+            map(os.path.isfile,
+                global_outputs(build_dir, dst_dir, global_tpls))):
+        names = option_hash_names(modules)
+        if valid and cache.get('option_hash', (None, ))[0] == names:
+            option_hash = cache['option_hash'][1]
+        else:
+            option_hash = perfect_hash(names)
+        tasks.extend(
+            codegen_all_modules(modules, src_dir, build_dir, dst_dir,
+                                global_tpls, option_hash))
+    run_tasks(tasks)
+
+    if option_hash is not None:
+        cache['option_hash'] = (names, option_hash)
+    cache.update(fingerprint=fingerprint, filenames=filenames, tomls=tomls)
+    save_cache(dst_dir, cache)
 
     # Generate output file to signal cmake when this script was run last
     open(os.path.join(dst_dir, 'options/options.stamp'), 'w').write('')
@@ -26,10 +26,20 @@ ${headers_module}$
 
 namespace cvc5::internal
 {
-  Options::Options()
-      :
+  namespace options
+  {
+  /** Holds the holders of all modules. */
+  struct Holders
+  {
 // clang-format off
 ${holder_mem_inits}$
+// clang-format on
+  };
+  }  // namespace options
+
+  Options::Options()
+      : d_holders(std::make_unique<options::Holders>()),
+// clang-format off
 ${holder_ref_inits}$
 // clang-format on
         d_handler(std::make_unique<options::OptionsHandler>(this))
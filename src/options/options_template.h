@@ -28,6 +28,7 @@
 namespace cvc5::internal {
 namespace options {
   class OptionsHandler;
+  struct Holders;
 // clang-format off
 ${holder_fwd_decls}$
 // clang-format on
@@ -59,12 +60,15 @@ class CVC5_EXPORT Options
 
   /**
    * Copies the value of the options stored in OptionsHolder into the current
-   * Options object.
+   * Options object. Only the holders that were written (in either object) are
+   * copied, all other holders still have their default values.
    */
   void copyValues(const Options& options);
 
  private:
-
+  /** The holders of all modules, allocated at once. */
+  std::unique_ptr<options::Holders> d_holders;
+  /** Whether a holder was (possibly) written since its construction. */
 // clang-format off
 ${holder_mem_decls}$
 // clang-format on
@@ -0,0 +1,69 @@
+/******************************************************************************
+ * Top contributors (to current version):
+ *   agent
+ *
+ * This file is part of the cvc5 project.
+ *
+ * Copyright (c) 2009-2024 by the authors listed in the file AUTHORS
+ * in the top-level source directory and their institutional affiliations.
+ * All rights reserved.  See the file COPYING in the top-level source
+ * directory for licensing information.
+ * ****************************************************************************
+ *
+ * Measures the rate of constructing short-lived solvers and checks that
+ * options set on one solver do not leak into other solvers.
+ *
+ * The number of solvers can be given as argument (default 1000).
+ */
+
+#include <cvc5/cvc5.h>
+
+#include <chrono>
+#include <cstdlib>
+#include <iostream>
+
+using namespace cvc5;
+using namespace std;
+
+int main(int argc, char** argv)
+{
+  size_t n = argc > 1 ? std::strtoul(argv[1], nullptr, 10) : 1000;
+  TermManager tm;
+
+  auto start = chrono::steady_clock::now();
+  for (size_t i = 0; i < n; ++i)
+  {
+    Solver slv(tm);
+  }
+  auto end = chrono::steady_clock::now();
+  double seconds = chrono::duration<double>(end - start).count();
+  cout << "default options: " << n / seconds << " solvers/s" << endl;
+
+  start = chrono::steady_clock::now();
+  for (size_t i = 0; i < n; ++i)
+  {
+    Solver slv(tm);
+    slv.setOption("tlimit-per", "500");
+    slv.setOption("produce-models", "true");
+  }
+  end = chrono::steady_clock::now();
+  seconds = chrono::duration<double>(end - start).count();
+  cout << "two options set: " << n / seconds << " solvers/s" << endl;
+
+  Solver s1(tm);
+  s1.setOption("produce-models", "true");
+  s1.setOption("tlimit-per", "500");
+  Solver s2(tm);
+  if (s1.getOption("produce-models") != "true"
+      || s1.getOption("tlimit-per") != "500"
+      || s2.getOption("produce-models") != "false"
+      || s2.getOption("tlimit-per") != "0")
+  {
+    return 1;
+  }
+  s1.setLogic("QF_UF");
+  Term x = tm.mkConst(tm.getBooleanSort(), "x");
+  s1.assertFormula(x);
+  Result r = s1.checkSat();
+  return r.isSat() && s1.getValue(x) == tm.mkTrue() ? 0 : 1;
+}
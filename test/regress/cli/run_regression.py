@@ -17,16 +17,46 @@ Runs benchmark and checks for correct exit status and output.
 
 import argparse
 import collections
+import concurrent.futures
+import contextlib
 import difflib
+import fnmatch
+import functools
+import hashlib
+import heapq
+import importlib.util
+import io
+import itertools
+import json
+import math
 import os
+import queue
 import re
 import shlex
+import sqlite3
+import statistics
 import subprocess
 import sys
 import tempfile
 import threading
+import time
+import xml.etree.ElementTree as ET
 
 g_args = None
+# Limits the number of processes that run at the same time
+g_process_slots = None
+# The cache for test results (if enabled)
+g_cache = None
+# The database for performance measurements (if enabled)
+g_perf_db = None
+# The index of benchmark metadata (if enabled)
+g_index = None
+# The writer for machine-readable test results (if enabled)
+g_results = None
+# The resource profile of the benchmarks (if enabled)
+g_profile = None
+# The resource usage of the test that the current thread runs
+g_measurement = threading.local()
 
 
 class Color:
@@ -49,6 +79,40 @@ def print_error(err):
     print(Color.RED + "✖ " + err + Color.ENDC)
 
 
+class ThreadLocalOutput:
+    """Replacement for `sys.stdout` that redirects the output of a thread to a
+    buffer while the thread is inside of `capture_output()`. This allows
+    running multiple regressions concurrently while keeping their output
+    separate."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+@contextlib.contextmanager
+def capture_output():
+    """Captures everything that the current thread prints within the context
+    and yields the buffer that the output is written to."""
+
+    if not isinstance(sys.stdout, ThreadLocalOutput):
+        sys.stdout = ThreadLocalOutput(sys.stdout)
+    local = sys.stdout.local
+    previous = getattr(local, "buffer", None)
+    local.buffer = io.StringIO()
+    try:
+        yield local.buffer
+    finally:
+        local.buffer = previous
+
+
 class Tester:
 
     def __init__(self, name):
@@ -57,6 +121,15 @@ class Tester:
     def applies(self, benchmark_info):
         return True
 
+    def dependencies(self, benchmark_info):
+        """Returns the files other than the benchmark that the result of the
+        test depends on."""
+        return get_cvc5_files(benchmark_info.cvc5_binary)
+
+    def run_benchmark(self, benchmark_info):
+        """Runs cvc5 on a benchmark, see `run_benchmark()`."""
+        return run_benchmark(benchmark_info)
+
     def check_exit_status(self, expected_exit_status, exit_status, output,
                           error, flags):
         if exit_status == STATUS_TIMEOUT:
@@ -76,12 +149,41 @@ class Tester:
         print()
         print_info(self.name)
         print("  Flags: {}".format(benchmark_info.command_line_args))
-        return self.run_internal(benchmark_info)
+        cache_key = None
+        if g_cache:
+            cache_key = g_cache.get_key(self, benchmark_info)
+            if g_cache.lookup(cache_key) == EXIT_OK:
+                print_ok("OK (cached)")
+                if g_results:
+                    g_results.record(self, benchmark_info, EXIT_OK,
+                                     Measurement(), "", cached=True)
+                return EXIT_OK
+        if g_perf_db and g_args.adaptive_timeout:
+            benchmark_info = benchmark_info._replace(
+                timeout=g_perf_db.get_adaptive_timeout(
+                    self, benchmark_info, g_args.adaptive_timeout,
+                    g_args.timeout_floor))
+            print("  Timeout: {:.1f}s".format(benchmark_info.timeout))
+        # The output of the test is captured to include it in the results
+        capture = capture_output() if g_results else contextlib.nullcontext()
+        with capture as output, measure_processes() as measurement:
+            exit_code = self.run_internal(benchmark_info)
+        if g_results:
+            sys.stdout.write(output.getvalue())
+            g_results.record(self, benchmark_info, exit_code, measurement,
+                             output.getvalue())
+        if g_perf_db:
+            g_perf_db.record(self, benchmark_info, exit_code, measurement)
+        if g_profile:
+            g_profile.record(benchmark_info, measurement)
+        if cache_key and exit_code == EXIT_OK:
+            g_cache.store(cache_key, exit_code)
+        return exit_code
 
     def run_internal(self, benchmark_info):
         """Runs cvc5 on a given benchmark and checks the output."""
 
-        output, error, exit_status = run_benchmark(benchmark_info)
+        output, error, exit_status = self.run_benchmark(benchmark_info)
         exit_code = self.check_exit_status(benchmark_info.expected_exit_status,
                                            exit_status, output, error,
                                            benchmark_info.command_line_args)
@@ -125,6 +227,12 @@ class BaseTester(Tester):
         super().__init__("base")
 
     def run_internal(self, benchmark_info):
+        if g_args.perf_stats:
+            # The statistics are removed from the error output again in
+            # `run_benchmark()`
+            benchmark_info = benchmark_info._replace(
+                command_line_args=benchmark_info.command_line_args
+                + ["--stats"] + (["--stats-internal"] if g_profile else []))
         return super().run_internal(benchmark_info)
 
 
@@ -194,10 +302,9 @@ class DslProofTester(Tester):
             )
         )
 
-class LfscTester(Tester):
-
-    def __init__(self):
-        super().__init__("lfsc")
+class ProofCheckerTester(Tester):
+    """A base class for testers that check proofs dumped by cvc5 with an
+    external proof checker."""
 
     def applies(self, benchmark_info):
         return (
@@ -205,110 +312,131 @@ class LfscTester(Tester):
             and benchmark_info.expected_output.strip() == "unsat"
         )
 
-    def run_internal(self, benchmark_info):
-        exit_code = EXIT_OK
-        with tempfile.NamedTemporaryFile() as tmpf:
-            cvc5_args = [
-                "--dump-proofs",
-                "--proof-format=lfsc",
-                "--proof-granularity=theory-rewrite",
-                "--proof-check=lazy",
-            ] + benchmark_info.command_line_args
-            output, error, exit_status = run_process(
+    def check_dumped_proof(self, benchmark_info, cvc5_args, checker_args,
+                           prefix, markers):
+        """Runs cvc5 with `cvc5_args` to dump a proof and streams the proof,
+        preceded by `prefix`, to the proof checker `checker_args` (see
+        `run_pipeline()`). The proof is considered empty if none of the
+        `markers` occur in it. If the result cache is enabled, the proof is
+        stored in the cache and later runs only run the proof checker on the
+        cached proof, e.g., if only the proof checker or its signatures
+        changed."""
+
+        proof_key = None
+        if g_cache:
+            proof_key = g_cache.get_proof_key(benchmark_info, cvc5_args,
+                                              prefix)
+            proof_path = g_cache.lookup_proof(proof_key)
+            if proof_path:
+                print("  Using cached proof {}".format(proof_path))
+                return self.check_proof_output(run_process(
+                    [proof_path if a is PIPELINE_INPUT else a
+                     for a in checker_args],
+                    benchmark_info.benchmark_dir,
+                    benchmark_info.timeout,
+                ), cvc5_args)
+
+        new_proof = g_cache.new_proof() if proof_key else contextlib.nullcontext()
+        with new_proof as proof_file:
+            cvc5, checker, found = run_pipeline(
                 [benchmark_info.cvc5_binary]
                 + cvc5_args
                 + [benchmark_info.benchmark_basename],
+                checker_args,
                 benchmark_info.benchmark_dir,
                 benchmark_info.timeout,
+                prefix=prefix,
+                skip=b"unsat\n",
+                markers=markers,
+                tee=proof_file,
             )
-            tmpf.write(output.strip("unsat\n".encode()))
-            tmpf.flush()
-            output, error = output.decode(), error.decode()
-            exit_code = self.check_exit_status(EXIT_OK, exit_status, output,
-                                               error, cvc5_args)
-            if "check" not in output:
-                print_error("Empty proof")
-                print()
-                print_outputs(output, error)
-                return EXIT_FAILURE
-            if exit_code != EXIT_OK:
-                return exit_code
-            output, error, exit_status = run_process(
-                [benchmark_info.lfsc_binary] +
-                benchmark_info.lfsc_sigs + [tmpf.name],
-                benchmark_info.benchmark_dir,
-                timeout=benchmark_info.timeout,
-            )
-            output, error = output.decode(), error.decode()
-            exit_code = self.check_exit_status(EXIT_OK, exit_status, output,
-                                               error, cvc5_args)
-            if "success" not in output:
-                print_error("Invalid proof")
-                print()
-                print_outputs(output, error)
-                return EXIT_FAILURE
+            if proof_key and found and cvc5[2] == EXIT_OK:
+                g_cache.store_proof(proof_key, proof_file)
+        output, error, exit_status = cvc5
+        output, error = output.decode(), error.decode()
+        exit_code = self.check_exit_status(EXIT_OK, exit_status, output,
+                                           error, cvc5_args)
+        if not found:
+            print_error("Empty proof")
+            print()
+            print_outputs(output, error)
+            return EXIT_FAILURE
+        if exit_code != EXIT_OK:
+            return exit_code
+        return self.check_proof_output(checker, cvc5_args)
+
+    def check_proof_output(self, checker, cvc5_args):
+        """Checks the (output, error output, exit status) `checker` of the
+        proof checker."""
+
+        output, error, exit_status = checker
+        output, error = output.decode(), error.decode()
+        exit_code = self.check_exit_status(EXIT_OK, exit_status, output,
+                                           error, cvc5_args)
+        if "success" not in output:
+            print_error("Invalid proof")
+            print()
+            print_outputs(output, error)
+            return EXIT_FAILURE
         if exit_code == EXIT_OK:
             print_ok("OK")
         return exit_code
 
-class AlfTester(Tester):
+
+class LfscTester(ProofCheckerTester):
 
     def __init__(self):
-        super().__init__("alf")
+        super().__init__("lfsc")
 
-    def applies(self, benchmark_info):
-        return (
-            benchmark_info.benchmark_ext != ".sy"
-            and benchmark_info.expected_output.strip() == "unsat"
+    def dependencies(self, benchmark_info):
+        return (super().dependencies(benchmark_info)
+                + [benchmark_info.lfsc_binary] + benchmark_info.lfsc_sigs)
+
+    def run_internal(self, benchmark_info):
+        cvc5_args = [
+            "--dump-proofs",
+            "--proof-format=lfsc",
+            "--proof-granularity=theory-rewrite",
+            "--proof-check=lazy",
+        ] + benchmark_info.command_line_args
+        return self.check_dumped_proof(
+            benchmark_info,
+            cvc5_args,
+            [benchmark_info.lfsc_binary] + benchmark_info.lfsc_sigs +
+            [PIPELINE_INPUT],
+            prefix=b"",
+            markers=[b"check"],
         )
 
+class AlfTester(ProofCheckerTester):
+
+    def __init__(self):
+        super().__init__("alf")
+
+    def dependencies(self, benchmark_info):
+        alf_sig_dir = os.path.abspath(g_args.alf_sig_dir)
+        return (super().dependencies(benchmark_info)
+                + [benchmark_info.alfc_binary] + sorted(
+                    os.path.join(root, f)
+                    for root, _, files in os.walk(alf_sig_dir)
+                    for f in files))
+
     def run_internal(self, benchmark_info):
-        exit_code = EXIT_OK
-        with tempfile.NamedTemporaryFile() as tmpf:
-            cvc5_args = [
-                "--dump-proofs",
-                "--proof-format=alf",
-                "--proof-granularity=theory-rewrite",
-                "--proof-print-conclusion",
-            ] + benchmark_info.command_line_args
-            output, error, exit_status = run_process(
-                [benchmark_info.cvc5_binary]
-                + cvc5_args
-                + [benchmark_info.benchmark_basename],
-                benchmark_info.benchmark_dir,
-                benchmark_info.timeout,
-            )
-            alf_sig_dir = os.path.abspath(g_args.alf_sig_dir)
-            tmpf.write(("(include \"" + alf_sig_dir + "/cvc5/Cvc5.smt3\")").encode())
-            tmpf.write(output.strip("unsat\n".encode()))
-            tmpf.flush()
-            output, error = output.decode(), error.decode()
-            exit_code = self.check_exit_status(EXIT_OK, exit_status, output,
-                                               error, cvc5_args)
-            if ("step" not in output) and ("assume" not in output):
-                print_error("Empty proof")
-                print()
-                print_outputs(output, error)
-                return EXIT_FAILURE
-            if exit_code != EXIT_OK:
-                return exit_code
-            output, error, exit_status = run_process(
-                [benchmark_info.alfc_binary] +
-                [tmpf.name],
-                benchmark_info.benchmark_dir,
-                timeout=benchmark_info.timeout,
-            )
-            output, error = output.decode(), error.decode()
-            exit_code = self.check_exit_status(EXIT_OK, exit_status, output,
-                                               error, cvc5_args)
-            if "success" not in output:
-                print_error("Invalid proof")
-                print()
-                print_outputs(output, error)
-                return EXIT_FAILURE
-        if exit_code == EXIT_OK:
-            print_ok("OK")
-        return exit_code
+        cvc5_args = [
+            "--dump-proofs",
+            "--proof-format=alf",
+            "--proof-granularity=theory-rewrite",
+            "--proof-print-conclusion",
+        ] + benchmark_info.command_line_args
+        alf_sig_dir = os.path.abspath(g_args.alf_sig_dir)
+        return self.check_dumped_proof(
+            benchmark_info,
+            cvc5_args,
+            [benchmark_info.alfc_binary, PIPELINE_INPUT],
+            prefix=("(include \"" + alf_sig_dir +
+                    "/cvc5/Cvc5.smt3\")").encode(),
+            markers=[b"step", b"assume"],
+        )
 
 class ModelTester(Tester):
 
@@ -393,43 +521,267 @@ class DumpTester(Tester):
             ".sy": "sygus",
         }
 
-        tmpf_name = None
-        with tempfile.NamedTemporaryFile(delete=False) as tmpf:
-            dump_args = [
-                "--parse-only",
-                "-o",
-                "raw-benchmark",
-                "--output-lang={}".format(ext_to_lang[benchmark_info.benchmark_ext]),
-            ]
-            dump_output, _, _ = run_process(
-                [benchmark_info.cvc5_binary]
-                + benchmark_info.command_line_args
-                + dump_args
-                + [benchmark_info.benchmark_basename],
-                benchmark_info.benchmark_dir,
-                benchmark_info.timeout,
-            )
-
-            tmpf_name = tmpf.name
-            tmpf.write(dump_output)
-
-        if not tmpf_name:
-            return EXIT_FAILURE
+        dump_args = [
+            "--parse-only",
+            "-o",
+            "raw-benchmark",
+            "--output-lang={}".format(ext_to_lang[benchmark_info.benchmark_ext]),
+        ]
+        dump_output, _, _ = run_process(
+            [benchmark_info.cvc5_binary]
+            + benchmark_info.command_line_args
+            + dump_args
+            + [benchmark_info.benchmark_basename],
+            benchmark_info.benchmark_dir,
+            benchmark_info.timeout,
+        )
 
-        exit_code = super().run_internal(
+        # The dumped benchmark is passed to cvc5 via stdin (see
+        # `run_benchmark()`), which avoids writing it to a temporary file
+        return super().run_internal(
             benchmark_info._replace(
                 command_line_args=benchmark_info.command_line_args
                 + [
                     "--parse-only",
                     "--lang={}".format(ext_to_lang[benchmark_info.benchmark_ext]),
                 ],
-                benchmark_basename=tmpf.name,
+                benchmark_basename="-",
+                benchmark_content=dump_output.decode(),
                 expected_exit_status=0,
                 compare_outputs=False,
             )
         )
-        os.remove(tmpf.name)
-        return exit_code
+
+
+# Options that are implemented by the cvc5 binary instead of the solver, which
+# cannot be tested with the `api` tester
+DRIVER_OPTIONS = re.compile(
+    r"(no-)?(dump-.*|stats.*|parse-only|tlimit|interactive|early-exit|"
+    r"segv-spin|help.*|version|show-config|copyright|portfolio|"
+    r"use-portfolio|stdin-input-per-line|force-no-limit-cpu-while-dump|"
+    r"filename|lang|input-language|output-lang|output-language|out|err|"
+    r"rlimit|reproducible-resource-limit)")
+
+
+class ApiWorker:
+    """A long-lived Python process that runs benchmarks with the cvc5 Python
+    API (see `run_api_worker()`). Requests and responses are exchanged as
+    JSON lines via stdin and stdout. Anything else that is written to stdout
+    (e.g., by cvc5 directly to `std::cout`) is ignored."""
+
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--api-worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        )
+        # Responses are read by a separate thread such that waiting for a
+        # response can time out
+        self.responses = queue.Queue()
+        threading.Thread(target=self.read_responses, daemon=True).start()
+
+    def read_responses(self):
+        for line in self.proc.stdout:
+            try:
+                self.responses.put(json.loads(line))
+            except json.JSONDecodeError:
+                pass
+        self.responses.put(None)
+
+    def run(self, request, timeout):
+        """Sends `request` to the worker and returns its response, or `None`
+        if the worker did not respond within `timeout` seconds. If the worker
+        crashed, the response only contains its exit status (with the same
+        mapping as in `run_process()`) and `crashed` is set."""
+
+        try:
+            self.proc.stdin.write(json.dumps(request) + "\n")
+            self.proc.stdin.flush()
+            response = self.responses.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        except OSError:
+            response = None
+        if response is None:
+            exit_status = self.proc.wait()
+            return {
+                "output": "",
+                "error": "",
+                "exit_status":
+                128 - exit_status if exit_status < 0 else exit_status,
+                "crashed": True,
+            }
+        return response
+
+    def close(self):
+        self.proc.kill()
+        self.proc.wait()
+
+
+class ApiTester(Tester):
+    """Runs benchmarks in-process with the cvc5 Python API (`InputParser` and
+    `Solver`) in long-lived worker processes, with the `COMMAND-LINE` options
+    applied via `setOption`. The cvc5 Python module has to be importable,
+    e.g., by setting `PYTHONPATH`."""
+
+    def __init__(self):
+        super().__init__("api")
+        self.lock = threading.Lock()
+        self.workers = []
+
+    def applies(self, benchmark_info):
+        return (
+            benchmark_info.expected_exit_status == 0
+            and not benchmark_info.expected_error
+            and not benchmark_info.error_scrubber
+            and not benchmark_info.wrapper
+            and all(
+                re.fullmatch(r"--[\w-]+(=\S+)?", arg)
+                and not DRIVER_OPTIONS.fullmatch(arg[2:].split("=")[0])
+                for arg in benchmark_info.command_line_args
+            )
+        )
+
+    def dependencies(self, benchmark_info):
+        spec = importlib.util.find_spec("cvc5")
+        if not spec or not spec.submodule_search_locations:
+            return super().dependencies(benchmark_info)
+        files = sorted(
+            os.path.join(path, f)
+            for path in spec.submodule_search_locations
+            for f in os.listdir(path))
+        # The extension modules are linked against the cvc5 libraries
+        libraries = sorted({
+            library
+            for f in files if ".so" in f or f.endswith(".pyd")
+            for library in get_linked_libraries(f)
+        })
+        return super().dependencies(benchmark_info) + files + libraries
+
+    def run_benchmark(self, benchmark_info):
+        options = []
+        for arg in benchmark_info.command_line_args:
+            name, _, value = arg[2:].partition("=")
+            options.append((name, value))
+        request = {
+            "benchmark": os.path.abspath(
+                os.path.join(benchmark_info.benchmark_dir,
+                             benchmark_info.benchmark_basename)),
+            "options": options,
+        }
+        print("  $ api {}".format(" ".join(
+            benchmark_info.command_line_args
+            + [benchmark_info.benchmark_basename])))
+
+        with self.lock:
+            worker = self.workers.pop() if self.workers else None
+        with g_process_slots or contextlib.nullcontext():
+            start_time = time.perf_counter()
+            worker = worker or ApiWorker()
+            response = worker.run(request, benchmark_info.timeout)
+            wall_time = time.perf_counter() - start_time
+        measurement = getattr(g_measurement, "current", None)
+        if measurement:
+            measurement.add_process(
+                wall_time, None,
+                response["exit_status"] if response else STATUS_TIMEOUT)
+
+        if response is None or response.get("crashed"):
+            # Workers that timed out or crashed cannot be reused
+            worker.close()
+            if response is None:
+                return "", "", STATUS_TIMEOUT
+        else:
+            with self.lock:
+                self.workers.append(worker)
+        return process_outputs(benchmark_info,
+                               response["output"].encode(),
+                               response["error"].encode(),
+                               response["exit_status"])
+
+
+def run_api_worker():
+    """Runs benchmarks with the cvc5 Python API as requested by an `api`
+    tester (see `ApiWorker`) until stdin is closed. Mirrors how the cvc5
+    binary sets up the solver and runs the commands of a benchmark."""
+
+    # The responses are written to a copy of stdout, while anything that cvc5
+    # writes directly to stdout goes to stderr instead
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    try:
+        import cvc5
+    except ImportError as e:
+        import_error = str(e)
+        cvc5 = None
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        if cvc5 is None:
+            response = {
+                "output": "",
+                "error": "cannot import the cvc5 Python module: {}".format(
+                    import_error),
+                "exit_status": EXIT_FAILURE,
+            }
+        else:
+            response = run_api_benchmark(cvc5, request["benchmark"],
+                                         request["options"])
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+def run_api_benchmark(cvc5, benchmark, options):
+    tm = cvc5.TermManager()
+    solver = cvc5.Solver(tm)
+    output = io.StringIO()
+    try:
+        for name, value in options:
+            if not value:
+                value = "false" if name.startswith("no-") else "true"
+                name = name[len("no-"):] if name.startswith("no-") else name
+            solver.setOption(name, value)
+        lang = "smt2"
+        if benchmark.endswith(".sy"):
+            lang = "sygus2"
+            solver.setOption("sygus", "true")
+        solver.setOption("input-language", lang)
+        solver.setOption("output-language", lang)
+        for name, value in [("incremental", "false"),
+                            ("wf-checking", "false")]:
+            if not solver.getOptionInfo(name)["setByUser"]:
+                solver.setOption(name, value)
+        solver.setInfo("filename", benchmark)
+
+        sm = cvc5.SymbolManager(solver)
+        parser = cvc5.InputParser(solver, sm)
+        parser.setFileInput(
+            cvc5.InputLanguage.SYGUS_2_1
+            if lang == "sygus2" else cvc5.InputLanguage.SMT_LIB_2_6,
+            benchmark)
+        while True:
+            cmd = parser.nextCommand()
+            if cmd.isNull():
+                break
+            result = cmd.invoke(solver, sm)
+            output.write(result)
+            if cmd.getCommandName() == "exit" or result.startswith("(error"):
+                break
+    except Exception as e:
+        return {
+            "output": output.getvalue(),
+            "error": "{}: {}".format(type(e).__name__, e),
+            "exit_status": EXIT_FAILURE,
+        }
+    exit_status = EXIT_FAILURE if "(error" in output.getvalue() else EXIT_OK
+    return {
+        "output": output.getvalue(),
+        "error": "",
+        "exit_status": exit_status
+    }
 
 
 g_testers = {
@@ -442,7 +794,8 @@ g_testers = {
     "abduct": AbductTester(),
     "dump": DumpTester(),
     "dsl-proof": DslProofTester(),
-    "alf": AlfTester()
+    "alf": AlfTester(),
+    "api": ApiTester(),
 }
 
 g_default_testers = [
@@ -494,6 +847,39 @@ EXIT_FAILURE = 1
 EXIT_SKIP = 77
 STATUS_TIMEOUT = 124
 
+# The size of the chunks and the maximum size of the output of the first
+# process that `run_pipeline()` keeps in memory
+PIPELINE_CHUNK_SIZE = 1 << 16
+PIPELINE_OUTPUT_LIMIT = 1 << 20
+
+BenchmarkMetadata = collections.namedtuple(
+    "BenchmarkMetadata",
+    [
+        "size",
+        "mtime_ns",
+        "logic",
+        "scrubber",
+        "error_scrubber",
+        "expected_output",
+        "expected_error",
+        "expected_exit_status",
+        "command_lines",
+        "requires",
+        "disabled_testers",
+    ],
+)
+
+DIRECTIVE_REGEX = re.compile(
+    r"^;[^\S\n]*({})(.*)$".format("|".join(
+        re.escape(d) for d in [
+            SCRUBBER, ERROR_SCRUBBER, EXPECT, EXPECT_ERROR, EXIT,
+            COMMAND_LINE, REQUIRES, DISABLE_TESTER
+        ])),
+    re.MULTILINE,
+)
+STATUS_REGEX = re.compile(r"set-info\s*:status\s*(sat|unsat)")
+LOGIC_REGEX = re.compile(r"\(\s*set-logic\s+([^\s()]+)")
+
 
 def print_colored(color, text):
     """Prints `text` in color `color`."""
@@ -537,13 +923,117 @@ def print_diff(actual, expected):
             print("  " + line)
 
 
+class Measurement:
+    """The resource usage of the processes that a test runs. Times are in
+    seconds and the maximum resident set size is in kilobytes (as reported by
+    the operating system). `stats` holds the statistics that cvc5 reported
+    with `--stats` and `exit_statuses` the exit statuses of the processes."""
+
+    def __init__(self):
+        self.wall_time = 0.0
+        self.user_time = 0.0
+        self.sys_time = 0.0
+        self.max_rss = 0
+        self.stats = {}
+        self.exit_statuses = []
+
+    def add_process(self, wall_time, rusage, exit_status):
+        self.wall_time += wall_time
+        self.exit_statuses.append(exit_status)
+        if rusage:
+            self.user_time += rusage.ru_utime
+            self.sys_time += rusage.ru_stime
+            self.max_rss = max(self.max_rss, rusage.ru_maxrss)
+
+
+@contextlib.contextmanager
+def measure_processes():
+    """Measures the resource usage of the processes that the current thread
+    runs within the context and yields the `Measurement`."""
+
+    previous = getattr(g_measurement, "current", None)
+    g_measurement.current = Measurement()
+    try:
+        yield g_measurement.current
+    finally:
+        g_measurement.current = previous
+
+
+def wait_process(proc, timeout):
+    """Waits for the `subprocess.Popen` `proc` to terminate for at most
+    `timeout` seconds (or without a limit if `timeout` is `None`) and returns
+    its return code and its resource usage. The process is reaped with
+    `os.wait4()`, which reports the resource usage of this specific process
+    even if other threads run processes at the same time. On platforms
+    without `os.wait4()`, this falls back to `proc.wait()` and the resource
+    usage is `None`. Raises `subprocess.TimeoutExpired` if the process does
+    not terminate in time."""
+
+    if not hasattr(os, "wait4") or proc.returncode is not None:
+        return proc.wait(timeout), None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    # Poll with an increasing delay, as `subprocess.Popen.wait()` does
+    delay = 0.0005
+    while True:
+        pid, status, rusage = os.wait4(
+            proc.pid, 0 if deadline is None else os.WNOHANG)
+        if pid == proc.pid:
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(proc.args, timeout)
+        delay = min(delay * 2, remaining, 0.05)
+        time.sleep(delay)
+    if os.WIFSIGNALED(status):
+        proc.returncode = -os.WTERMSIG(status)
+    else:
+        proc.returncode = os.WEXITSTATUS(status)
+    return proc.returncode, rusage
+
+
+def split_stats(error):
+    """Removes the statistics that cvc5 prints with `--stats` from the error
+    output `error` and returns the remaining error output and a dictionary
+    with the statistics. Integer and floating-point statistics are converted
+    to numbers, timers to seconds and histograms to dictionaries."""
+
+    stats = {}
+    lines = []
+    for line in error.splitlines(keepends=True):
+        match = re.fullmatch(r"(\w+::\S+) = (.*)", line.rstrip("\r\n"))
+        if not match:
+            lines.append(line)
+            continue
+        name, value = match.groups()
+        if value.startswith("{") and value.endswith("}"):
+            stats[name] = {
+                k.strip(): parse_stat_value(v)
+                for k, _, v in (e.rpartition(":")
+                                for e in value[1:-1].split(",") if e.strip())
+            }
+        else:
+            stats[name] = parse_stat_value(value)
+    return "".join(lines), stats
+
+
+def parse_stat_value(value):
+    value = value.strip()
+    for parse in (int, float):
+        with contextlib.suppress(ValueError):
+            return parse(value)
+    if re.fullmatch(r"[0-9]+ms", value):
+        return int(value[:-2]) / 1000
+    return value
+
+
 def run_process(args, cwd, timeout, s_input=None):
     """Runs a process with a timeout `timeout` in seconds. `args` are the
     arguments to execute, `cwd` is the working directory and `s_input` is the
     input to be sent to the process over stdin. If `args` is a list, the
-    arguments are escaped and concatenated. If `args` is a string, it is
-    executed as-is (without additional escaping. Returns the output, the error
-    output and the exit code of the process. If the process times out, the
+    process is executed directly. If `args` is a string, it is executed as-is
+    by bash. Returns the output, the error output and the exit code of the
+    process. As in bash, the exit code of a process that was terminated by a
+    signal is 128 plus the number of the signal. If the process times out, the
     output and the error output are empty and the exit code is 124."""
 
     cmd = " ".join([shlex.quote(a)
@@ -552,29 +1042,554 @@ def run_process(args, cwd, timeout, s_input=None):
     out = bytes()
     err = bytes()
     exit_status = STATUS_TIMEOUT
-    try:
-        # Instead of setting shell=True, we explicitly call bash. Using
-        # shell=True seems to produce different exit codes on different
-        # platforms under certain circumstances.
-        res = subprocess.run(
-            ["bash", "-c", cmd],
-            cwd=cwd,
-            input=s_input,
-            timeout=timeout,
-            stderr=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-        )
-        out = res.stdout
-        err = res.stderr
-        exit_status = res.returncode
-    except subprocess.TimeoutExpired:
-        exit_status = STATUS_TIMEOUT
+    # Instead of setting shell=True, we explicitly call bash. Using shell=True
+    # seems to produce different exit codes on different platforms under
+    # certain circumstances.
+    popen_args = args if isinstance(args, list) else ["bash", "-c", cmd]
+    with g_process_slots or contextlib.nullcontext():
+        start_time = time.perf_counter()
+        try:
+            proc = subprocess.Popen(
+                popen_args,
+                cwd=cwd,
+                stdin=None if s_input is None else subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        except OSError as e:
+            # Report the same exit codes as bash for commands that cannot be
+            # executed
+            return (out, "{}: {}\n".format(popen_args[0], e.strerror).encode(),
+                    127 if isinstance(e, FileNotFoundError) else 126)
+        # The output is read by separate threads such that the process can be
+        # reaped with `wait_process()` to obtain its resource usage
+        outputs = {}
+
+        def read(name, stream):
+            outputs[name] = stream.read()
+            stream.close()
+
+        def write():
+            with contextlib.suppress(OSError):
+                proc.stdin.write(s_input)
+            with contextlib.suppress(OSError):
+                proc.stdin.close()
+
+        threads = [
+            threading.Thread(target=read, args=("out", proc.stdout)),
+            threading.Thread(target=read, args=("err", proc.stderr)),
+        ]
+        if s_input is not None:
+            threads.append(threading.Thread(target=write))
+        for thread in threads:
+            thread.start()
+        try:
+            exit_status, rusage = wait_process(proc, timeout)
+            if exit_status < 0:
+                exit_status = 128 - exit_status
+            timed_out = False
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            _, rusage = wait_process(proc, None)
+            timed_out = True
+        for thread in threads:
+            thread.join()
+        if not timed_out:
+            out = outputs["out"]
+            err = outputs["err"]
+        wall_time = time.perf_counter() - start_time
+
+    measurement = getattr(g_measurement, "current", None)
+    if measurement:
+        measurement.add_process(wall_time, rusage, exit_status)
 
     return out, err, exit_status
 
 
+# Placeholder for the input of the second process in `run_pipeline()`
+PIPELINE_INPUT = object()
+
+
+def run_pipeline(producer, consumer, cwd, timeout, prefix=b"", skip=b"",
+                 markers=(), tee=None):
+    """Runs the process `producer` and streams its output, preceded by
+    `prefix` and without the leading `skip` (if present), to the process
+    `consumer`, which reads it from the file `PIPELINE_INPUT` in its
+    arguments (`/dev/stdin`). Both processes run concurrently with a timeout
+    `timeout` in seconds for both together, and only a bounded amount of the
+    output is buffered. Returns the (output, error output, exit status) of the
+    producer and the consumer, where the output of the producer is truncated,
+    and the subset of `markers` that occur in the output of the producer. On
+    platforms without `/dev/stdin`, the output is written to a temporary file
+    instead. If `tee` is given, the input of the consumer is also written to
+    this binary file object."""
+
+    if not os.path.exists("/dev/stdin"):
+        output, error, exit_status = run_process(producer, cwd, timeout)
+        if output.startswith(skip):
+            output = output[len(skip):]
+        if tee:
+            tee.write(prefix + output)
+        with tempfile.NamedTemporaryFile() as tmpf:
+            tmpf.write(prefix + output)
+            tmpf.flush()
+            consumed = run_process(
+                [tmpf.name if a is PIPELINE_INPUT else a for a in consumer],
+                cwd, timeout)
+        return ((output[:PIPELINE_OUTPUT_LIMIT], error, exit_status),
+                consumed, {m for m in markers if m in output})
+
+    consumer = ["/dev/stdin" if a is PIPELINE_INPUT else a for a in consumer]
+    print("  $ {} | {}".format(
+        " ".join(shlex.quote(a) for a in producer),
+        " ".join(shlex.quote(a) for a in consumer)))
+    found = set()
+    head = bytearray()
+    outputs = collections.defaultdict(bytes)
+
+    def read(name, stream):
+        outputs[name] = stream.read()
+
+    def relay(source, sink):
+        # Only the last bytes of the previous chunk are kept to find markers
+        # that span chunks
+        tail = b""
+        overlap = max((len(m) for m in markers), default=1) - 1
+        started = False
+        if tee:
+            tee.write(prefix)
+        try:
+            sink.write(prefix)
+        except OSError:
+            sink = None
+        while True:
+            chunk = source.read1(PIPELINE_CHUNK_SIZE)
+            if not chunk:
+                break
+            if not started:
+                if len(head) + len(chunk) < len(skip) and skip.startswith(
+                        bytes(head) + chunk):
+                    head.extend(chunk)
+                    continue
+                chunk = bytes(head) + chunk
+                head.clear()
+                if chunk.startswith(skip):
+                    chunk = chunk[len(skip):]
+                started = True
+            if len(head) < PIPELINE_OUTPUT_LIMIT:
+                head.extend(chunk[:PIPELINE_OUTPUT_LIMIT - len(head)])
+            found.update(m for m in markers if m in tail + chunk)
+            tail = chunk[-overlap:] if overlap else b""
+            if tee:
+                tee.write(chunk)
+            if sink:
+                try:
+                    sink.write(chunk)
+                except OSError:
+                    # The consumer exited, the remaining output is drained
+                    sink = None
+        if not started:
+            found.update(m for m in markers if m in head)
+        if sink:
+            with contextlib.suppress(OSError):
+                sink.close()
+
+    with g_process_slots or contextlib.nullcontext():
+        start_time = time.perf_counter()
+        producer_proc = subprocess.Popen(producer, cwd=cwd,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE)
+        consumer_proc = subprocess.Popen(consumer, cwd=cwd,
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE)
+        threads = [
+            threading.Thread(target=relay,
+                             args=(producer_proc.stdout, consumer_proc.stdin)),
+            threading.Thread(target=read,
+                             args=("producer", producer_proc.stderr)),
+            threading.Thread(target=read,
+                             args=("consumer", consumer_proc.stdout)),
+            threading.Thread(target=read,
+                             args=("consumer_error", consumer_proc.stderr)),
+        ]
+        for thread in threads:
+            thread.start()
+        exit_statuses = []
+        rusages = []
+        for proc in [producer_proc, consumer_proc]:
+            remaining = None
+            if timeout is not None:
+                remaining = max(0, timeout - (time.perf_counter() - start_time))
+            try:
+                exit_status, rusage = wait_process(proc, remaining)
+                exit_statuses.append(
+                    128 - exit_status if exit_status < 0 else exit_status)
+                rusages.append(rusage)
+            except subprocess.TimeoutExpired:
+                for p in [producer_proc, consumer_proc]:
+                    if p.returncode is None:
+                        p.kill()
+                        rusages.append(wait_process(p, None)[1])
+                exit_statuses = [STATUS_TIMEOUT, STATUS_TIMEOUT]
+                break
+        for thread in threads:
+            thread.join()
+        for proc in [producer_proc, consumer_proc]:
+            proc.stdout.close()
+            proc.stderr.close()
+        wall_time = time.perf_counter() - start_time
+
+    measurement = getattr(g_measurement, "current", None)
+    if measurement:
+        measurement.add_process(wall_time, rusages[0], exit_statuses[0])
+        measurement.add_process(0.0, rusages[1], exit_statuses[1])
+
+    if exit_statuses[0] == STATUS_TIMEOUT:
+        return ((b"", b"", STATUS_TIMEOUT), (b"", b"", STATUS_TIMEOUT), found)
+    return (
+        (bytes(head), outputs["producer"], exit_statuses[0]),
+        (outputs["consumer"], outputs["consumer_error"], exit_statuses[1]),
+        found,
+    )
+
+
+# The POSIX character classes and their equivalents in Python's `re` module
+POSIX_CLASSES = {
+    "alnum": "0-9A-Za-z",
+    "alpha": "A-Za-z",
+    "blank": " \\t",
+    "digit": "0-9",
+    "lower": "a-z",
+    "punct": re.escape("!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"),
+    "space": " \\t\\n\\r\\f\\v",
+    "upper": "A-Z",
+    "xdigit": "0-9A-Fa-f",
+}
+
+
+def translate_regex(pattern, extended):
+    """Translates the POSIX basic (or extended if `extended` is true) regular
+    expression `pattern`, as used by `sed` and `grep`, to a regular expression
+    of Python's `re` module. Returns `None` if the regular expression uses
+    features that are not supported."""
+
+    result = ""
+    # Whether a `*` would be at the start of the regular expression or a
+    # group, where it matches a literal `*`
+    at_start = True
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        was_at_start = at_start
+        at_start = False
+        if c == "[":
+            # Bracket expressions, where backslashes are not special
+            j = i + 1
+            items = "^" if pattern[j:j + 1] == "^" else ""
+            j += len(items)
+            if pattern[j:j + 1] == "]":
+                items += "\\]"
+                j += 1
+            while j < len(pattern) and pattern[j] != "]":
+                match = re.match(r"\[:(\w+):\]", pattern[j:])
+                if match:
+                    if match.group(1) not in POSIX_CLASSES:
+                        return None
+                    items += POSIX_CLASSES[match.group(1)]
+                    j += match.end()
+                    continue
+                if pattern[j:j + 2] in ("[.", "[="):
+                    return None
+                items += ("\\" + pattern[j]
+                          if pattern[j] in "\\[&~|" else pattern[j])
+                j += 1
+            if j == len(pattern):
+                return None
+            result += "[" + items + "]"
+            i = j + 1
+            continue
+        if c == "\\":
+            if i + 1 == len(pattern):
+                return None
+            c = pattern[i + 1]
+            i += 2
+            if c in "(){}|+?" and not extended:
+                result += c
+                at_start = c in "(|"
+            elif c.isdigit() or c in "wWsS":
+                result += "\\" + c
+            elif c == "n":
+                result += "\n"
+            elif c.isalnum() or c in "<>`'":
+                # GNU extensions such as `\<` or `\b` are not supported
+                return None
+            else:
+                result += re.escape(c)
+            continue
+        i += 1
+        if c == "*" and was_at_start:
+            result += "\\*"
+        elif (c == "^" and not extended and not was_at_start
+              or c == "$" and not extended and i < len(pattern)
+              and pattern[i:i + 2] not in ("\\)", "\\|")):
+            # In basic regular expressions, `^` and `$` are only anchors at
+            # the start and the end of the regular expression or a group
+            result += re.escape(c)
+        elif c in "(){}|+?" and not extended:
+            result += re.escape(c)
+        elif c in "^$.*(){}|+?":
+            result += c
+            at_start = c == "^" and was_at_start or (extended and c in "(|")
+        else:
+            result += re.escape(c)
+    try:
+        return re.compile(result)
+    except re.error:
+        return None
+
+
+def substitute(regex, replacement, line, count):
+    """Replaces the first `count` (or all if `count` is zero) matches of
+    `regex` in `line` by the `sed` replacement `replacement`. As in `sed`, an
+    empty match directly after a previous match is not replaced."""
+
+    def expand(match):
+        result = ""
+        i = 0
+        while i < len(replacement):
+            c = replacement[i]
+            if c == "&":
+                result += match.group(0)
+            elif c == "\\" and i + 1 < len(replacement):
+                i += 1
+                c = replacement[i]
+                if c.isdigit():
+                    result += match.group(int(c)) or ""
+                else:
+                    result += "\n" if c == "n" else c
+            else:
+                result += c
+            i += 1
+        return result
+
+    result = ""
+    pos = 0
+    num = 0
+    for match in regex.finditer(line):
+        if match.start() == match.end() and num and match.start() == pos:
+            continue
+        result += line[pos:match.start()] + expand(match)
+        pos = match.end()
+        num += 1
+        if num == count:
+            break
+    return result + line[pos:], num > 0
+
+
+def parse_sed_script(script, extended):
+    """Parses a `sed` script and returns a list of commands, which are tuples
+    of an address (a regular expression or `None`), whether the address is
+    negated, the command (`d`, `p` or `s`) and, for `s`, the regular
+    expression, the replacement, the number of replacements and whether to
+    print the result. Returns `None` if the script is not supported."""
+
+    def read_delimited(i, delim):
+        part = ""
+        while i < len(script) and script[i] != delim:
+            if script[i] == "\\" and i + 1 < len(script):
+                part += (script[i + 1] if script[i + 1] == delim else
+                         script[i:i + 2])
+                i += 2
+            else:
+                part += script[i]
+                i += 1
+        return (part, i + 1) if i < len(script) else (None, i)
+
+    commands = []
+    i = 0
+    while i < len(script):
+        if script[i] in " \t\n;":
+            i += 1
+            continue
+        address = None
+        negated = False
+        if script[i] == "/":
+            pattern, i = read_delimited(i + 1, "/")
+            address = (translate_regex(pattern, extended)
+                       if pattern is not None else None)
+            if address is None:
+                return None
+            if script[i:i + 1] == "!":
+                negated = True
+                i += 1
+        command = script[i:i + 1]
+        i += 1
+        if command in ("d", "p"):
+            commands.append((address, negated, command, None, None, 0, False))
+        elif command == "s" and i < len(script):
+            delim = script[i]
+            pattern, i = read_delimited(i + 1, delim)
+            if pattern is None:
+                return None
+            replacement, i = read_delimited(i, delim)
+            regex = translate_regex(pattern, extended)
+            if replacement is None or regex is None:
+                return None
+            flags = re.match(r"[gp]*", script[i:]).group(0)
+            i += len(flags)
+            commands.append((address, negated, "s", regex, replacement,
+                             0 if "g" in flags else 1, "p" in flags))
+        else:
+            return None
+        if i < len(script) and script[i] not in " \t\n;":
+            return None
+    return commands
+
+
+def compile_sed(args):
+    scripts = []
+    quiet = False
+    extended = False
+    i = 0
+    while i < len(args):
+        if args[i] == "-e" and i + 1 < len(args):
+            scripts.append(args[i + 1])
+            i += 2
+        elif args[i] == "-n":
+            quiet = True
+            i += 1
+        elif args[i] in ("-E", "-r"):
+            extended = True
+            i += 1
+        elif not args[i].startswith("-") and not scripts:
+            scripts.append(args[i])
+            i += 1
+        else:
+            return None
+    if not scripts:
+        return None
+    commands = parse_sed_script("\n".join(scripts), extended)
+    if commands is None:
+        return None
+
+    def sed(lines, final_newline):
+        result = []
+        # As GNU sed, the output of the last line does not end with a newline
+        # if the input does not
+        last_start = 0
+        for line in lines:
+            last_start = len(result)
+            deleted = False
+            for address, negated, command, regex, replacement, count, p in (
+                    commands):
+                if address and (address.search(line) is None) != negated:
+                    continue
+                if command == "d":
+                    deleted = True
+                    break
+                if command == "p":
+                    result.append(line)
+                    continue
+                line, replaced = substitute(regex, replacement, line, count)
+                if replaced and p:
+                    result.append(line)
+            if not deleted and not quiet:
+                result.append(line)
+        output = "".join(line + "\n" for line in result)
+        if not final_newline and len(result) > last_start:
+            output = output[:-1]
+        return output
+
+    return sed
+
+
+def compile_grep(args):
+    flags = set()
+    patterns = []
+    for arg in args:
+        if arg.startswith("-") and len(arg) > 1:
+            flags.update(arg[1:])
+        else:
+            patterns.append(arg)
+    if len(patterns) != 1 or not flags <= set("voEFi") or {"v", "o"} <= flags:
+        return None
+    if "F" in flags:
+        regex = re.compile(re.escape(patterns[0]))
+    else:
+        regex = translate_regex(patterns[0], "E" in flags)
+    if regex is None:
+        return None
+    if "i" in flags:
+        regex = re.compile(regex.pattern, re.IGNORECASE)
+
+    def grep(lines, final_newline):
+        if "o" in flags:
+            result = [m.group(0) for line in lines
+                      for m in regex.finditer(line) if m.group(0)]
+        else:
+            result = [line for line in lines
+                      if (regex.search(line) is None) == ("v" in flags)]
+        return "".join(line + "\n" for line in result)
+
+    return grep
+
+
+@functools.lru_cache(maxsize=None)
+def compile_scrubber(scrubber):
+    """Returns a function that applies the scrubber command `scrubber` to a
+    list of lines (and whether the last line ended with a newline) and
+    returns the output if the command is a single `sed` or `grep` command
+    that is supported by the built-in implementation and `None` otherwise.
+    The built-in implementation is tested against bash by
+    `test_run_regression.py`."""
+
+    # Commands with unquoted shell syntax (e.g., pipes) are executed by bash
+    quote = None
+    for c in scrubber:
+        if quote:
+            if c == quote:
+                quote = None
+            elif quote == '"' and c in "$`":
+                return None
+        elif c in "'\"":
+            quote = c
+        elif c in "|&;<>()$`\\*?[]{}~#":
+            return None
+    try:
+        args = shlex.split(scrubber)
+    except ValueError:
+        return None
+    if not args:
+        return None
+    if args[0] == "sed":
+        return compile_sed(args[1:])
+    if args[0] == "grep":
+        return compile_grep(args[1:])
+    return None
+
+
+def run_scrubber(scrubber, cwd, timeout, s_input):
+    """Applies the scrubber command `scrubber` to `s_input`. Common `sed` and
+    `grep` commands are applied without starting a process, other commands
+    are executed with `run_process()`."""
+
+    scrub = compile_scrubber(scrubber)
+    if scrub is None:
+        return run_process(scrubber, cwd, timeout, s_input)
+    print("  $ {}".format(scrubber))
+    lines = s_input.decode(errors="surrogateescape").split("\n")
+    final_newline = lines[-1] == ""
+    if final_newline:
+        lines.pop()
+    output = scrub(lines, final_newline)
+    return output.encode(errors="surrogateescape"), bytes(), EXIT_OK
+
+
 def get_cvc5_features(cvc5_binary):
-    """Returns a list of features supported by the cvc5 binary `cvc5_binary`."""
+    """Returns a list of features supported by the cvc5 binary `cvc5_binary`
+    and a list of features it does not support. This runs cvc5 and is thus
+    called once in `main()`, before any regressions run."""
 
     output, _, _ = run_process([cvc5_binary, "--show-config"], None, None)
     if isinstance(output, bytes):
@@ -610,7 +1625,8 @@ def run_benchmark(benchmark_info):
     file `benchmark_basename` in the directory `benchmark_dir` using the binary
     `cvc5_binary` with the command line options `command_line_args`. The output
     is scrubbed using `scrubber` and `error_scrubber` for stdout and stderr,
-    respectively."""
+    respectively. If `benchmark_basename` is `-`, cvc5 reads the benchmark
+    `benchmark_content` from stdin."""
 
     bin_args = benchmark_info.wrapper[:]
     bin_args.append(benchmark_info.cvc5_binary)
@@ -624,12 +1640,21 @@ def run_benchmark(benchmark_info):
         + [benchmark_info.benchmark_basename],
         benchmark_info.benchmark_dir,
         benchmark_info.timeout,
+        benchmark_info.benchmark_content.encode()
+        if benchmark_info.benchmark_basename == "-" else None,
     )
+    return process_outputs(benchmark_info, output, error, exit_status)
+
+
+def process_outputs(benchmark_info, output, error, exit_status):
+    """Applies the scrubbers of `benchmark_info` to the output and the error
+    output of a run of a benchmark and normalizes them for the comparison
+    with the expected output."""
 
     # If a scrubber command has been specified then apply it to the output.
     scrubber_error = ""
     if benchmark_info.scrubber:
-        output, scrubber_error, _ = run_process(
+        output, scrubber_error, _ = run_scrubber(
             benchmark_info.scrubber,
             benchmark_info.benchmark_dir,
             benchmark_info.timeout,
@@ -639,10 +1664,21 @@ def run_benchmark(benchmark_info):
     check_result =  check_scrubber(scrubber_error, benchmark_info.scrubber)
     if check_result != None:
       return check_result
-    
+
+    # The statistics are removed before the error scrubber is applied, which
+    # could otherwise change them such that they are no longer recognized
+    if g_args.perf_stats and "--stats" in benchmark_info.command_line_args:
+        if isinstance(error, bytes):
+            error = error.decode(errors="surrogateescape")
+        error, stats = split_stats(error)
+        error = error.encode(errors="surrogateescape")
+        measurement = getattr(g_measurement, "current", None)
+        if measurement:
+            measurement.stats.update(stats)
+
     scrubber_error = ""
     if benchmark_info.error_scrubber:
-        error, scrubber_error, _ = run_process(
+        error, scrubber_error, _ = run_scrubber(
             benchmark_info.error_scrubber,
             benchmark_info.benchmark_dir,
             benchmark_info.timeout,
@@ -666,10 +1702,861 @@ def run_benchmark(benchmark_info):
     return (output, error, exit_status)
 
 
+def scan_benchmark(benchmark_path, benchmark_content=None):
+    """Extracts the metadata of the benchmark at `benchmark_path` (with
+    contents `benchmark_content` if already read). Directives may appear
+    anywhere in a benchmark, so the whole benchmark is scanned, but with
+    regular expressions over the whole contents instead of line by line. The
+    status of the benchmark (`set-info :status`) is only extracted if there
+    are no `EXPECT`/`EXPECT-ERROR` directives. Changes to the extracted
+    metadata require increasing `BenchmarkIndex.VERSION`."""
+
+    stat = os.stat(benchmark_path)
+    if benchmark_content is None:
+        with open(benchmark_path, "r") as benchmark_file:
+            benchmark_content = benchmark_file.read()
+
+    directives = collections.defaultdict(list)
+    for match in DIRECTIVE_REGEX.finditer(benchmark_content):
+        directives[match.group(1)].append(match.group(2).strip())
+    expected_output = "".join(
+        line + "\n" for line in directives[EXPECT]).strip()
+    expected_error = "".join(
+        line + "\n" for line in directives[EXPECT_ERROR]).strip()
+    # Expected output/expected error has not been defined in the metadata for
+    # the benchmark. Try to extract the information from the benchmark
+    # itself.
+    if (expected_output == "" and expected_error == ""
+            and benchmark_path.endswith(".smt2")):
+        expected_output = "\n".join(STATUS_REGEX.findall(benchmark_content))
+    logic = LOGIC_REGEX.search(benchmark_content)
+
+    return BenchmarkMetadata(
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        logic=logic.group(1) if logic else None,
+        scrubber=(directives[SCRUBBER] or [None])[-1],
+        error_scrubber=(directives[ERROR_SCRUBBER] or [None])[-1],
+        expected_output=expected_output,
+        expected_error=expected_error,
+        expected_exit_status=(int(directives[EXIT][-1])
+                              if directives[EXIT] else None),
+        command_lines=directives[COMMAND_LINE],
+        requires=directives[REQUIRES],
+        disabled_testers=directives[DISABLE_TESTER],
+    )
+
+
+class BenchmarkIndex:
+    """A persistent index of the metadata of benchmarks, stored as JSON in the
+    file `path`. Entries are keyed by the path of the benchmark and are
+    updated if the size or modification time of the benchmark changes, such
+    that benchmarks only need to be read when they change. The index is
+    discarded if it was written for a different `VERSION`."""
+
+    # Must be increased whenever `BenchmarkMetadata` or `scan_benchmark()`
+    # change
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.modified = False
+        self.entries = {}
+        with contextlib.suppress(OSError, ValueError):
+            with open(path) as index_file:
+                index = json.load(index_file)
+            if (isinstance(index, dict)
+                    and index.get("version") == BenchmarkIndex.VERSION):
+                self.entries = index["entries"]
+
+    def get(self, benchmark_path, benchmark_content=None):
+        """Returns the metadata of the benchmark at `benchmark_path`."""
+
+        key = os.path.realpath(benchmark_path)
+        stat = os.stat(key)
+        with self.lock:
+            entry = self.entries.get(key)
+        if (entry and entry.keys() == set(BenchmarkMetadata._fields)
+                and entry["size"] == stat.st_size
+                and entry["mtime_ns"] == stat.st_mtime_ns):
+            return BenchmarkMetadata(**entry)
+        metadata = scan_benchmark(benchmark_path, benchmark_content)
+        with self.lock:
+            self.entries[key] = metadata._asdict()
+            self.modified = True
+        return metadata
+
+    def save(self):
+        """Writes the index back to its file if it has been modified."""
+
+        with self.lock:
+            if not self.modified:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                        exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                    "w", dir=os.path.dirname(os.path.abspath(self.path)),
+                    delete=False) as tmpf:
+                json.dump(
+                    {
+                        "version": BenchmarkIndex.VERSION,
+                        "entries": self.entries
+                    }, tmpf)
+            os.replace(tmpf.name, self.path)
+            self.modified = False
+
+
+def get_benchmark_metadata(benchmark_path, benchmark_content=None):
+    if g_index:
+        return g_index.get(benchmark_path, benchmark_content)
+    return scan_benchmark(benchmark_path, benchmark_content)
+
+
+def parse_selection(query):
+    """Parses a query for selecting benchmarks, a comma-separated list of
+    conditions of the form `<key>=<pattern>`, `<key>!=<pattern>`,
+    `size<<bytes>` or `size><bytes>`. The keys are `logic`, `requires`,
+    `status` (the expected output), `command-line` and `disable-tester`, and
+    the patterns may contain shell-style wildcards. Returns a function that
+    checks whether the metadata of a benchmark satisfies all conditions."""
+
+    fields = {
+        "logic": lambda m: [m.logic or ""],
+        "requires": lambda m: m.requires,
+        "status": lambda m: m.expected_output.split(),
+        "command-line": lambda m: m.command_lines or [""],
+        "disable-tester": lambda m: m.disabled_testers,
+    }
+    conditions = []
+    for condition in query.split(","):
+        match = re.fullmatch(r"\s*([\w-]+)\s*(!=|=|<|>)\s*(.*?)\s*",
+                             condition)
+        if not match:
+            sys.exit('Invalid selection condition "{}"'.format(condition))
+        key, op, value = match.groups()
+        if key == "size" and op in "<>" and value.isdigit():
+            limit = int(value)
+            conditions.append(
+                (lambda m, limit=limit: m.size < limit) if op == "<" else
+                (lambda m, limit=limit: m.size > limit))
+        elif key in fields and op in ("=", "!="):
+            conditions.append(
+                lambda m, get=fields[key], value=value, negated=op == "!=":
+                any(fnmatch.fnmatchcase(v, value) for v in get(m)) != negated)
+        else:
+            sys.exit('Invalid selection condition "{}"'.format(condition))
+    return lambda metadata: all(c(metadata) for c in conditions)
+
+
+def select_benchmarks(benchmarks, query):
+    """Returns the `benchmarks` whose metadata satisfies the selection
+    `query` (see `parse_selection()`)."""
+
+    selected = parse_selection(query)
+    return [b for b in benchmarks if selected(get_benchmark_metadata(b))]
+
+
+def get_expected_time(benchmark, expected_times):
+    """Returns the expected time of `benchmark` according to `expected_times`
+    (see `PerfDatabase.get_expected_times()`). Benchmarks without measurements
+    are assumed to take as long as the median benchmark."""
+
+    default = (statistics.median(expected_times.values())
+               if expected_times else 1.0)
+    return expected_times.get(get_benchmark_name(benchmark), default)
+
+
+def schedule_benchmarks(benchmarks, expected_times):
+    """Returns the `benchmarks` ordered by decreasing expected time, such that
+    long-running benchmarks do not delay the end of a batch. Benchmarks with
+    the same expected time keep their relative order."""
+
+    return sorted(benchmarks,
+                  key=lambda b: -get_expected_time(b, expected_times))
+
+
+def shard_benchmarks(benchmarks, expected_times, shard):
+    """Partitions the `benchmarks` into `n` shards with roughly the same
+    expected total time and returns the benchmarks of shard `i`, where `shard`
+    is a string `i/n` with `1 <= i <= n`. The partition is deterministic:
+    the benchmarks are assigned in order of decreasing expected time to the
+    shard with the smallest total so far (ties are broken by the shard
+    index)."""
+
+    match = re.fullmatch(r"([0-9]+)/([0-9]+)", shard)
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        sys.exit('Invalid shard "{}", expected i/n with 1 <= i <= n'.format(
+            shard))
+    index, count = int(match.group(1)) - 1, int(match.group(2))
+    totals = [(0.0, i) for i in range(count)]
+    selected = []
+    for benchmark in schedule_benchmarks(sorted(benchmarks), expected_times):
+        total, i = heapq.heappop(totals)
+        if i == index:
+            selected.append(benchmark)
+        heapq.heappush(
+            totals, (total + get_expected_time(benchmark, expected_times), i))
+    return selected
+
+
+def prepare_batch(benchmarks, select, shard, perf_db):
+    """Filters the `benchmarks` of a batch by the query `select` and the
+    shard `shard` (if given) and orders them by decreasing expected time
+    according to the measurements in `perf_db` (if given)."""
+
+    if select:
+        benchmarks = select_benchmarks(benchmarks, select)
+    expected_times = perf_db.get_expected_times() if perf_db else {}
+    if shard:
+        benchmarks = shard_benchmarks(benchmarks, expected_times, shard)
+    if expected_times:
+        benchmarks = schedule_benchmarks(benchmarks, expected_times)
+    return benchmarks
+
+
+class Profile:
+    """Collects the statistics of cvc5 (`--stats --stats-internal`) for the
+    benchmarks of a run and reports which resource steps, theories and
+    preprocessing passes dominate the run time of the suite as well as the
+    benchmarks that are outliers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = []
+
+    def record(self, benchmark_info, measurement):
+        with self.lock:
+            self.records.append((
+                get_benchmark_name(
+                    os.path.join(benchmark_info.benchmark_dir,
+                                 benchmark_info.benchmark_basename)),
+                " ".join(benchmark_info.command_line_args),
+                measurement.wall_time,
+                measurement.stats,
+            ))
+
+    def print_table(self, title, totals, total, unit, top):
+        """Prints the `top` entries of the dictionary `totals` with the
+        largest values and their share of `total` (if given)."""
+
+        if not totals:
+            return
+        print()
+        print_info(title)
+        for name, value in sorted(totals.items(),
+                                  key=lambda e: (-e[1], e[0]))[:top]:
+            share = "{:.1%}".format(value / total) if total else ""
+            print("  {:>14} {:>6}  {}".format(unit.format(value), share,
+                                             name))
+
+    def report(self, top=15):
+        total_time = sum(record[2] for record in self.records)
+        steps = collections.Counter()
+        inferences = collections.Counter()
+        theories = collections.Counter()
+        theory_times = collections.Counter()
+        passes = collections.Counter()
+        for _, _, _, stats in self.records:
+            steps.update(stats.get("resource::steps::resource", {}))
+            for inference, count in stats.get("resource::steps::inference-id",
+                                              {}).items():
+                inferences[inference] += count
+                theories[inference.split("_")[0]] += count
+            for name, value in stats.items():
+                if not isinstance(value, float):
+                    continue
+                match = re.fullmatch(r"theory::(\w+)::checkTime", name)
+                if match:
+                    theory_times[match.group(1)] += value
+                match = re.fullmatch(r"preprocessing::([\w-]+)", name)
+                if match:
+                    passes[match.group(1)] += value
+
+        print()
+        print("Profiled {} runs in {:.1f}s".format(len(self.records),
+                                                   total_time))
+        self.print_table("Resource steps", steps, sum(steps.values()), "{:d}",
+                         top)
+        self.print_table("Inferences by theory", theories,
+                         sum(theories.values()), "{:d}", top)
+        self.print_table("Inferences", inferences, sum(inferences.values()),
+                         "{:d}", top)
+        self.print_table("Theory check time", theory_times, total_time,
+                         "{:.2f}s", top)
+        self.print_table("Preprocessing passes", passes, total_time,
+                         "{:.2f}s", top)
+
+        runs = {
+            "{} {}".format(benchmark, command_line).strip(): wall_time
+            for benchmark, command_line, wall_time, _ in self.records
+        }
+        self.print_table("Slowest benchmarks", runs, total_time, "{:.2f}s",
+                         top)
+
+        # Benchmarks that spend much more or much less time per resource unit
+        # than the median benchmark are poorly reflected by resource limits
+        rates = {
+            "{} {}".format(benchmark, command_line).strip():
+            wall_time / stats["resource::resourceUnitsUsed"]
+            for benchmark, command_line, wall_time, stats in self.records
+            if stats.get("resource::resourceUnitsUsed") and wall_time > 0.1
+        }
+        if len(rates) > 1:
+            median = statistics.median(rates.values())
+            outliers = {
+                name: rate / median
+                for name, rate in rates.items()
+                if rate > 4 * median or rate < median / 4
+            }
+            self.print_table("Outliers in time per resource unit "
+                             "(relative to the median)", outliers,
+                             None, "{:.2f}x", top)
+
+
+class ResultsWriter:
+    """Writes the results of tests in machine-readable formats: one JSON
+    object per test to the file `jsonl_path` (appended as tests finish) and a
+    JUnit XML report to the file `junit_path` (written by `close()`). Each
+    result includes the wall time, the tester, the exit statuses of the
+    processes and an excerpt of the output of the test (e.g., the diff of
+    the expected and actual output). Tests that passed according to the
+    result cache are recorded as passed with `cached` set and no
+    measurements."""
+
+    # The maximum number of characters of the output in a result
+    MAX_DETAILS = 4000
+
+    def __init__(self, jsonl_path, junit_path):
+        self.lock = threading.Lock()
+        self.jsonl_file = open(jsonl_path, "a") if jsonl_path else None
+        self.junit_path = junit_path
+        self.results = []
+
+    def record(self, tester, benchmark_info, exit_code, measurement, output,
+               cached=False):
+        details = re.sub(r"\033\[[0-9;]*m", "", output).strip()
+        if len(details) > self.MAX_DETAILS:
+            details = "...\n" + details[-self.MAX_DETAILS:]
+        if exit_code == EXIT_OK:
+            result = "passed"
+        elif exit_code == EXIT_SKIP:
+            result = "skipped"
+        elif STATUS_TIMEOUT in measurement.exit_statuses:
+            result = "timeout"
+        else:
+            result = "failed"
+        entry = {
+            "benchmark": get_benchmark_name(
+                os.path.join(benchmark_info.benchmark_dir,
+                             benchmark_info.benchmark_basename)),
+            "tester": tester.name,
+            "command_line": benchmark_info.command_line_args,
+            "result": result,
+            "exit_code": exit_code,
+            "exit_statuses": measurement.exit_statuses,
+            "wall_time": measurement.wall_time,
+            "cpu_time": measurement.user_time + measurement.sys_time,
+            "max_rss": measurement.max_rss,
+            "timeout": benchmark_info.timeout,
+            "details": details if result != "passed" else "",
+            "cached": cached,
+        }
+        if measurement.stats:
+            entry["stats"] = measurement.stats
+        with self.lock:
+            self.results.append(entry)
+            if self.jsonl_file:
+                self.jsonl_file.write(json.dumps(entry) + "\n")
+                self.jsonl_file.flush()
+
+    def close(self):
+        if self.jsonl_file:
+            self.jsonl_file.close()
+        if not self.junit_path:
+            return
+        suite = ET.Element(
+            "testsuite",
+            name="regress",
+            tests=str(len(self.results)),
+            failures=str(sum(r["result"] in ("failed", "timeout")
+                             for r in self.results)),
+            skipped=str(sum(r["result"] == "skipped" for r in self.results)),
+            time="{:.3f}".format(sum(r["wall_time"] for r in self.results)),
+        )
+        for r in self.results:
+            case = ET.SubElement(
+                suite,
+                "testcase",
+                classname=r["benchmark"],
+                name=" ".join([r["tester"]] + r["command_line"]),
+                time="{:.3f}".format(r["wall_time"]),
+            )
+            if r["cached"]:
+                properties = ET.SubElement(case, "properties")
+                ET.SubElement(properties, "property", name="cached",
+                              value="true")
+            if r["result"] == "skipped":
+                ET.SubElement(case, "skipped")
+            elif r["result"] != "passed":
+                failure = ET.SubElement(
+                    case, "failure", message=r["result"])
+                failure.text = r["details"]
+        testsuites = ET.Element("testsuites")
+        testsuites.append(suite)
+        ET.ElementTree(testsuites).write(self.junit_path, encoding="utf-8",
+                                         xml_declaration=True)
+
+
+@functools.lru_cache(maxsize=None)
+def get_linked_libraries(path):
+    """Returns the cvc5 libraries (e.g., `libcvc5.so` and `libcvc5parser.so`)
+    that the executable or shared library at `path` is linked against. The
+    libraries are resolved with `ldd`. If that fails (e.g., on macOS), the
+    cvc5 libraries in the `lib` directory next to the directory of `path` are
+    returned, which is where the build directory and the installation put
+    them."""
+
+    try:
+        output = subprocess.run(
+            ["ldd", path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        ).stdout.decode(errors="replace")
+        return tuple(
+            sorted(
+                re.findall(r"^\s*libcvc5\S*\s+=>\s+(\S+)", output,
+                           re.MULTILINE)))
+    except (OSError, subprocess.CalledProcessError):
+        lib_dir = os.path.normpath(
+            os.path.join(os.path.dirname(os.path.abspath(path)), os.pardir,
+                         "lib"))
+        if not os.path.isdir(lib_dir):
+            return ()
+        return tuple(
+            sorted(
+                os.path.join(lib_dir, f) for f in os.listdir(lib_dir)
+                if f.startswith("libcvc5") and (".so" in f or
+                                                f.endswith(".dylib"))))
+
+
+def get_cvc5_files(cvc5_binary):
+    """Returns the cvc5 binary and the cvc5 libraries that it is linked
+    against. With a shared build (the default), changes to the solver only
+    change the libraries."""
+
+    return [cvc5_binary] + list(get_linked_libraries(cvc5_binary))
+
+
+class ResultCache:
+    """A cache for the results of tests, stored in the directory `cache_dir`.
+    The key of a test is the hash of the contents of the files that the test
+    depends on (e.g., the cvc5 binary and libraries), the benchmark, the name
+    of the tester and the command line. Only successful tests are cached. If
+    the size of the cache exceeds `max_size` bytes, the least recently used
+    entries are removed."""
+
+    def __init__(self, cache_dir, max_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.file_digests = {}
+
+    def get_file_digest(self, path):
+        """Returns the hash of the contents of the file at `path`. Since
+        hashing large binaries is expensive, the hash is also stored in the
+        cache directory, keyed by the path, size and modification time of the
+        file."""
+
+        if not os.path.isfile(path):
+            return ""
+        stat = os.stat(path)
+        file_id = "{}:{}:{}".format(
+            os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            if file_id in self.file_digests:
+                return self.file_digests[file_id]
+        digest_path = os.path.join(
+            self.cache_dir, "files",
+            hashlib.sha256(file_id.encode()).hexdigest())
+        if os.path.isfile(digest_path):
+            with open(digest_path) as digest_file:
+                digest = digest_file.read()
+        else:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            digest = h.hexdigest()
+            self.write_file(digest_path, digest)
+        with self.lock:
+            self.file_digests[file_id] = digest
+        return digest
+
+    def get_key(self, tester, benchmark_info):
+        """Returns the key of running `tester` on `benchmark_info`."""
+
+        h = hashlib.sha256()
+        for path in tester.dependencies(benchmark_info):
+            h.update(self.get_file_digest(path).encode() + b"\0")
+        h.update(benchmark_info.benchmark_content.encode() + b"\0")
+        h.update(tester.name.encode() + b"\0")
+        for arg in benchmark_info.wrapper + benchmark_info.command_line_args:
+            h.update(arg.encode() + b"\0")
+        return h.hexdigest()
+
+    def get_entry_path(self, key):
+        return os.path.join(self.cache_dir, "results", key[:2], key)
+
+    def get_proof_key(self, benchmark_info, cvc5_args, prefix):
+        """Returns the key of the proof dumped by cvc5 with `cvc5_args` for
+        `benchmark_info`, which is preceded by `prefix`. Like the key of a
+        test, it depends on the cvc5 binary and libraries (see
+        `get_cvc5_files()`)."""
+
+        h = hashlib.sha256()
+        for path in get_cvc5_files(benchmark_info.cvc5_binary):
+            h.update(self.get_file_digest(path).encode() + b"\0")
+        h.update(benchmark_info.benchmark_content.encode() + b"\0")
+        for arg in cvc5_args:
+            h.update(arg.encode() + b"\0")
+        h.update(prefix)
+        return h.hexdigest()
+
+    def get_proof_path(self, key):
+        return os.path.join(self.cache_dir, "proofs", key[:2], key)
+
+    def lookup_proof(self, key):
+        """Returns the path of the cached proof for `key` or `None`."""
+
+        path = self.get_proof_path(key)
+        try:
+            # Mark the entry as recently used
+            os.utime(path)
+            return path
+        except OSError:
+            return None
+
+    @contextlib.contextmanager
+    def new_proof(self):
+        """Yields a temporary file for writing a proof, which can be stored
+        in the cache with `store_proof()` and is removed otherwise."""
+
+        proofs_dir = os.path.join(self.cache_dir, "proofs")
+        os.makedirs(proofs_dir, exist_ok=True)
+        tmpf = tempfile.NamedTemporaryFile(dir=proofs_dir,
+                                           suffix=".tmp",
+                                           delete=False)
+        try:
+            yield tmpf
+        finally:
+            tmpf.close()
+            with contextlib.suppress(OSError):
+                os.remove(tmpf.name)
+
+    def store_proof(self, key, proof_file):
+        """Stores the proof written to `proof_file` (see `new_proof()`) for
+        `key`."""
+
+        proof_file.close()
+        path = self.get_proof_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(proof_file.name, path)
+
+    def write_file(self, path, content):
+        """Atomically writes `content` to `path`, such that concurrent
+        processes never see partially written files."""
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+                "w", dir=os.path.dirname(path), delete=False) as tmpf:
+            tmpf.write(content)
+        os.replace(tmpf.name, path)
+
+    def lookup(self, key):
+        """Returns the cached exit code for `key` or `None`."""
+
+        path = self.get_entry_path(key)
+        try:
+            with open(path) as entry_file:
+                entry = json.load(entry_file)
+            # Mark the entry as recently used
+            os.utime(path)
+            return entry["exit_code"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def store(self, key, exit_code):
+        """Stores `exit_code` for `key`. Scanning the cache for eviction is
+        expensive, so it is only done for a fixed fraction of the keys."""
+
+        self.write_file(self.get_entry_path(key),
+                        json.dumps({"exit_code": exit_code}))
+        if key.startswith("00"):
+            self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the size of the cache
+        is below `max_size`."""
+
+        entries = []
+        total_size = 0
+        for root, _, files in itertools.chain(
+                os.walk(os.path.join(self.cache_dir, "results")),
+                os.walk(os.path.join(self.cache_dir, "proofs"))):
+            for f in files:
+                if f.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, f)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            total_size -= size
+
+
+@functools.lru_cache
+def get_commit(rev="HEAD"):
+    """Returns the commit hash of the revision `rev` of the repository that
+    contains this script or `rev` itself if it cannot be resolved."""
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--verify", "--quiet", rev + "^{commit}"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return rev
+
+
+def get_benchmark_name(benchmark_path):
+    """Returns the path of the benchmark relative to the regression directory
+    if possible, such that measurements from different build directories can
+    be compared."""
+
+    path = os.path.abspath(benchmark_path)
+    regress_dir = os.path.dirname(os.path.abspath(__file__))
+    if os.path.commonpath([regress_dir, path]) == regress_dir:
+        return os.path.relpath(path, regress_dir)
+    return path
+
+
+class PerfDatabase:
+    """A database of the performance measurements of tests, stored in the
+    SQLite database at `path`. Each run of a test is recorded with the commit
+    `commit_id`, such that the measurements of different commits can be
+    compared with `perf_report()`."""
+
+    def __init__(self, path, commit_id):
+        self.commit_id = commit_id
+        self.lock = threading.Lock()
+        # The wall times of the tests, loaded on demand
+        self.wall_times = None
+        # Multiple processes (e.g., ctest -j) may write to the same database
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "commit_id TEXT, benchmark TEXT, tester TEXT, "
+                "command_line TEXT, wall_time REAL, user_time REAL, "
+                "sys_time REAL, max_rss INTEGER, stats TEXT, "
+                "exit_code INTEGER, timestamp REAL)")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS runs_commit ON runs (commit_id)")
+
+    def record(self, tester, benchmark_info, exit_code, measurement):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.commit_id,
+                    get_benchmark_name(
+                        os.path.join(benchmark_info.benchmark_dir,
+                                     benchmark_info.benchmark_basename)),
+                    tester.name,
+                    " ".join(benchmark_info.command_line_args),
+                    measurement.wall_time,
+                    measurement.user_time,
+                    measurement.sys_time,
+                    measurement.max_rss,
+                    json.dumps(measurement.stats),
+                    exit_code,
+                    time.time(),
+                ),
+            )
+
+    def get_runs(self, commit_id):
+        """Returns a dictionary that maps (benchmark, tester, command line) to
+        the list of (CPU time, maximum RSS) pairs of the successful runs of
+        `commit_id`."""
+
+        runs = collections.defaultdict(list)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT benchmark, tester, command_line, user_time + sys_time, "
+                "max_rss FROM runs WHERE commit_id = ? AND exit_code = ?",
+                (commit_id, EXIT_OK))
+            for benchmark, tester, command_line, cpu_time, max_rss in rows:
+                runs[(benchmark, tester, command_line)].append(
+                    (cpu_time, max_rss))
+        return runs
+
+    def get_adaptive_timeout(self, tester, benchmark_info, factor, floor):
+        """Returns the timeout for running `tester` on `benchmark_info`,
+        `factor` times the 95th percentile of the wall times of its successful
+        runs, but at least `floor` and at most the timeout of
+        `benchmark_info`. Tests without measurements use the timeout of
+        `benchmark_info`."""
+
+        with self.lock:
+            if self.wall_times is None:
+                self.wall_times = collections.defaultdict(list)
+                rows = self.conn.execute(
+                    "SELECT benchmark, tester, command_line, wall_time "
+                    "FROM runs WHERE exit_code = ?", (EXIT_OK,))
+                for benchmark, tester_name, command_line, wall_time in rows:
+                    self.wall_times[(benchmark, tester_name,
+                                     command_line)].append(wall_time)
+        wall_times = self.wall_times.get((
+            get_benchmark_name(
+                os.path.join(benchmark_info.benchmark_dir,
+                             benchmark_info.benchmark_basename)),
+            tester.name,
+            " ".join(benchmark_info.command_line_args),
+        ))
+        if not wall_times:
+            return benchmark_info.timeout
+        if len(wall_times) == 1:
+            p95 = wall_times[0]
+        else:
+            p95 = statistics.quantiles(wall_times, n=20,
+                                       method="inclusive")[-1]
+        return min(benchmark_info.timeout, max(floor, factor * p95))
+
+    def get_expected_times(self):
+        """Returns a dictionary that maps benchmarks to their expected wall
+        time, the sum of the median wall times of their tests over the
+        successful runs of all commits."""
+
+        times = collections.defaultdict(list)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT benchmark, tester, command_line, wall_time FROM runs "
+                "WHERE exit_code = ?", (EXIT_OK,))
+            for benchmark, tester, command_line, wall_time in rows:
+                times[(benchmark, tester, command_line)].append(wall_time)
+        expected_times = collections.defaultdict(float)
+        for (benchmark, _, _), wall_times in times.items():
+            expected_times[benchmark] += statistics.median(wall_times)
+        return dict(expected_times)
+
+    def close(self):
+        self.conn.close()
+
+
+def is_significant(baseline, current):
+    """Returns true if the mean of the samples in `current` is significantly
+    larger than the mean of the samples in `baseline`, using Welch's t-test
+    (with a critical value of 2, i.e., roughly 95% confidence). If either side
+    has fewer than two samples, the difference is assumed to be significant.
+    """
+
+    if len(baseline) < 2 or len(current) < 2:
+        return True
+    error = math.sqrt(
+        statistics.variance(baseline) / len(baseline)
+        + statistics.variance(current) / len(current))
+    diff = statistics.mean(current) - statistics.mean(baseline)
+    if error == 0:
+        return diff > 0
+    return diff / error > 2
+
+
+def perf_report(perf_db, baseline, current, threshold, min_time):
+    """Compares the measurements of the commit `current` against the commit
+    `baseline` and prints the tests whose CPU time increased by more than
+    `threshold` (relative) and `min_time` seconds, or whose maximum resident
+    set size increased by more than `threshold`. Returns `EXIT_FAILURE` if
+    any such test exists and `EXIT_OK` otherwise."""
+
+    baseline_runs = perf_db.get_runs(baseline)
+    current_runs = perf_db.get_runs(current)
+    if not baseline_runs:
+        print_error("No measurements for baseline {}".format(baseline))
+        return EXIT_FAILURE
+    if not current_runs:
+        print_error("No measurements for {}".format(current))
+        return EXIT_FAILURE
+
+    regressions = []
+    for key in sorted(baseline_runs.keys() & current_runs.keys()):
+        base_times, base_rss = zip(*baseline_runs[key])
+        cur_times, cur_rss = zip(*current_runs[key])
+        base_time = statistics.median(base_times)
+        cur_time = statistics.median(cur_times)
+        if (cur_time > base_time * (1 + threshold)
+                and cur_time - base_time > min_time
+                and is_significant(base_times, cur_times)):
+            regressions.append((key, "time", "{:.2f}s -> {:.2f}s".format(
+                base_time, cur_time), cur_time / max(base_time, 1e-6)))
+        base_mem = max(base_rss)
+        cur_mem = max(cur_rss)
+        if base_mem and cur_mem > base_mem * (1 + threshold):
+            regressions.append((key, "memory", "{}KB -> {}KB".format(
+                base_mem, cur_mem), cur_mem / base_mem))
+
+    print("Compared {} tests of {} against baseline {}".format(
+        len(baseline_runs.keys() & current_runs.keys()), current, baseline))
+    for (benchmark, tester, command_line), kind, change, ratio in sorted(
+            regressions, key=lambda r: -r[3]):
+        print_error("{} ({}, {}): {} {} ({:+.0%})".format(
+            benchmark, tester, command_line or "no options", kind, change,
+            ratio - 1))
+    if regressions:
+        print_error("{} performance regressions".format(len(regressions)))
+        return EXIT_FAILURE
+    print_ok("No performance regressions")
+    return EXIT_OK
+
+
+def run_tests(tests, jobs):
+    """Runs the `tests`, a list of pairs of testers and benchmark infos, and
+    returns their exit codes. If `jobs` is greater than one, the tests run
+    concurrently and their output is printed in the order of `tests` once all
+    of them have finished."""
+
+    if jobs <= 1 or len(tests) <= 1:
+        return [tester.run(benchmark_info) for tester, benchmark_info in tests]
+
+    def run_test(test):
+        tester, benchmark_info = test
+        with capture_output() as output:
+            exit_code = tester.run(benchmark_info)
+        return exit_code, output.getvalue()
+
+    with concurrent.futures.ThreadPoolExecutor(len(tests)) as pool:
+        results = list(pool.map(run_test, tests))
+    for _, output in results:
+        sys.stdout.write(output)
+    return [exit_code for exit_code, _ in results]
+
+
 def run_regression(
     testers,
     wrapper,
     cvc5_binary,
+    cvc5_features,
     lfsc_binary,
     lfsc_sigs,
     alfc_binary,
@@ -678,96 +2565,60 @@ def run_regression(
 ):
     """Determines the expected output for a benchmark, runs cvc5 on it using
     all the specified `testers` and then checks whether the output corresponds
-    to the expected output. Optionally uses a wrapper `wrapper`."""
+    to the expected output. Optionally uses a wrapper `wrapper`.
+    `cvc5_features` is the result of `get_cvc5_features()` for
+    `cvc5_binary`."""
+
+    # The list is modified by `DISABLE-TESTER` directives
+    testers = list(testers)
 
     if not os.access(cvc5_binary, os.X_OK):
         sys.exit('"{}" does not exist or is not executable'.format(cvc5_binary))
     if not os.path.isfile(benchmark_path):
         sys.exit('"{}" does not exist or is not a file'.format(benchmark_path))
 
-    cvc5_features, cvc5_disabled_features = get_cvc5_features(cvc5_binary)
+    cvc5_features, cvc5_disabled_features = cvc5_features
 
     basic_command_line_args = []
 
     benchmark_basename = os.path.basename(benchmark_path)
     benchmark_filename, benchmark_ext = os.path.splitext(benchmark_basename)
     benchmark_dir = os.path.dirname(benchmark_path)
-    comment_char = "%"
-    status_regex = None
-    status_to_output = lambda s: s
-    if benchmark_ext == ".smt2":
-        status_regex = r"set-info\s*:status\s*(sat|unsat)"
-        comment_char = ";"
-    elif benchmark_ext == ".sy":
-        comment_char = ";"
-    else:
+    if benchmark_ext not in (".smt2", ".sy"):
         sys.exit('"{}" must be *.smt2 or *.sy'.format(benchmark_basename))
 
-    benchmark_lines = None
     with open(benchmark_path, "r") as benchmark_file:
-        benchmark_lines = benchmark_file.readlines()
-    benchmark_content = "".join(benchmark_lines)
+        benchmark_content = benchmark_file.read()
 
     # Extract the metadata for the benchmark.
-    scrubber = None
-    error_scrubber = None
-    expected_output = ""
-    expected_error = ""
-    expected_exit_status = None
-    command_lines = []
-    requires = []
-    for line in benchmark_lines:
-        # Skip lines that do not start with a comment character.
-        if line[0] != comment_char:
-            continue
-        line = line[1:].lstrip()
-
-        if line.startswith(SCRUBBER):
-            scrubber = line[len(SCRUBBER) :].strip()
-        elif line.startswith(ERROR_SCRUBBER):
-            error_scrubber = line[len(ERROR_SCRUBBER) :].strip()
-        elif line.startswith(EXPECT):
-            expected_output += line[len(EXPECT) :].strip() + "\n"
-        elif line.startswith(EXPECT_ERROR):
-            expected_error += line[len(EXPECT_ERROR) :].strip() + "\n"
-        elif line.startswith(EXIT):
-            expected_exit_status = int(line[len(EXIT) :].strip())
-        elif line.startswith(COMMAND_LINE):
-            command_lines.append(line[len(COMMAND_LINE) :].strip())
-        elif line.startswith(REQUIRES):
-            requires.append(line[len(REQUIRES) :].strip())
-        elif line.startswith(DISABLE_TESTER):
-            disable_tester = line[len(DISABLE_TESTER) :].strip()
-            if disable_tester not in g_testers:
-                print("Unknown tester: {}".format(disable_tester))
-                return EXIT_FAILURE
-            if disable_tester in testers:
-                testers.remove(disable_tester)
-            if disable_tester == "proof":
-                if "lfsc" in testers:
-                    testers.remove("lfsc")
-                if "dsl-proof" in testers:
-                    testers.remove("dsl-proof")
-                if "alf" in testers:
-                    testers.remove("alf")
-
-    expected_output = expected_output.strip()
-    expected_error = expected_error.strip()
-
-    # Expected output/expected error has not been defined in the metadata for
-    # the benchmark. Try to extract the information from the benchmark itself.
-    if expected_output == "" and expected_error == "":
-        match = None
-        if status_regex:
-            match = re.findall(status_regex, benchmark_content)
-
-        if match:
-            expected_output = status_to_output("\n".join(match))
-        elif expected_exit_status is None:
-            # If there is no expected output/error and the exit status has not
-            # been set explicitly, the benchmark is invalid.
-            print_error('Cannot determine status of benchmark')
+    metadata = get_benchmark_metadata(benchmark_path, benchmark_content)
+    scrubber = metadata.scrubber
+    error_scrubber = metadata.error_scrubber
+    expected_output = metadata.expected_output
+    expected_error = metadata.expected_error
+    expected_exit_status = metadata.expected_exit_status
+    command_lines = list(metadata.command_lines)
+    requires = metadata.requires
+    for disable_tester in metadata.disabled_testers:
+        if disable_tester not in g_testers:
+            print("Unknown tester: {}".format(disable_tester))
             return EXIT_FAILURE
+        if disable_tester in testers:
+            testers.remove(disable_tester)
+        if disable_tester == "proof":
+            if "lfsc" in testers:
+                testers.remove("lfsc")
+            if "dsl-proof" in testers:
+                testers.remove("dsl-proof")
+            if "alf" in testers:
+                testers.remove("alf")
+
+    if (expected_output == "" and expected_error == ""
+            and expected_exit_status is None):
+        # If there is no expected output/error and the exit status has not
+        # been set explicitly, the benchmark is invalid.
+        print_error('Cannot determine status of benchmark')
+        return EXIT_FAILURE
     if expected_exit_status is None:
         expected_exit_status = 0
 
@@ -836,8 +2687,7 @@ def run_regression(
     # Run cvc5 on the benchmark with the different testers and check whether
     # the exit status, stdout output, stderr output are as expected.
     exit_code = EXIT_OK
-    for tester, benchmark_info in tests:
-        test_exit_code = tester.run(benchmark_info)
+    for test_exit_code in run_tests(tests, g_args.jobs):
         if exit_code == EXIT_FAILURE or test_exit_code == EXIT_FAILURE:
             exit_code = EXIT_FAILURE
         else:
@@ -846,14 +2696,161 @@ def run_regression(
     return exit_code
 
 
+def get_regress_level_benchmarks(level):
+    """Returns the benchmarks of regression level `level` as listed in the
+    `CMakeLists.txt` file next to this script."""
+
+    cmake_dir = os.path.dirname(os.path.abspath(__file__))
+    benchmarks = []
+    with open(os.path.join(cmake_dir, "CMakeLists.txt")) as cmake_file:
+        in_list = False
+        for line in cmake_file:
+            line = line.split("#")[0].strip()
+            if line == "set(regress_{}_tests".format(level):
+                in_list = True
+            elif in_list and line == ")":
+                break
+            elif in_list and line:
+                benchmarks.append(os.path.join(cmake_dir, line))
+    if not benchmarks:
+        sys.exit('No benchmarks found for regression level {}'.format(level))
+    return benchmarks
+
+
+def get_batch_benchmarks(spec):
+    """Returns the benchmarks for a batch run. `spec` is either a
+    comma-separated list of regression levels (e.g., `regress0,regress1`) or
+    the path of a file that lists one benchmark per line."""
+
+    levels = spec.split(",")
+    if all(re.fullmatch(r"regress[0-9]+", level) for level in levels):
+        benchmarks = []
+        for level in levels:
+            benchmarks.extend(
+                get_regress_level_benchmarks(level[len("regress"):]))
+        return benchmarks
+    if not os.path.isfile(spec):
+        sys.exit('"{}" is neither a regression level nor a file'.format(spec))
+    with open(spec) as list_file:
+        return [line.strip() for line in list_file if line.strip()]
+
+
+def run_regression_captured(*args):
+    """Calls `run_regression()` with `args` and returns its exit code together
+    with everything it printed."""
+
+    with capture_output() as output:
+        try:
+            exit_code = run_regression(*args)
+        except SystemExit as e:
+            if e.code is not None and not isinstance(e.code, int):
+                print_error(str(e.code))
+            exit_code = EXIT_FAILURE if e.code else EXIT_OK
+    return exit_code, output.getvalue()
+
+
+def run_batch(benchmarks, jobs, args, timeout):
+    """Runs `run_regression()` with arguments `args` and timeout `timeout` on
+    each of the `benchmarks` using a pool of `jobs` workers. The verdicts are printed in
+    the order of `benchmarks`, together with the output of failed
+    regressions. Returns `EXIT_FAILURE` if any of the regressions failed."""
+
+    results = collections.Counter()
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        futures = [
+            pool.submit(run_regression_captured, *args, benchmark, timeout)
+            for benchmark in benchmarks
+        ]
+        for benchmark, future in zip(benchmarks, futures):
+            exit_code, output = future.result()
+            if exit_code == EXIT_FAILURE:
+                sys.stdout.write(output)
+                print_error(benchmark)
+            elif exit_code == EXIT_SKIP:
+                print_info("Skipped " + benchmark)
+            else:
+                print_ok(benchmark)
+            results[exit_code] += 1
+            sys.stdout.flush()
+
+    print()
+    print("{} passed, {} failed, {} skipped out of {} regressions".format(
+        results[EXIT_OK], results[EXIT_FAILURE], results[EXIT_SKIP],
+        len(benchmarks)))
+    return EXIT_FAILURE if results[EXIT_FAILURE] else EXIT_OK
+
+
 def main():
     """Parses the command line arguments and then calls the core of the
     script."""
 
     global g_args
+    global g_process_slots
+    global g_cache
+    global g_perf_db
+    global g_index
+    global g_results
+    global g_profile
+
+    # The options for performance measurements and benchmark selection are
+    # parsed first, since the report and list modes do not need a cvc5 binary
+    # and a benchmark
+    perf_parser = argparse.ArgumentParser(add_help=False)
+    perf_parser.add_argument(
+        "--perf-db",
+        help="SQLite database to record the run time and memory usage of "
+        "tests in")
+    perf_parser.add_argument(
+        "--perf-commit",
+        help="commit to record the measurements for (default: the current "
+        "commit of the repository)")
+    perf_parser.add_argument(
+        "--perf-stats",
+        action="store_true",
+        help="also record the statistics of cvc5 (--stats)")
+    perf_parser.add_argument(
+        "--perf-report",
+        metavar="BASELINE",
+        help="report the tests that are slower or use more memory than in "
+        "the commit BASELINE instead of running tests")
+    perf_parser.add_argument(
+        "--perf-threshold",
+        type=float,
+        default=0.1,
+        help="relative increase that is reported as a regression "
+        "(default: 0.1)")
+    perf_parser.add_argument(
+        "--perf-min-time",
+        type=float,
+        default=0.05,
+        help="minimum increase of the CPU time in seconds that is reported "
+        "as a regression (default: 0.05)")
+    perf_parser.add_argument(
+        "--index",
+        help="file of an index of the metadata of benchmarks, which is "
+        "created if it does not exist and updated if benchmarks change")
+    perf_parser.add_argument(
+        "--select",
+        metavar="QUERY",
+        help="only run the benchmarks of a batch that satisfy QUERY, e.g., "
+        "logic=QF_BV,requires=poly")
+    perf_parser.add_argument(
+        "--shard",
+        metavar="I/N",
+        help="only run the I-th of N parts of a batch, the parts are balanced "
+        "by the run times recorded in --perf-db")
+    perf_parser.add_argument("--api-worker",
+                             action="store_true",
+                             help=argparse.SUPPRESS)
+    perf_parser.add_argument(
+        "--list-benchmarks",
+        metavar="BENCHMARKS",
+        help="print the benchmarks (see --batch) that satisfy --select and "
+        "--shard instead of running tests")
 
     parser = argparse.ArgumentParser(
-        description="Runs benchmark and checks for correct exit status and output."
+        description="Runs benchmark and checks for correct exit status and output.",
+        parents=[perf_parser],
     )
     tester_choices = ["all"] + list(g_testers.keys())
     parser.add_argument("--use-skip-return-code", action="store_true")
@@ -863,6 +2860,50 @@ def main():
     parser.add_argument("--lfsc-sig-dir", default="")
     parser.add_argument("--alfc-binary", default="")
     parser.add_argument("--alf-sig-dir", default="")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="run multiple benchmarks, `benchmark` is either a regression "
+        "level (e.g., regress0,regress1) or a file that lists benchmarks")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="maximum number of processes to run in parallel, testers of a "
+        "benchmark run in parallel if this is greater than one (default: 1, "
+        "number of CPUs in batch mode)")
+    parser.add_argument(
+        "--cache-dir",
+        help="directory of a cache for test results, successful tests are "
+        "skipped if cvc5, the benchmark and the command line are unchanged")
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="maximum size of the result cache in MB")
+    parser.add_argument(
+        "--adaptive-timeout",
+        type=float,
+        metavar="K",
+        help="use K times the 95th percentile of the run times recorded in "
+        "--perf-db as the timeout of a test (at most TEST_TIMEOUT)")
+    parser.add_argument(
+        "--timeout-floor",
+        type=float,
+        default=10,
+        help="minimum adaptive timeout in seconds (default: 10)")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="run each benchmark once with --stats --stats-internal and "
+        "report which resource steps, theories and preprocessing passes "
+        "dominate the run time")
+    parser.add_argument(
+        "--results-jsonl",
+        help="append the results of the tests to this file as JSON Lines")
+    parser.add_argument(
+        "--junit-xml",
+        help="write the results of the tests to this file as JUnit XML")
     parser.add_argument("wrapper", nargs="*")
     parser.add_argument("cvc5_binary")
     parser.add_argument("benchmark")
@@ -872,7 +2913,57 @@ def main():
     if os.environ.get("RUN_REGRESSION_ARGS"):
         argv.extend(shlex.split(os.getenv("RUN_REGRESSION_ARGS")))
 
+    perf_args, _ = perf_parser.parse_known_args(argv)
+    if perf_args.api_worker:
+        run_api_worker()
+        return EXIT_OK
+    if perf_args.index:
+        g_index = BenchmarkIndex(perf_args.index)
+    if perf_args.list_benchmarks:
+        perf_db = None
+        if perf_args.perf_db:
+            perf_db = PerfDatabase(perf_args.perf_db,
+                                   get_commit(perf_args.perf_commit or "HEAD"))
+        benchmarks = prepare_batch(
+            get_batch_benchmarks(perf_args.list_benchmarks),
+            perf_args.select, perf_args.shard, perf_db)
+        for benchmark in benchmarks:
+            print(benchmark)
+        if perf_db:
+            perf_db.close()
+        if g_index:
+            g_index.save()
+        return EXIT_OK
+    if perf_args.perf_report:
+        if not perf_args.perf_db:
+            print_error("--perf-report requires --perf-db")
+            return EXIT_FAILURE
+        perf_db = PerfDatabase(perf_args.perf_db,
+                               get_commit(perf_args.perf_commit or "HEAD"))
+        exit_code = perf_report(perf_db, get_commit(perf_args.perf_report),
+                                perf_db.commit_id, perf_args.perf_threshold,
+                                perf_args.perf_min_time)
+        perf_db.close()
+        return exit_code
+
     g_args = parser.parse_args(argv)
+    if g_args.jobs is None:
+        g_args.jobs = os.cpu_count() if g_args.batch else 1
+
+    if g_args.jobs > 1:
+        g_process_slots = threading.BoundedSemaphore(g_args.jobs)
+    if g_args.cache_dir:
+        g_cache = ResultCache(os.path.abspath(g_args.cache_dir),
+                              g_args.cache_size * 1024 * 1024)
+    if g_args.perf_db:
+        g_perf_db = PerfDatabase(g_args.perf_db,
+                                 get_commit(g_args.perf_commit or "HEAD"))
+    if g_args.profile:
+        g_profile = Profile()
+        g_args.perf_stats = True
+        g_args.tester = ["base"]
+    if g_args.results_jsonl or g_args.junit_xml:
+        g_results = ResultsWriter(g_args.results_jsonl, g_args.junit_xml)
 
     cvc5_binary = os.path.abspath(g_args.cvc5_binary)
     lfsc_binary = os.path.abspath(g_args.lfsc_binary)
@@ -902,16 +2993,37 @@ def main():
         lfsc_sigs = [os.path.join(lfsc_sig_dir, sig + ".plf")
                      for sig in lfsc_sigs]
     alf_sig_dir = os.path.abspath(g_args.alf_sig_dir)
-    return run_regression(
+    if not os.access(cvc5_binary, os.X_OK):
+        sys.exit('"{}" does not exist or is not executable'.format(cvc5_binary))
+    # The features are determined once for all regressions, such that
+    # concurrent regressions do not each run cvc5 --show-config
+    cvc5_features = get_cvc5_features(cvc5_binary)
+    args = (
         testers,
         wrapper,
         cvc5_binary,
+        cvc5_features,
         lfsc_binary,
         lfsc_sigs,
         alfc_binary,
-        g_args.benchmark,
-        timeout,
     )
+    if g_args.batch:
+        benchmarks = prepare_batch(get_batch_benchmarks(g_args.benchmark),
+                                   g_args.select, g_args.shard, g_perf_db)
+        exit_code = run_batch(benchmarks, g_args.jobs, args, timeout)
+        if g_cache:
+            g_cache.evict()
+    else:
+        exit_code = run_regression(*args, g_args.benchmark, timeout)
+    if g_perf_db:
+        g_perf_db.close()
+    if g_index:
+        g_index.save()
+    if g_results:
+        g_results.close()
+    if g_profile:
+        g_profile.report()
+    return exit_code
 
 
 if __name__ == "__main__":
@@ -0,0 +1,376 @@
+###############################################################################
+# Top contributors (to current version):
+#   agent
+#
+# This file is part of the cvc5 project.
+#
+# Copyright (c) 2009-2024 by the authors listed in the file AUTHORS
+# in the top-level source directory and their institutional affiliations.
+# All rights reserved.  See the file COPYING in the top-level source
+# directory for licensing information.
+# #############################################################################
+#
+# Unit tests for run_regression.py.
+##
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import run_regression
+
+REGRESS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_INPUT = """sat
+unsat
+unknown
+(error "Parse Error: foo.smt2:3.10: Unexpected token: 'error'.")
+(error "A non-linear fact was asserted to arithmetic in a linear logic.
+The fact in question: (>= (* x y) 0)
+")
+((x 1) (y (- 2)) (z 1.5))
+(define-fun f ((x Int)) Int (+ x 1))
+(define-fun g () (Array Int Int) ((as const (Array Int Int)) 0))
+; a comment with $pecial characters: * . [ ] ^ \\ & /
+    indented line with	a tab
+Warning: the last line has no newline"""
+
+# Scrubbers that exercise the features of the built-in `sed` and `grep`
+SCRUBBERS = [
+    "sed -e 's/x/y/'",
+    "sed -e 's/x/y/g'",
+    "sed 's/(\\([a-z]*\\) \\([0-9]*\\))/\\2 \\1/g'",
+    "sed -E 's/\\((x|y) ([^()]*)\\)/[\\1=\\2]/g'",
+    "sed -e 's/^ *//' -e 's/ *$//'",
+    "sed -e 's/[[:space:]][[:space:]]*/ /g'",
+    "sed -e 's/[[:digit:]]\\{1,\\}/N/g'",
+    "sed -e 's/.*/<&>/'",
+    "sed -e 's|/|:|g'",
+    "sed -e 's/[]^[]/_/g'",
+    "sed -e 's/x*/-/g'",
+    "sed -e '/error/d'",
+    "sed -e '/error/!d'",
+    "sed -n -e '/define-fun/p'",
+    "sed -n -e 's/(define-fun \\([a-z]*\\).*/\\1/p'",
+    "sed -e '/^(/s/ /_/g'",
+    "sed -e 's/a/b/;s/b/c/'",
+    "sed -r 's/[0-9]+/N/g'",
+    "sed -e 's/(^.*//'",
+    "sed -e 's/[a-z]$x/X/'",
+    "sed -e 's/\\(^u\\)n/\\1/'",
+    "sed -e 's/e$/E/'",
+    "sed -E 's/^u|e$/X/g'",
+    "sed p",
+    "sed -n -e '/line/p'",
+    "grep error",
+    "grep -v error",
+    "grep -o '[0-9][0-9]*'",
+    "grep -E '^(sat|unsat)$'",
+    "grep -F '(* x y)'",
+    "grep -i WARNING",
+    "grep -vE 'sat|unknown'",
+]
+
+
+def run_bash(scrubber, cwd, s_input):
+    return subprocess.run(["bash", "-c", scrubber],
+                          cwd=cwd,
+                          input=s_input,
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL).stdout
+
+
+def check_scrubber(scrubber, cwd, s_input):
+    """Checks that the built-in implementation of `scrubber` (if any) produces
+    the same output as running it with bash."""
+
+    if run_regression.compile_scrubber(scrubber) is None:
+        return False
+    output, error, _ = run_regression.run_scrubber(scrubber, cwd, None,
+                                                   s_input)
+    assert error == b""
+    assert output == run_bash(scrubber, cwd, s_input), scrubber
+    return True
+
+
+@pytest.mark.parametrize("scrubber", SCRUBBERS)
+def test_builtin_scrubber(scrubber):
+    assert check_scrubber(scrubber, REGRESS_DIR, SAMPLE_INPUT.encode())
+
+
+@pytest.mark.parametrize("scrubber", [
+    "sed -e 's/x/y/' | sort",
+    "sed -e 's/\\<x\\>/y/'",
+    "sed -e 'y/abc/xyz/'",
+    "grep -c error",
+    "sort",
+])
+def test_unsupported_scrubber(scrubber):
+    assert run_regression.compile_scrubber(scrubber) is None
+
+
+def get_regression_scrubbers():
+    """Returns the (benchmark, scrubber) pairs of all regressions."""
+
+    res = []
+    for level in sorted(os.listdir(REGRESS_DIR)):
+        if not level.startswith("regress"):
+            continue
+        for root, _, files in os.walk(os.path.join(REGRESS_DIR, level)):
+            for name in sorted(files):
+                if not name.endswith((".smt2", ".sy")):
+                    continue
+                path = os.path.join(root, name)
+                metadata = run_regression.scan_benchmark(path)
+                for scrubber in (metadata.scrubber, metadata.error_scrubber):
+                    if scrubber:
+                        res.append((path, scrubber))
+    return res
+
+
+def test_regression_scrubbers():
+    # All scrubbers of the regressions that run in-process must behave like
+    # bash on the expected output and the benchmark itself
+    num_builtin = 0
+    for path, scrubber in get_regression_scrubbers():
+        metadata = run_regression.scan_benchmark(path)
+        with open(path, "rb") as benchmark_file:
+            content = benchmark_file.read()
+        s_input = "\n".join([
+            metadata.expected_output, metadata.expected_error, SAMPLE_INPUT
+        ]).encode() + b"\n" + content
+        if check_scrubber(scrubber, os.path.dirname(path), s_input):
+            num_builtin += 1
+    assert num_builtin > 0
+
+
+def test_benchmark_index(tmp_path):
+    benchmark = tmp_path / "a.smt2"
+    benchmark.write_text("; EXPECT: sat\n(set-logic QF_UF)\n(check-sat)\n")
+    index_path = str(tmp_path / "index.json")
+    index = run_regression.BenchmarkIndex(index_path)
+    metadata = index.get(str(benchmark))
+    assert metadata.expected_output == "sat"
+    index.save()
+
+    # The metadata is read from the index as long as the benchmark does not
+    # change
+    index = run_regression.BenchmarkIndex(index_path)
+    assert index.entries
+    assert index.get(str(benchmark)) == metadata
+    assert not index.modified
+
+    # Indexes of other versions (or without a version) are discarded
+    with open(index_path, "w") as index_file:
+        json.dump({str(benchmark.resolve()): {"size": 1}}, index_file)
+    assert run_regression.BenchmarkIndex(index_path).entries == {}
+    with open(index_path, "w") as index_file:
+        json.dump(
+            {
+                "version": run_regression.BenchmarkIndex.VERSION + 1,
+                "entries": {}
+            }, index_file)
+    assert run_regression.BenchmarkIndex(index_path).entries == {}
+
+
+API_BENCHMARK = """(set-logic QF_LIA)
+(set-option :produce-models true)
+(declare-const x Int)
+(assert (> x 0))
+(check-sat)
+(get-value ((> x 0)))
+"""
+
+
+def test_api_benchmark(tmp_path):
+    cvc5 = pytest.importorskip("cvc5")
+    benchmark = tmp_path / "a.smt2"
+    benchmark.write_text(API_BENCHMARK)
+    for options in [[], [("incremental", ""), ("no-produce-models", "")]]:
+        response = run_regression.run_api_benchmark(cvc5, str(benchmark),
+                                                    options)
+        assert response == {
+            "output": "sat\n(((> x 0) true))\n",
+            "error": "",
+            "exit_status": run_regression.EXIT_OK,
+        }
+
+
+def test_api_worker(tmp_path):
+    # Runs the benchmark in a worker process, which reports an error if the
+    # cvc5 Python module cannot be imported
+    benchmark = tmp_path / "a.smt2"
+    benchmark.write_text(API_BENCHMARK)
+    worker = run_regression.ApiWorker()
+    try:
+        for _ in range(2):
+            response = worker.run(
+                {
+                    "benchmark": str(benchmark),
+                    "options": []
+                }, 60)
+            try:
+                import cvc5
+                assert response["output"] == "sat\n(((> x 0) true))\n"
+                assert response["exit_status"] == run_regression.EXIT_OK
+            except ImportError:
+                assert "cannot import" in response["error"]
+                assert response["exit_status"] == run_regression.EXIT_FAILURE
+    finally:
+        worker.close()
+
+
+class FakeCache:
+
+    def get_key(self, tester, benchmark_info):
+        return "key"
+
+    def lookup(self, key):
+        return run_regression.EXIT_OK
+
+
+def test_cached_results(tmp_path, monkeypatch):
+    # Tests that pass according to the result cache are reported as passed
+    jsonl_path = str(tmp_path / "results.jsonl")
+    junit_path = str(tmp_path / "results.xml")
+    results = run_regression.ResultsWriter(jsonl_path, junit_path)
+    monkeypatch.setattr(run_regression, "g_cache", FakeCache())
+    monkeypatch.setattr(run_regression, "g_results", results)
+    benchmark_info = run_regression.BenchmarkInfo(
+        *([None] * len(run_regression.BenchmarkInfo._fields)))._replace(
+            benchmark_dir=str(tmp_path),
+            benchmark_basename="a.smt2",
+            command_line_args=["--incremental"])
+    tester = run_regression.g_testers["base"]
+    assert tester.run(benchmark_info) == run_regression.EXIT_OK
+    results.close()
+
+    with open(jsonl_path) as jsonl_file:
+        entries = [json.loads(line) for line in jsonl_file]
+    assert len(entries) == 1
+    assert entries[0]["result"] == "passed"
+    assert entries[0]["cached"]
+    assert entries[0]["command_line"] == ["--incremental"]
+    suite = run_regression.ET.parse(junit_path).getroot().find("testsuite")
+    assert suite.get("tests") == "1"
+    assert suite.get("failures") == "0"
+    prop = suite.find("testcase/properties/property")
+    assert prop.get("name") == "cached" and prop.get("value") == "true"
+
+
+def test_cache_key(tmp_path):
+    # Changing only a cvc5 library (e.g., with a shared build) must change the
+    # key of a test
+    (tmp_path / "bin").mkdir()
+    (tmp_path / "lib").mkdir()
+    cvc5_binary = tmp_path / "bin" / "cvc5"
+    cvc5_binary.write_text("#!/bin/sh\necho sat\n")
+    library = tmp_path / "lib" / "libcvc5.so.1"
+    library.write_text("old")
+    cache = run_regression.ResultCache(str(tmp_path / "cache"), 1 << 20)
+    benchmark_info = run_regression.BenchmarkInfo(
+        *([None] * len(run_regression.BenchmarkInfo._fields)))._replace(
+            wrapper=[],
+            cvc5_binary=str(cvc5_binary),
+            benchmark_content="(check-sat)\n",
+            command_line_args=[])
+    tester = run_regression.g_testers["base"]
+    assert str(library) in tester.dependencies(benchmark_info)
+    key = cache.get_key(tester, benchmark_info)
+    assert cache.get_key(tester, benchmark_info) == key
+    library.write_text("new library")
+    assert cache.get_key(tester, benchmark_info) != key
+
+
+def test_proof_key(tmp_path):
+    # Like the key of a test, the key of a dumped proof depends on the cvc5
+    # libraries
+    (tmp_path / "bin").mkdir()
+    (tmp_path / "lib").mkdir()
+    cvc5_binary = tmp_path / "bin" / "cvc5"
+    cvc5_binary.write_text("#!/bin/sh\necho unsat\n")
+    library = tmp_path / "lib" / "libcvc5.so"
+    library.write_text("old")
+    cache = run_regression.ResultCache(str(tmp_path / "cache"), 1 << 20)
+    benchmark_info = run_regression.BenchmarkInfo(
+        *([None] * len(run_regression.BenchmarkInfo._fields)))._replace(
+            cvc5_binary=str(cvc5_binary), benchmark_content="(check-sat)\n")
+    args = (benchmark_info, ["--dump-proofs"], b"")
+    key = cache.get_proof_key(*args)
+    assert cache.get_proof_key(*args) == key
+    library.write_text("new library")
+    assert cache.get_proof_key(*args) != key
+
+
+def test_api_worker_stdout(tmp_path, monkeypatch):
+    # Output that is written directly to stdout by the worker (e.g., by the
+    # C++ code of cvc5) does not interfere with the responses
+    package = tmp_path / "cvc5"
+    package.mkdir()
+    (package / "__init__.py").write_text(
+        "import os\nos.write(1, b'not a response\\n')\n"
+        "raise ImportError('fake cvc5')\n")
+    monkeypatch.setenv("PYTHONPATH", str(tmp_path))
+    worker = run_regression.ApiWorker()
+    try:
+        response = worker.run({"benchmark": "a.smt2", "options": []}, 60)
+        assert "fake cvc5" in response["error"]
+    finally:
+        worker.close()
+
+
+def test_api_worker_read_responses():
+    worker = run_regression.ApiWorker.__new__(run_regression.ApiWorker)
+    worker.proc = subprocess.CompletedProcess(
+        [], 0, stdout=["not a response\n", '{"exit_status": 0}\n'])
+    worker.responses = run_regression.queue.Queue()
+    worker.read_responses()
+    assert worker.responses.get_nowait() == {"exit_status": 0}
+    assert worker.responses.get_nowait() is None
+
+
+def test_api_dependencies(tmp_path, monkeypatch):
+    # The api tester depends on the cvc5 libraries that the extension module
+    # is linked against
+    package = tmp_path / "cvc5"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "cvc5_python_base.so").write_text("")
+    (tmp_path / "lib").mkdir()
+    library = tmp_path / "lib" / "libcvc5.so"
+    library.write_text("")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "cvc5", raising=False)
+    benchmark_info = run_regression.BenchmarkInfo(
+        *([None] * len(run_regression.BenchmarkInfo._fields)))._replace(
+            cvc5_binary=str(tmp_path / "cvc5-binary"))
+    dependencies = run_regression.g_testers["api"].dependencies(
+        benchmark_info)
+    assert str(package / "cvc5_python_base.so") in dependencies
+    assert str(library) in dependencies
+
+
+def test_stats_error_scrubber(tmp_path, monkeypatch):
+    # The statistics are removed from the error output before the error
+    # scrubber could change them
+    monkeypatch.setattr(run_regression, "g_args",
+                        argparse.Namespace(perf_stats=True))
+    benchmark_info = run_regression.BenchmarkInfo(
+        *([None] * len(run_regression.BenchmarkInfo._fields)))._replace(
+            benchmark_dir=str(tmp_path),
+            error_scrubber="sed 's/.*: //'",
+            command_line_args=["--stats"])
+    error = (b"error: foo\n"
+             b"global::totalTime = 12ms\n"
+             b"theory::inferences = { A: 1, B: 2 }\n")
+    with run_regression.measure_processes() as measurement:
+        _, error, _ = run_regression.process_outputs(benchmark_info, b"",
+                                                     error, 0)
+    assert error == "foo"
+    assert measurement.stats["theory::inferences"] == {"A": 1, "B": 2}
+    assert measurement.stats["global::totalTime"] == 0.012
@@ -0,0 +1,113 @@
+###############################################################################
+# Top contributors (to current version):
+#   agent
+#
+# This file is part of the cvc5 project.
+#
+# Copyright (c) 2009-2024 by the authors listed in the file AUTHORS
+# in the top-level source directory and their institutional affiliations.
+# All rights reserved.  See the file COPYING in the top-level source
+# directory for licensing information.
+# #############################################################################
+#
+# Unit tests for the assumption cache API.
+##
+
+import pytest
+import cvc5
+from cvc5 import Kind, AssumptionCache
+
+
+@pytest.fixture
+def tm():
+    return cvc5.TermManager()
+@pytest.fixture
+def solver(tm):
+    s = cvc5.Solver(tm)
+    s.setOption("incremental", "true")
+    s.setOption("produce-unsat-assumptions", "true")
+    return s
+
+
+@pytest.fixture
+def lits(tm):
+    boolSort = tm.getBooleanSort()
+    return [tm.mkConst(boolSort, "x{}".format(i)) for i in range(4)]
+
+
+def test_exact_hit(tm, solver, lits):
+    cache = AssumptionCache(solver)
+    assert cache.getSolver() == solver
+    assert cache.checkSatAssuming(lits[0], lits[1]).isSat()
+    assert cache.checkSatAssuming([lits[1], lits[0]]).isSat()
+    assert cache.getNumMisses() == 1
+    assert cache.getNumHits() == 1
+    assert len(cache) == 1
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_unsat_core_subsumption(tm, solver, lits):
+    cache = AssumptionCache(solver)
+    x, y, z, w = lits
+    cache.assertFormula(tm.mkTerm(Kind.OR, x.notTerm(), y.notTerm()))
+    assert cache.checkSatAssuming(x, y, z).isUnsat()
+    assert cache.checkSatAssuming(x, y, w).isUnsat()
+    assert cache.checkSatAssuming(x, y, z, w).isUnsat()
+    assert cache.getNumMisses() == 1
+    assert cache.getNumHits() == 2
+    assert cache.checkSatAssuming(x, z, w).isSat()
+    assert cache.getNumMisses() == 2
+
+
+def test_sat_subsumption(tm, solver, lits):
+    cache = AssumptionCache(solver)
+    x, y, z, w = lits
+    assert cache.checkSatAssuming(x, y, z).isSat()
+    assert cache.checkSatAssuming(x, z).isSat()
+    assert cache.getNumHits() == 1
+    # new assertions invalidate satisfiable results
+    cache.assertFormula(tm.mkTerm(Kind.OR, x.notTerm(), z.notTerm()))
+    assert cache.checkSatAssuming(x, z).isUnsat()
+    assert cache.getNumMisses() == 2
+
+
+def test_push_pop(tm, solver, lits):
+    cache = AssumptionCache(solver)
+    x, y, z, w = lits
+    assert cache.checkSatAssuming(x, y).isSat()
+    cache.push()
+    cache.assertFormulas([x.notTerm()])
+    assert cache.checkSatAssuming(x, y).isUnsat()
+    assert cache.checkSatAssuming(x, z).isUnsat()
+    assert cache.getNumMisses() == 2
+    cache.pop()
+    assert cache.checkSatAssuming(x, z).isSat()
+    assert cache.checkSatAssuming(x, y).isSat()
+    assert cache.getNumMisses() == 3
+    with pytest.raises(RuntimeError):
+        cache.pop()
+    cache.resetAssertions()
+    assert len(cache) == 0
+
+
+def test_max_size(tm, solver, lits):
+    cache = AssumptionCache(solver, 2)
+    for l in lits:
+        cache.checkSatAssuming(l.notTerm())
+    assert len(cache) == 2
+    cache.checkSatAssuming(lits[0].notTerm())
+    assert cache.getNumHits() == 0
+
+
+def test_no_unsat_assumptions(tm, lits):
+    solver = cvc5.Solver(tm)
+    solver.setOption("incremental", "true")
+    cache = AssumptionCache(solver)
+    x, y, z, w = lits
+    cache.assertFormula(x.notTerm())
+    assert cache.checkSatAssuming(x, y).isUnsat()
+    assert cache.checkSatAssuming(x, y, z).isUnsat()
+    assert cache.checkSatAssuming(x, z).isUnsat()
+    assert cache.getNumHits() == 1
+    assert cache.getNumMisses() == 2
@@ -0,0 +1,144 @@
+###############################################################################
+# Top contributors (to current version):
+#   agent
+#
+# This file is part of the cvc5 project.
+#
+# Copyright (c) 2009-2024 by the authors listed in the file AUTHORS
+# in the top-level source directory and their institutional affiliations.
+# All rights reserved.  See the file COPYING in the top-level source
+# directory for licensing information.
+# #############################################################################
+#
+# Unit tests for the query cache API.
+##
+
+import pytest
+import cvc5
+from cvc5 import Kind, QueryCache
+
+
+@pytest.fixture
+def tm():
+    return cvc5.TermManager()
+
+
+def make_solver(tm, names, produce=True):
+    solver = cvc5.Solver(tm)
+    solver.setLogic("QF_LIA")
+    if produce:
+        solver.setOption("produce-models", "true")
+        solver.setOption("produce-unsat-cores", "true")
+    intSort = tm.getIntegerSort()
+    x, y = [tm.mkConst(intSort, n) for n in names]
+    solver.assertFormula(tm.mkTerm(Kind.GT, x, y))
+    return solver, x, y
+
+
+def test_key(tm, tmp_path):
+    cache = QueryCache(str(tmp_path / "cache.db"))
+    s1, _, _ = make_solver(tm, ["x", "y"])
+    s2, _, _ = make_solver(tm, ["a", "b"])
+    s3, _, _ = make_solver(tm, ["x", "y"], False)
+    assert cache.getKey(s1) == cache.getKey(s2)
+    assert cache.getKey(s1) != cache.getKey(s3)
+    s4, _, _ = make_solver(tm, ["x", "y"])
+    s4.assertFormula(tm.mkTrue())
+    assert cache.getKey(s1) != cache.getKey(s4)
+    cache.close()
+
+
+def test_sat(tm, tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = QueryCache(path)
+    s1, x, y = make_solver(tm, ["x", "y"])
+    assert cache.lookup(s1) is None
+    entry = cache.checkSat(s1)
+    assert entry["result"] == "sat"
+    assert not entry["cached"]
+    assert set(entry["model"].keys()) == {x, y}
+    cache.close()
+
+    # the entry persists and is shared by alpha-equivalent queries
+    cache = QueryCache(path)
+    s2, a, b = make_solver(tm, ["a", "b"])
+    entry = cache.checkSat(s2)
+    assert entry["result"] == "sat"
+    assert entry["cached"]
+    assert set(entry["model"].keys()) == {a, b}
+    assert entry["model"][a] != entry["model"][b]
+    cache.close()
+
+
+def test_unsat(tm, tmp_path):
+    cache = QueryCache(str(tmp_path / "cache.db"))
+    solver, x, y = make_solver(tm, ["x", "y"])
+    solver.assertFormula(tm.mkTerm(Kind.EQUAL, x, tm.mkInteger(0)))
+    lt = tm.mkTerm(Kind.LT, x, y)
+    solver.assertFormula(lt)
+    entry = cache.checkSat(solver)
+    assert entry["result"] == "unsat"
+    assert entry["model"] is None
+    assert lt in entry["unsatCore"]
+    entry = cache.checkSat(solver)
+    assert entry["cached"]
+    assert lt in entry["unsatCore"]
+    cache.close()
+
+
+class ForeignCoreSolver(cvc5.Solver):
+    def getUnsatCore(self):
+        tm = self.getTermManager()
+        return super().getUnsatCore() + [tm.mkConst(tm.getBooleanSort())]
+
+
+def test_unsat_foreign_core(tm, tmp_path):
+    cache = QueryCache(str(tmp_path / "cache.db"))
+    solver = ForeignCoreSolver(tm)
+    solver.setOption("produce-unsat-cores", "true")
+    solver.assertFormula(tm.mkFalse())
+    solver.assertFormula(tm.mkTrue())
+    entry = cache.checkSat(solver)
+    assert entry["result"] == "unsat"
+    assert entry["unsatCore"] is None
+    entry = cache.checkSat(solver)
+    assert entry["cached"]
+    assert entry["unsatCore"] is None
+    cache.close()
+
+
+def make_datatype_solver(tm, cons):
+    decl = tm.mkDatatypeDecl("D")
+    for name in cons:
+        decl.addConstructor(tm.mkDatatypeConstructorDecl(name))
+    dtSort = tm.mkDatatypeSort(decl)
+    solver = cvc5.Solver(tm)
+    solver.setLogic("QF_DT")
+    x = tm.mkConst(dtSort, "x")
+    solver.assertFormula(tm.mkTerm(Kind.EQUAL, x, x))
+    return solver
+
+
+def test_datatypes(tm, tmp_path):
+    cache = QueryCache(str(tmp_path / "cache.db"))
+    s1 = make_datatype_solver(tm, ["a", "b"])
+    s2 = make_datatype_solver(cvc5.TermManager(), ["a", "b"])
+    s3 = make_datatype_solver(cvc5.TermManager(), ["a", "c"])
+    assert cache.getKey(s1) == cache.getKey(s2)
+    assert cache.getKey(s1) != cache.getKey(s3)
+    cache.close()
+
+
+def test_unknown(tm, tmp_path):
+    cache = QueryCache(str(tmp_path / "cache.db"))
+    solver = cvc5.Solver(tm)
+    solver.setLogic("QF_NIA")
+    solver.setOption("solve-real-as-int", "true")
+    x = tm.mkConst(tm.getRealSort(), "x")
+    solver.assertFormula(tm.mkTerm(Kind.LT, tm.mkReal("0.0"), x))
+    solver.assertFormula(tm.mkTerm(Kind.LT, x, tm.mkReal("1.0")))
+    entry = cache.checkSat(solver)
+    assert entry["result"] == "unknown"
+    assert not entry["cached"]
+    assert cache.lookup(solver) is None
+    cache.close()
@@ -498,6 +498,15 @@ def test_get_option_info(solver):
     assert info['default'] == 'batch'
     assert info['modes'] == ['batch', 'none']
 
+    # the cached information is not affected by changes to the options or to
+    # previous results
+    info['modes'].append('foo')
+    solver.setOption("simplification", "none")
+    info = solver.getOptionInfo("simplification")
+    assert info['setByUser']
+    assert info['current'] == 'none'
+    assert info['modes'] == ['batch', 'none']
+
 
 def test_get_unsat_assumptions1(solver):
     solver.setOption("incremental", "false")
@@ -1002,6 +1011,52 @@ def test_block_model_values5(tm, solver):
     solver.checkSat()
     solver.blockModelValues([x])
 
+def test_iter_models1(tm, solver):
+    solver.setOption("produce-models", "true")
+    solver.setOption("incremental", "true")
+    bvSort = tm.mkBitVectorSort(2)
+    x = tm.mkConst(bvSort, "x")
+    y = tm.mkConst(bvSort, "y")
+    solver.assertFormula(tm.mkTerm(Kind.BITVECTOR_ULT, x, y))
+    models = list(solver.iterModels([x]))
+    assert len(models) == 3
+    assert len(set(models)) == 3
+    for m in models:
+        assert len(m) == 1
+        assert m[0].isBitVectorValue()
+    assert solver.checkSat().isUnsat()
+
+def test_iter_models2(tm, solver):
+    solver.setOption("produce-models", "true")
+    solver.setOption("incremental", "true")
+    bvSort = tm.mkBitVectorSort(2)
+    x = tm.mkConst(bvSort, "x")
+    y = tm.mkConst(bvSort, "y")
+    models = list(solver.iterModels([x, y], limit=5, as_python_obj=True))
+    assert len(models) == 5
+    assert len(set(models)) == 5
+    assert list(solver.iterModels([x], limit=0)) == []
+
+    slv = Solver(tm)
+    slv.setOption("produce-models", "true")
+    slv.setOption("incremental", "true")
+    slv.assertFormula(tm.mkTerm(Kind.DISTINCT, x, y))
+    models = list(slv.iterModels([x, y], block_mode=BlockModelsMode.VALUES))
+    assert len(models) == 12
+
+def test_iter_models3(tm, solver):
+    x = tm.mkConst(solver.getBooleanSort(), "x")
+    solver.assertFormula(x)
+    with pytest.raises(RuntimeError):
+        list(solver.iterModels([x]))
+
+def test_iter_models4(tm, solver):
+    solver.setOption("produce-models", "true")
+    x = tm.mkConst(solver.getBooleanSort(), "x")
+    solver.assertFormula(x)
+    solver.assertFormula(x.notTerm())
+    assert list(solver.iterModels([x])) == []
+
 def test_get_instantiations(tm, solver):
     iSort = tm.getIntegerSort()
     boolSort = solver.getBooleanSort()
@@ -1172,6 +1227,22 @@ def test_assert_formula(tm, solver):
     slv.assertFormula(tm.mkTrue())
 
 
+def test_assert_formulas(tm, solver):
+    boolSort = tm.getBooleanSort()
+    x = tm.mkConst(boolSort, "x")
+    y = tm.mkConst(boolSort, "y")
+    solver.assertFormulas([])
+    solver.assertFormulas([x, tm.mkTerm(Kind.OR, x.notTerm(), y)])
+    solver.assertFormulas((t for t in [tm.mkTrue()]))
+    assert solver.getAssertions() == [
+        x, tm.mkTerm(Kind.OR, x.notTerm(), y), tm.mkTrue()]
+    assert solver.checkSat().isSat()
+    with pytest.raises(TypeError):
+        solver.assertFormulas([x, 1])
+    with pytest.raises(RuntimeError):
+        solver.assertFormulas([tm.mkInteger(1)])
+
+
 def test_check_sat(solver):
     solver.setOption("incremental", "false")
     solver.checkSat()
@@ -1203,6 +1274,11 @@ def test_check_sat_assuming1(tm, solver):
     solver.checkSatAssuming(tm.mkTrue())
     solver.checkSatAssuming(tm.mkTrue())
     solver.checkSatAssuming(z)
+    assert solver.checkSatAssuming([z, x]).isSat()
+    assert solver.checkSatAssuming((z, x.notTerm())).isUnsat()
+    assert solver.checkSatAssuming([]).isSat()
+    with pytest.raises(TypeError):
+        solver.checkSatAssuming([z, 1])
     slv = Solver(tm)
     slv.checkSatAssuming(tm.mkTrue())
 
@@ -1279,6 +1355,60 @@ def test_set_option(tm, solver):
         solver.setOption("bv-sat-solver", "minisat")
 
 
+def test_set_options(solver):
+    solver.setOptions({
+        "produce-models": True,
+        "tlimit-per": 500,
+        "random-freq": 0.5,
+        "simplification": "none",
+        "verbosity": "1",
+    })
+    assert solver.getOption("produce-models") == "true"
+    assert solver.getOption("tlimit-per") == "500"
+    assert float(solver.getOption("random-freq")) == 0.5
+    assert solver.getOption("simplification") == "none"
+    assert solver.getOption("verbosity") == "1"
+    # no option is set if any value is invalid
+    with pytest.raises(ValueError):
+        solver.setOptions({"produce-proofs": True, "tlimit-per": -1})
+    assert solver.getOption("produce-proofs") == "false"
+    with pytest.raises(ValueError):
+        solver.setOptions({"random-freq": 2.0})
+    with pytest.raises(ValueError):
+        solver.setOptions({"simplification": "foo"})
+    with pytest.raises(ValueError, match="of type int .* expected bool"):
+        solver.setOptions({"produce-models": 1})
+    with pytest.raises(ValueError, match="of type bool .* expected int"):
+        solver.setOptions({"tlimit-per": True})
+    with pytest.raises(ValueError, match="expected str \\(parsed as Language"):
+        solver.setOptions({"output-lang": 1})
+    with pytest.raises(ValueError):
+        solver.setOptions({"asdf-invalid": True})
+
+
+def test_options(solver):
+    assert solver.options.produce_models is False
+    assert solver.options.tlimit_per == 0
+    solver.options.tlimit_per = 500
+    assert solver.options.tlimit_per == 500
+    assert solver.getOption("tlimit-per") == "500"
+    solver.options.produce_models = True
+    assert solver.options.produce_models is True
+    solver.options.random_freq = 0.25
+    assert solver.options.random_freq == 0.25
+    solver.options.simplification = "none"
+    assert solver.options.simplification == "none"
+    assert "tlimit_per" in dir(solver.options)
+    with pytest.raises(ValueError):
+        solver.options.tlimit_per = 1.5
+    with pytest.raises(ValueError):
+        solver.options.random_freq = -1.0
+    with pytest.raises(AttributeError):
+        solver.options.asdf_invalid
+    with pytest.raises(AttributeError):
+        solver.options.asdf_invalid = 1
+
+
 def test_reset_assertions(tm, solver):
     solver.setOption("incremental", "true")
 
@@ -11,9 +11,11 @@
 # #############################################################################
 ##
 
+import concurrent.futures
 import pytest
 import cvc5
 import sys
+import threading
 
 from cvc5 import Kind, SortKind, RoundingMode, TermManager, Solver
 
@@ -1221,3 +1223,142 @@ def test_get_statistics(tm, solver):
             assert not s[1]['internal']
             assert not s[1]['default']
             assert s[1]['value'] == {'integer type': 1}
+
+
+def export_in_thread(build):
+    # Builds terms and sorts with `build` in a new thread with its own term
+    # manager and returns their string representations and their export
+    def work():
+        ttm = TermManager()
+        items = build(ttm)
+        return [str(i) for i in items], ttm.exportTerms(items)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(work).result()
+
+
+def build_terms(ttm):
+    intSort = ttm.getIntegerSort()
+    realSort = ttm.getRealSort()
+    x = ttm.mkConst(intSort, "x")
+    y = ttm.mkConst(realSort, "y")
+    f = ttm.mkConst(ttm.mkFunctionSort([intSort], intSort), "f")
+    uSort = ttm.mkUninterpretedSort("U")
+    u = ttm.mkConst(uSort, "u")
+    g = ttm.mkConst(ttm.mkFunctionSort([uSort], ttm.getBooleanSort()), "g")
+    decl = ttm.mkDatatypeDecl("List")
+    cons = ttm.mkDatatypeConstructorDecl("cons")
+    cons.addSelector("head", intSort)
+    cons.addSelectorSelf("tail")
+    decl.addConstructor(cons)
+    decl.addConstructor(ttm.mkDatatypeConstructorDecl("nil"))
+    listSort = ttm.mkDatatypeSort(decl)
+    dt = listSort.getDatatype()
+    lst = ttm.mkConst(listSort, "l")
+    v = ttm.mkVar(intSort, "v")
+    return [
+        ttm.mkTerm(Kind.ADD, x, ttm.mkInteger(2**70)),
+        ttm.mkTerm(Kind.LEQ, y, ttm.mkReal(-3, 4)),
+        ttm.mkTerm(ttm.mkOp(Kind.BITVECTOR_EXTRACT, 3, 0),
+                   ttm.mkBitVector(8, 13)),
+        ttm.mkFloatingPoint(8, 24, ttm.mkBitVector(32, 1065353216)),
+        ttm.mkRoundingMode(RoundingMode.ROUND_TOWARD_ZERO),
+        ttm.mkTerm(Kind.STRING_IN_REGEXP, ttm.mkString("a\u00e9\\"),
+                   ttm.mkRegexpAll()),
+        ttm.mkEmptySet(ttm.mkSetSort(intSort)),
+        ttm.mkConstArray(ttm.mkArraySort(intSort, intSort),
+                         ttm.mkInteger(0)),
+        ttm.mkTerm(Kind.FORALL, ttm.mkTerm(Kind.VARIABLE_LIST, v),
+                   ttm.mkTerm(Kind.GEQ, ttm.mkTerm(Kind.APPLY_UF, f, v), x)),
+        ttm.mkTerm(Kind.APPLY_UF, g, u),
+        ttm.mkTerm(Kind.APPLY_CONSTRUCTOR, dt["cons"].getTerm(), x,
+                   ttm.mkTerm(Kind.APPLY_CONSTRUCTOR, dt["nil"].getTerm())),
+        ttm.mkTerm(Kind.APPLY_SELECTOR, dt["cons"]["head"].getTerm(), lst),
+        ttm.mkTerm(Kind.APPLY_TESTER, dt["nil"].getTesterTerm(), lst),
+        ttm.mkTuple([x, ttm.mkBoolean(True)]),
+        ttm.mkPi(),
+        listSort,
+        uSort,
+    ]
+
+
+def test_export_terms(tm):
+    strs, exported = export_in_thread(build_terms)
+    importer = cvc5.TermImporter(tm)
+    items = importer.importTerms(exported)
+    assert [str(i) for i in items] == strs
+    assert isinstance(items[-1], cvc5.Sort)
+    assert items[-1].isUninterpretedSort()
+    assert items[-2].isDatatype()
+    # Constants and sorts with the same symbol are imported as the same
+    # constants and sorts, also from other exports
+    x = items[0][0]
+    assert x == items[8][1][1]
+    _, exported = export_in_thread(build_terms)
+    assert importer.importTerms(exported)[0] == items[0]
+    assert importer.importTerms(exported)[-2] == items[-2]
+    _, exported = export_in_thread(
+        lambda ttm: [ttm.mkConst(ttm.getIntegerSort(), "x")])
+    assert importer.importTerms(exported) == [x]
+    # The imported terms can be used by a solver
+    solver = Solver(tm)
+    solver.assertFormula(items[1])
+    solver.assertFormula(tm.mkTerm(Kind.NOT, items[12]))
+    assert solver.checkSat().isSat()
+
+
+def test_export_terms_unsupported():
+
+    def build(ttm):
+        slv = Solver(ttm)
+        slv.setOption("produce-models", "true")
+        u = ttm.mkConst(ttm.mkUninterpretedSort("U"), "u")
+        slv.checkSat()
+        return [slv.getValue(u)]
+
+    with pytest.raises(ValueError):
+        export_in_thread(build)
+
+
+def test_concurrent_term_managers(tm):
+    # Each thread constructs terms concurrently with its own term manager,
+    # see the documentation of TermManager, and exports them. All terms are
+    # then imported into one term manager. Sharing a term manager between
+    # threads is not supported and thus not tested.
+    num_threads = 16
+    barrier = threading.Barrier(num_threads)
+    results = [None] * num_threads
+
+    def work(i):
+        ttm = TermManager()
+        intSort = ttm.getIntegerSort()
+        barrier.wait()
+        xs = [ttm.mkConst(intSort, "x{}".format(j)) for j in range(200)]
+        sums = set()
+        for _ in range(10):
+            t = xs[0]
+            for x in xs[1:]:
+                t = ttm.mkTerm(Kind.ADD, t, x)
+            sums.add(t)
+        slv = Solver(ttm)
+        slv.assertFormula(ttm.mkTerm(Kind.GT, t, ttm.mkInteger(i)))
+        results[i] = (len(sums), str(slv.checkSat()),
+                      ttm.exportTerms([slv.getAssertions()[0]]))
+
+    threads = [threading.Thread(target=work, args=(i,))
+               for i in range(num_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [r[:2] for r in results] == [(1, "sat")] * num_threads
+
+    importer = cvc5.TermImporter(tm)
+    solver = Solver(tm)
+    sums = set()
+    for _, _, exported in results:
+        assertion, = importer.importTerms(exported)
+        sums.add(assertion[0])
+        solver.assertFormula(assertion)
+    assert len(sums) == 1
+    assert solver.checkSat().isSat()